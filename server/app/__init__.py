@@ -1,11 +1,26 @@
+import logging
 import os
 from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 from app.extensions import db, socketio, session
+from app.utils.sessions import init_session_backend
+from app.utils.rate_limit import init_rate_limiter
+from app.utils.db_config import normalize_database_url, detect_profile, engine_options
+from app.utils.green_db import install_green_wait_callback
+from app.utils.db_routing import replica_bind_keys
+from app.utils.query_profiler import init_query_profiler
+from app.utils.metrics import init_metrics
+from app.utils.compression import init_compression
+from app.utils.structured_logging import init_logging
+from app.utils.startup_profile import StartupProfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 def create_app():
+    profile = StartupProfile()
     flask_app = Flask(__name__)
     secret_key = os.getenv('SECRET_KEY')
     if not secret_key:
@@ -14,73 +29,125 @@ def create_app():
     database_url = os.getenv('DATABASE_URL')
     if not database_url:
         raise ValueError('DATABASE_URL environment variable is required')
+    database_url = normalize_database_url(database_url)
     flask_app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    # Engine and pool options per deployment profile (sqlite-dev, postgres-prod, postgres-pgbouncer)
+    flask_app.config['DB_PROFILE'] = detect_profile(database_url)
+    # On eventlet workers psycopg2 waits on the hub instead of blocking every green thread
+    flask_app.config['DB_GREEN'] = install_green_wait_callback()
+    flask_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        flask_app.config['DB_PROFILE'], database_url, green=flask_app.config['DB_GREEN'])
     flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Read replicas: SELECTs on GET requests go to DATABASE_REPLICA_URLS (comma separated);
+    # a client that wrote reads from the primary for DATABASE_REPLICA_STICKY_SECONDS
+    replica_urls = [normalize_database_url(url.strip())
+                    for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    replica_binds = replica_bind_keys(replica_urls)
+    flask_app.config['SQLALCHEMY_BINDS'] = {
+        key: {'url': url, **engine_options(flask_app.config['DB_PROFILE'], url, green=flask_app.config['DB_GREEN'])}
+        for key, url in zip(replica_binds, replica_urls)
+    }
+    flask_app.config['DATABASE_REPLICA_BINDS'] = replica_binds
+    flask_app.config['DATABASE_REPLICA_STICKY_SECONDS'] = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 5))
+    # SQL profiling (off by default): a JSON log line per request, N+1 warnings, a Server-Timing
+    # header for admins, and the /api/admin/db/queries report (dev mode only unless
+    # SQL_PROFILER_ENDPOINT is set, which also sends Server-Timing to every client)
+    flask_app.config['SQL_PROFILER_ENABLED'] = os.getenv('SQL_PROFILER_ENABLED', 'False').lower() == 'true'
+    flask_app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    flask_app.config['SQL_PROFILER_ENDPOINT'] = os.getenv(
+        'SQL_PROFILER_ENDPOINT', os.getenv('FLASK_DEBUG', 'False')).lower() == 'true'
     
     # Session configuration
+    # SESSION_BACKEND: filesystem (default), redis (Redis-protocol store at
+    # SESSION_STORE_URL; memory:// for a local stand-in) or cookie (signed
+    # cookies, revocations kept at SESSION_STORE_URL)
+    flask_app.config['SESSION_BACKEND'] = os.getenv('SESSION_BACKEND', 'filesystem')
+    flask_app.config['SESSION_STORE_URL'] = os.getenv('SESSION_STORE_URL')
     flask_app.config['SESSION_TYPE'] = 'filesystem'
     flask_app.config['SESSION_PERMANENT'] = False
     flask_app.config['SESSION_USE_SIGNER'] = True
     flask_app.config['SESSION_KEY_PREFIX'] = 'soko_safi:'
     flask_app.config['SESSION_FILE_DIR'] = os.path.join(os.getcwd(), 'instance', 'sessions')
     flask_app.config['SESSION_FILE_THRESHOLD'] = 500
+    # Rate limiting: memory:// keeps counters per worker, a redis:// URL shares them
+    flask_app.config['RATE_LIMIT_ENABLED'] = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    flask_app.config['RATE_LIMIT_STORE_URL'] = os.getenv('RATE_LIMIT_STORE_URL', 'memory://')
+    # Proxies in front of the app that append X-Forwarded-For (1 on Render); 0 trusts none
+    flask_app.config['PROXY_FIX_X_FOR'] = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    if flask_app.config['PROXY_FIX_X_FOR']:
+        flask_app.wsgi_app = ProxyFix(flask_app.wsgi_app, x_for=flask_app.config['PROXY_FIX_X_FOR'])
+    # JSON logs written by a background thread; LOG_SAMPLE_RATES thins out
+    # high-frequency INFO events, e.g. socket.connect=0.1,products.list=0.01
+    flask_app.config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO').upper()
+    flask_app.config['LOG_SAMPLE_RATES'] = os.getenv('LOG_SAMPLE_RATES')
+    # Prometheus metrics at /metrics; bearer token required, and under gunicorn /metrics is off without one
+    flask_app.config['METRICS_AUTH_TOKEN'] = os.getenv('METRICS_AUTH_TOKEN')
+    # gzip/Brotli for responses of at least COMPRESSION_MIN_BYTES; compressed
+    # copies of repeated GET bodies are kept per process up to COMPRESSION_CACHE_BYTES
+    flask_app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    flask_app.config['COMPRESSION_MIN_BYTES'] = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+    flask_app.config['COMPRESSION_GZIP_LEVEL'] = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    flask_app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    flask_app.config['COMPRESSION_CACHE_BYTES'] = int(os.getenv('COMPRESSION_CACHE_BYTES', 16 * 1024 * 1024))
+    flask_app.config['COMPRESSION_CACHE_MAX_ENTRY'] = int(os.getenv('COMPRESSION_CACHE_MAX_ENTRY', 2 * 1024 * 1024))
+    # /api/batch: sub-requests per call, and threads (process-wide) for concurrent GETs
+    flask_app.config['BATCH_MAX_REQUESTS'] = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+    flask_app.config['BATCH_CONCURRENCY'] = int(os.getenv('BATCH_CONCURRENCY', 4))
+    # /api/sync: most change log entries read per call, and days kept before compaction expires them
+    flask_app.config['SYNC_PAGE_SIZE'] = int(os.getenv('SYNC_PAGE_SIZE', 500))
+    flask_app.config['CHANGE_LOG_RETENTION_DAYS'] = int(os.getenv('CHANGE_LOG_RETENTION_DAYS', 30))
     flask_app.config['UPLOAD_FOLDER'] = os.path.join(flask_app.root_path, 'uploads')
     flask_app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    # Largest image forwarded to Cloudinary; checked while streaming
+    flask_app.config['UPLOAD_MAX_IMAGE_BYTES'] = int(os.getenv('UPLOAD_MAX_IMAGE_BYTES', 10 * 1024 * 1024))
     
     # Cloudinary configuration removed - handled by frontend
     
     # Initialize extensions
-    db.init_app(flask_app)
-    session.init_app(flask_app)
-    # Enable CORS for API routes and allow credentials (cookies/session)
-    from .extensions import cors, socketio
-    cors.init_app(flask_app, resources={
-        r"/api/*": {
-            "origins": ["https://soko-safi.vercel.app", "https://soko-safi-six.vercel.app", "http://localhost:5173", "http://127.0.0.1:5173"],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
-        }
-    }, supports_credentials=True)
-    socketio.init_app(flask_app)
+    with profile.phase('compression'):
+        # Registered first so it runs after every other after_request hook
+        init_compression(flask_app)
+    with profile.phase('logging'):
+        init_logging(flask_app)
+    with profile.phase('extensions'):
+        db.init_app(flask_app)
+        # `flask --app main db upgrade` applies migrations/; only the CLI needs Flask-Migrate
+        try:
+            from flask_migrate import Migrate
+        except ImportError:
+            pass
+        else:
+            Migrate(flask_app, db, directory=os.path.join(os.path.dirname(flask_app.root_path), 'migrations'))
+        init_session_backend(flask_app, session)
+        init_rate_limiter(flask_app)
+        init_query_profiler(flask_app)
+        init_metrics(flask_app)
+        # Enable CORS for API routes and allow credentials (cookies/session)
+        from .extensions import cors, socketio
+        flask_app.config['CORS_API_ORIGINS'] = ["https://soko-safi.vercel.app", "https://soko-safi-six.vercel.app", "http://localhost:5173", "http://127.0.0.1:5173"]
+        cors.init_app(flask_app, resources={
+            r"/api/*": {
+                "origins": flask_app.config['CORS_API_ORIGINS'],
+                "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+                "allow_headers": ["Content-Type", "Authorization"]
+            }
+        }, supports_credentials=True)
+    with profile.phase('socketio'):
+        socketio.init_app(flask_app)
     
     # Import models to ensure they are registered
     from . import models
+    # Registers the flush listeners that feed the change log, in every process that writes
+    from .services import change_log
     
     # Import socket events (registers handlers)
-    from . import sockets
-    
-    # Register route blueprints
-    from app.routes.auth_routes import auth_bp
-    from app.routes.user_routes import user_bp
-    from app.routes.product_routes_new import product_bp
-    from app.routes.cart_routes import cart_bp
-    from app.routes.category_routes import category_bp
-    from app.routes.order_routes import order_bp
-    from app.routes.payment_routes import payment_bp
-    from app.routes.review_routes import review_bp
-    from app.routes.message_routes import message_bp
-    from app.routes.favorite_routes import favorite_bp
-    from app.routes.follow_routes import follow_bp
-    from app.routes.notification_routes import notification_bp
-    from app.routes.artisan_routes import artisan_bp
-    from app.routes.upload_routes import upload_bp
-    from app.routes.collection_routes import collection_bp
+    with profile.phase('sockets'):
+        from . import sockets
     
-    flask_app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    flask_app.register_blueprint(user_bp, url_prefix='/api/users')
-    flask_app.register_blueprint(product_bp, url_prefix='/api/products')
-    flask_app.register_blueprint(cart_bp, url_prefix='/api/cart')
-    flask_app.register_blueprint(category_bp, url_prefix='/api/categories')
-    flask_app.register_blueprint(order_bp, url_prefix='/api/orders')
-    flask_app.register_blueprint(payment_bp, url_prefix='/api/payments')
-    flask_app.register_blueprint(review_bp, url_prefix='/api/reviews')
-    flask_app.register_blueprint(message_bp, url_prefix='/api/messages')
-    flask_app.register_blueprint(favorite_bp, url_prefix='/api/favorites')
-    flask_app.register_blueprint(follow_bp, url_prefix='/api/follows')
-    flask_app.register_blueprint(notification_bp, url_prefix='/api/notifications')
-    flask_app.register_blueprint(artisan_bp, url_prefix='/api/artisan')
-    flask_app.register_blueprint(upload_bp, url_prefix='/api/upload')
-    flask_app.register_blueprint(collection_bp, url_prefix='/api/collections')
+    # Register route blueprints; heavy services (M-Pesa, Cloudinary) are
+    # created on first use, not when their blueprint is imported
+    from app.routes import register_blueprints
+    register_blueprints(flask_app, profile)
     
     # Routes
     @flask_app.route('/')
@@ -108,4 +175,6 @@ def create_app():
         notify_payment_confirmation(user_id, payment_id, safe_status)
         return f'Payment notification sent to user {html.escape(str(user_id))}'
     
+    flask_app.extensions['startup_profile'] = profile
+    logger.info('App created', extra={'event': 'app.startup', **profile.report()})
     return flask_app
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+ASGI entry point for Soko Safi
+Serves the Flask app under an asyncio server with native async handlers for I/O-bound endpoints
+
+The Flask app runs unchanged behind a2wsgi in a thread pool. In front of it,
+catalogue reads, payment initiation and raw image uploads are handled on the
+event loop (app.asgi.routes), and Socket.IO is served by python-socketio's
+AsyncServer (app.asgi.sockets) instead of Flask-SocketIO.
+"""
+
+import logging
+import os
+
+import socketio
+from a2wsgi import WSGIMiddleware
+
+from app.asgi.clients import AsyncServices
+from app.asgi.database import create_async_db
+from app.asgi.routes import AsyncRouter, register_routes
+from app.asgi.sockets import AsyncEmitBridge, register_socket_events
+
+logger = logging.getLogger(__name__)
+
+
+def create_asgi_app(flask_app=None):
+    """
+    Build the ASGI application
+
+    Must be created with SOCKETIO_ASYNC_MODE=threading so Flask-SocketIO
+    does not import eventlet; asgi.py sets it. ASGI_WSGI_THREADS sets how
+    many Flask requests run at once per process and ASGI_HTTP_POOL_SIZE the
+    connections kept to Daraja and Cloudinary.
+
+    Args:
+        flask_app (Flask): App to serve; created with create_app() if omitted
+
+    Returns:
+        socketio.ASGIApp: Application for uvicorn or any ASGI server
+    """
+    if flask_app is None:
+        from app import create_app
+        flask_app = create_app()
+
+    from app.extensions import socketio as flask_socketio
+
+    engine, sessions = create_async_db(flask_app)
+    services = AsyncServices(int(os.getenv('ASGI_HTTP_POOL_SIZE', 20)))
+
+    router = AsyncRouter(WSGIMiddleware(flask_app, workers=int(os.getenv('ASGI_WSGI_THREADS', 10))),
+                         cors_origins=flask_app.config.get('CORS_API_ORIGINS', ()),
+                         compressor=flask_app.extensions['compression'] if flask_app.config['COMPRESSION_ENABLED'] else None)
+    register_routes(router, flask_app, sessions, services)
+
+    sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins=os.getenv('CORS_ALLOWED_ORIGINS', '*').split(','))
+    register_socket_events(sio, flask_app, sessions)
+    # Notifications sent from Flask code go out through the AsyncServer
+    bridge = AsyncEmitBridge(sio)
+    flask_socketio.server = bridge
+
+    async def startup():
+        import asyncio
+        bridge.loop = asyncio.get_running_loop()
+        logger.info('ASGI app started', extra={'event': 'asgi.startup', 'db_profile': flask_app.config['DB_PROFILE']})
+
+    async def shutdown():
+        await services.close()
+        await engine.dispose()
+
+    return socketio.ASGIApp(sio, other_asgi_app=router, on_startup=startup, on_shutdown=shutdown)
@@ -0,0 +1,143 @@
+"""
+Async HTTP clients for Soko Safi
+Daraja and Cloudinary calls over a shared httpx.AsyncClient for the ASGI entry point
+"""
+
+import logging
+import time
+
+import httpx
+
+from app.services.cloudinary_service import (
+    CLOUDINARY_CONNECT_TIMEOUT, CLOUDINARY_UPLOAD_TIMEOUT, CloudinaryService, _MultipartBody,
+)
+from app.services.mpesa_service import MpesaService
+from app.utils.metrics import MPESA_ERRORS, MPESA_REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMpesaService(MpesaService):
+    """MpesaService whose Daraja requests are awaited instead of blocking a thread"""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    async def _request(self, endpoint, method, path, **kwargs):
+        """Call a Daraja API endpoint, recording latency and failures by endpoint"""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, f'{self.base_url}{path}', **kwargs)
+            response.raise_for_status()
+            return response
+        except httpx.TimeoutException:
+            MPESA_ERRORS.labels(endpoint, 'timeout').inc()
+            raise
+        except httpx.HTTPStatusError:
+            MPESA_ERRORS.labels(endpoint, 'http').inc()
+            raise
+        except httpx.HTTPError:
+            MPESA_ERRORS.labels(endpoint, 'connection').inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            MPESA_REQUEST_DURATION.labels(endpoint).observe(elapsed)
+            logger.info('Daraja request', extra={
+                'event': 'mpesa.request', 'endpoint': endpoint, 'duration_ms': round(elapsed * 1000, 1)
+            })
+
+    async def get_access_token(self):
+        """Get M-Pesa access token"""
+        try:
+            response = await self._request('oauth', 'GET', '/oauth/v1/generate?grant_type=client_credentials',
+                                           headers=self._basic_auth_headers(), timeout=30)
+            return response.json()['access_token']
+        except Exception:
+            logger.exception('Failed to get M-Pesa access token', extra={'event': 'mpesa.oauth_error'})
+            raise
+
+    async def initiate_stk_push(self, phone_number, amount, order_id, account_reference):
+        """Initiate STK Push for customer payment"""
+        try:
+            access_token = await self.get_access_token()
+            payload = self._stk_push_payload(phone_number, amount, order_id, account_reference)
+            headers = {
+                'Authorization': f'Bearer {access_token}',
+                'Content-Type': 'application/json'
+            }
+            response = await self._request('stkpush', 'POST', '/mpesa/stkpush/v1/processrequest',
+                                           json=payload, headers=headers)
+            return self._stk_push_result(response.json())
+        except Exception as e:
+            logger.exception('STK Push failed', extra={'event': 'mpesa.stkpush_error', 'order_id': order_id})
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+
+class AsyncCloudinaryService(CloudinaryService):
+    """CloudinaryService whose uploads are awaited instead of blocking a thread"""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    async def upload_stream(self, head, stream, filename, content_type, max_bytes, folder='soko-safi'):
+        """
+        Forward an image to Cloudinary as it is read, with chunked transfer encoding
+
+        Same contract as CloudinaryService.upload_stream; `stream` should be a
+        local file (a spool), since it is read on the event loop.
+
+        Returns:
+            httpx.Response: Cloudinary's response
+        """
+        if not self.upload_preset:
+            raise ValueError('Cloudinary upload preset missing')
+
+        body = _MultipartBody({'upload_preset': self.upload_preset, 'folder': folder},
+                               head, stream, filename, content_type, max_bytes)
+
+        async def chunks():
+            for chunk in body:
+                yield chunk
+
+        return await self.client.post(
+            self.upload_url,
+            content=chunks(),
+            headers={'Content-Type': f'multipart/form-data; boundary={body.boundary}'},
+            timeout=httpx.Timeout(CLOUDINARY_UPLOAD_TIMEOUT, connect=CLOUDINARY_CONNECT_TIMEOUT)
+        )
+
+
+class AsyncServices:
+    """Creates the async Daraja and Cloudinary clients on first use, like get_mpesa_service()"""
+
+    def __init__(self, pool_size):
+        self.http = httpx.AsyncClient(limits=httpx.Limits(max_connections=pool_size,
+                                                          max_keepalive_connections=pool_size))
+        self._mpesa = None
+        self._cloudinary = None
+
+    def mpesa(self):
+        """
+        Raises:
+            ValueError: If M-Pesa credentials are missing
+        """
+        if self._mpesa is None:
+            self._mpesa = AsyncMpesaService(self.http)
+        return self._mpesa
+
+    def cloudinary(self):
+        """
+        Raises:
+            ValueError: If CLOUDINARY_CLOUD_NAME is not set
+        """
+        if self._cloudinary is None:
+            self._cloudinary = AsyncCloudinaryService(self.http)
+        return self._cloudinary
+
+    async def close(self):
+        await self.http.aclose()
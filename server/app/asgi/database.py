@@ -0,0 +1,104 @@
+"""
+Async database access for Soko Safi
+Builds the asyncpg/aiosqlite engine used by the ASGI entry point's native handlers
+"""
+
+import os
+import uuid
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.services.change_log import ChangeTrackingSession
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+
+def async_database_url(url: str):
+    """
+    Swap the sync driver in a database URL for its asyncio counterpart
+
+    libpq's sslmode query parameter is passed on as asyncpg's ssl.
+
+    Returns:
+        sqlalchemy.engine.URL: URL for create_async_engine
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver for {backend} databases')
+    parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    if 'sslmode' in parsed.query:
+        parsed = parsed.update_query_dict({'ssl': parsed.query['sslmode']}).difference_update_query(['sslmode'])
+    return parsed
+
+
+def async_engine_options(profile: str, url: str = '') -> dict:
+    """
+    Engine options for create_async_engine, mirroring engine_options per profile
+
+    Uses the same DB_POOL_* and DB_STATEMENT_TIMEOUT_MS settings. asyncpg
+    caches prepared statements per connection, which PgBouncer in transaction
+    mode cannot follow, so the cache is switched off for postgres-pgbouncer.
+
+    Args:
+        profile (str): One of DB_PROFILES
+        url (str): Database URL, used to spot in-memory SQLite databases
+
+    Returns:
+        dict: Keyword arguments for create_async_engine
+    """
+    application_name = os.getenv('DB_APPLICATION_NAME', 'soko-safi')
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+    if profile == 'sqlite-dev':
+        if url in ('sqlite://', 'sqlite:///:memory:'):
+            return {}
+        return {'connect_args': {'timeout': 15}}
+
+    if profile == 'postgres-pgbouncer':
+        return {
+            'poolclass': NullPool,
+            'connect_args': {
+                'server_settings': {'application_name': application_name},
+                'timeout': 10,
+                'statement_cache_size': 0,
+                'prepared_statement_cache_size': 0,
+                'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4().hex}__',
+            },
+        }
+
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+        'connect_args': {
+            'server_settings': {
+                'application_name': application_name,
+                'statement_timeout': str(statement_timeout),
+            },
+            'timeout': 10,
+        },
+    }
+
+
+def create_async_db(flask_app):
+    """
+    Async engine and session factory for the app's primary database
+
+    Replicas are not used: native handlers serve public catalogue reads,
+    which do not need read-your-writes stickiness either way. Sessions
+    feed the change log like Flask's, so messages stored by the Socket.IO
+    handlers reach /api/sync.
+
+    Returns:
+        tuple: (AsyncEngine, async_sessionmaker)
+    """
+    url = flask_app.config['SQLALCHEMY_DATABASE_URI']
+    engine = create_async_engine(async_database_url(url),
+                                 **async_engine_options(flask_app.config['DB_PROFILE'], url))
+    return engine, async_sessionmaker(engine, expire_on_commit=False, sync_session_class=ChangeTrackingSession)
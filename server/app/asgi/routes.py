@@ -0,0 +1,394 @@
+"""
+Native async routes for Soko Safi
+Serves the hottest I/O-bound endpoints on the event loop and hands every other request to Flask
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import tempfile
+import time
+from urllib.parse import parse_qs
+
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+
+from app.auth import _authenticate
+from app.models import Category, Order, Payment, PaymentStatus, Product
+from app.schemas import PRODUCT_FIELDSET
+from app.services.upload_dedup import UPLOAD_SPOOL_MEMORY_BYTES, acquire_asset, record_asset
+from app.utils.compression import cacheable, negotiate
+from app.utils.fieldsets import FieldsetError
+from app.utils.images import IMAGE_HEADER_SIZE, IMAGE_TYPES, sniff_image_type
+from app.utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+from app.utils.rate_limit import client_ip, hit
+from app.utils.serialization import encode_json
+
+logger = logging.getLogger(__name__)
+
+# Returned by a handler to let the Flask app serve the request instead
+FALLBACK = object()
+
+# Bodies larger than this are compressed in a thread instead of on the event loop
+COMPRESS_IN_THREAD_BYTES = 64 * 1024
+
+
+class AsyncRequest:
+    """The parts of an ASGI HTTP request the native handlers need"""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self._receive = receive
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query_string = scope.get('query_string', b'').decode('latin-1')
+        self.args = {key: values[-1] for key, values in parse_qs(self.query_string).items()}
+        self.header_list = [(key.decode('latin-1'), value.decode('latin-1')) for key, value in scope['headers']]
+        self.headers = {key.lower(): value for key, value in self.header_list}
+        self.mimetype = self.headers.get('content-type', '').split(';')[0].strip().lower()
+        self.remote_addr = scope['client'][0] if scope.get('client') else None
+
+    async def stream(self):
+        """Yield the body as it arrives"""
+        while True:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                raise ConnectionError('Client disconnected')
+            if message.get('body'):
+                yield message['body']
+            if not message.get('more_body'):
+                return
+
+    async def json(self):
+        """Parsed JSON body, or None if it is missing or invalid"""
+        body = b''.join([chunk async for chunk in self.stream()])
+        try:
+            return json.loads(body) if body else None
+        except ValueError:
+            return None
+
+
+class AsyncRouter:
+    """
+    Small ASGI router in front of the Flask app
+
+    Requests matching a registered method and path go to async handlers;
+    everything else, including CORS preflights, goes to `fallback`.
+    Handlers return (body, status) or (body, status, headers), or FALLBACK
+    to pass the request to Flask before reading its body. JSON bodies are
+    compressed with `compressor` (a ResponseCompressor) like Flask responses.
+    """
+
+    def __init__(self, fallback, cors_origins=(), compressor=None):
+        self.fallback = fallback
+        self.cors_origins = set(cors_origins)
+        self.compressor = compressor
+        self.routes = []
+
+    def route(self, method, path, endpoint):
+        """
+        Register a handler; `<name>` path segments are passed as keyword arguments
+
+        Args:
+            method (str): HTTP method
+            path (str): Path such as /api/products/<product_id>
+            endpoint (str): Flask endpoint the route mirrors, used as the metrics label
+        """
+        pattern = re.compile('^' + re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', path) + '$')
+
+        def decorator(handler):
+            self.routes.append((method, pattern, endpoint, handler))
+            return handler
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            for method, pattern, endpoint, handler in self.routes:
+                match = pattern.match(scope['path'])
+                if match and scope['method'] == method:
+                    if await self._dispatch(handler, endpoint, match.groupdict(), scope, receive, send):
+                        return
+                    break
+        await self.fallback(scope, receive, send)
+
+    async def _dispatch(self, handler, endpoint, params, scope, receive, send):
+        request = AsyncRequest(scope, receive)
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            try:
+                result = await handler(request, **params)
+            except Exception:
+                logger.exception('Async handler failed', extra={'event': 'asgi.handler_error', 'endpoint': endpoint})
+                result = ({'error': 'Internal server error'}, 500)
+            if result is FALLBACK:
+                return False
+
+            body, status, headers = result if len(result) == 3 else (*result, {})
+            await self._respond(send, request, body, status, headers)
+            HTTP_REQUEST_DURATION.labels(request.method, endpoint.split('.')[0], endpoint, status).observe(
+                time.perf_counter() - start)
+            return True
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+
+    async def _respond(self, send, request, body, status, headers):
+        payload = encode_json(body) + b'\n'
+        response_headers = [(b'content-type', b'application/json')]
+        vary = []
+        if self.compressor is not None:
+            vary.append('Accept-Encoding')
+            encoding = negotiate(request.headers.get('accept-encoding'))
+            if encoding and len(payload) >= self.compressor.min_bytes:
+                args = (payload, encoding, cacheable(request.method, status, headers.get('Cache-Control')))
+                if len(payload) > COMPRESS_IN_THREAD_BYTES:
+                    compressed = await asyncio.to_thread(self.compressor.compress, *args)
+                else:
+                    compressed = self.compressor.compress(*args)
+                if compressed is not None:
+                    payload = compressed
+                    response_headers.append((b'content-encoding', encoding.encode()))
+        response_headers.append((b'content-length', str(len(payload)).encode()))
+        origin = request.headers.get('origin')
+        if origin and (origin in self.cors_origins or '*' in self.cors_origins):
+            response_headers += [(b'access-control-allow-origin', origin.encode('latin-1')),
+                                 (b'access-control-allow-credentials', b'true')]
+            vary.append('Origin')
+        if vary:
+            response_headers.append((b'vary', ', '.join(vary).encode()))
+        response_headers += [(key.lower().encode('latin-1'), str(value).encode('latin-1'))
+                             for key, value in headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+
+def register_routes(router, flask_app, sessions, services):
+    """
+    Register the native handlers
+
+    Catalogue reads (product list and details, categories) query through the
+    async engine. Payment initiation and raw image uploads await Daraja and
+    Cloudinary over httpx; their session checks and bookkeeping writes reuse
+    the Flask code in a thread. Responses match the Flask resources.
+
+    Args:
+        router (AsyncRouter): Router to register on
+        flask_app (Flask): App used for sessions, config and sync helpers
+        sessions (async_sessionmaker): Async database sessions
+        services (AsyncServices): Async Daraja and Cloudinary clients
+    """
+
+    def request_context(request):
+        """Flask request context for `request`; pushing it loads the session from its cookie"""
+        return flask_app.test_request_context(
+            request.path, method=request.method, headers=request.header_list,
+            query_string=request.query_string, environ_base={'REMOTE_ADDR': request.remote_addr})
+
+    def authenticate(request):
+        """Run require_auth's checks; returns (user_id, None) or (None, error response)"""
+        with request_context(request):
+            from flask import session
+            flags, error = _authenticate()
+            return (None, error) if error else (session.get('user_id'), None)
+
+    def rate_limited(request, name, limit):
+        """Count a request against a per-user limit like @rate_limit(scope='user')"""
+        with request_context(request):
+            from flask import session
+            retry_after = hit(f'{name}:user', session.get('user_id') or client_ip(), limit)
+        if retry_after:
+            return {
+                'error': 'Too many requests',
+                'message': f'Rate limit exceeded, try again in {retry_after} seconds'
+            }, 429, {'Retry-After': str(retry_after)}
+        return None
+
+    def in_app_context(f, *args):
+        with flask_app.app_context():
+            return f(*args)
+
+    @router.route('GET', '/api/products/', 'product_bp.productlistresource')
+    async def list_products(request):
+        try:
+            selection = PRODUCT_FIELDSET.select(request.args)
+        except FieldsetError as e:
+            return {'error': 'Invalid fields', 'message': str(e)}, 400
+        try:
+            statement = select(Product).filter_by(status='active').options(*selection.options())
+            async with sessions() as db_session:
+                products = (await db_session.scalars(statement)).all()
+                logger.info('Listed products', extra={'event': 'products.list', 'count': len(products)})
+                return [selection.serialize(p) for p in products], 200
+        except Exception:
+            logger.exception('Failed to list products', extra={'event': 'products.list_error'})
+            return [], 200
+
+    @router.route('GET', '/api/products/<product_id>', 'product_bp.productresource')
+    async def get_product(request, product_id):
+        try:
+            selection = PRODUCT_FIELDSET.select(request.args)
+        except FieldsetError as e:
+            return {'error': 'Invalid fields', 'message': str(e)}, 400
+        try:
+            async with sessions() as db_session:
+                product = await db_session.get(Product, product_id, options=selection.options())
+                if not product:
+                    return {'error': 'Product not found'}, 404
+                return selection.serialize(product), 200
+        except Exception:
+            return {'error': 'Product not found'}, 404
+
+    @router.route('GET', '/api/categories/', 'category_bp.categorylistresource')
+    async def list_categories(request):
+        async with sessions() as db_session:
+            categories = (await db_session.scalars(select(Category).filter_by(deleted_at=None))).all()
+        return [{
+            'id': c.id,
+            'name': c.name,
+            'description': c.description,
+            'created_at': c.created_at.isoformat() if c.created_at else None
+        } for c in categories], 200
+
+    def create_payment(user_id, order_id, phone_number):
+        """Check the order and add a pending payment; returns (payment id, amount) or an error response"""
+        from app.models import db
+        order = db.session.get(Order, order_id)
+        if not order:
+            return None, ({'error': 'Order not found'}, 404)
+        if order.user_id != user_id:
+            return None, ({'error': 'Access denied'}, 403)
+
+        total_amount = sum(float(item.total_price) for item in order.order_items)
+        payment = Payment(
+            order_id=order_id,
+            amount=total_amount,
+            currency='KES',
+            payer_phone=phone_number,
+            status=PaymentStatus.pending
+        )
+        db.session.add(payment)
+        db.session.commit()
+        return (payment.id, total_amount), None
+
+    def record_stk_push(payment_id, result):
+        from app.models import db
+        payment = db.session.get(Payment, payment_id)
+        if result['success']:
+            # Store checkout request ID for callback matching
+            payment.mpesa_transaction_id = result['checkout_request_id']
+        else:
+            payment.status = PaymentStatus.failed
+            payment.transaction_status_reason = result.get('error', 'STK Push failed')
+        db.session.commit()
+
+    @router.route('POST', '/api/payments/initiate', 'payment_bp.initiatepaymentresource')
+    async def initiate_payment(request):
+        user_id, error = await asyncio.to_thread(authenticate, request)
+        if error:
+            return error
+
+        data = await request.json() or {}
+        order_id = data.get('order_id')
+        phone_number = data.get('phone_number')
+        if not order_id or not phone_number:
+            return {'error': 'Order ID and phone number are required'}, 400
+
+        try:
+            created, error = await asyncio.to_thread(in_app_context, create_payment, user_id, order_id, phone_number)
+            if error:
+                return error
+            payment_id, total_amount = created
+
+            result = await services.mpesa().initiate_stk_push(
+                phone_number=phone_number,
+                amount=total_amount,
+                order_id=order_id,
+                account_reference=f"Order-{order_id}"
+            )
+            await asyncio.to_thread(in_app_context, record_stk_push, payment_id, result)
+        except Exception as e:
+            logger.exception('Payment initiation failed', extra={'event': 'payments.initiate_error', 'order_id': order_id})
+            return {'error': 'Payment initiation failed', 'message': str(e)}, 500
+
+        if result['success']:
+            return {
+                'message': 'Payment initiated successfully',
+                'payment_id': payment_id,
+                'checkout_request_id': result['checkout_request_id'],
+                'customer_message': result['customer_message']
+            }, 200
+        return {
+            'error': 'Failed to initiate payment',
+            'details': result.get('error')
+        }, 400
+
+    def acquire(sha256):
+        asset = acquire_asset(sha256)
+        return (asset.url, asset.public_id) if asset else None
+
+    def record(sha256, url, public_id, content_type, size):
+        asset = record_asset(sha256, url, public_id, content_type, size)
+        return asset.url, asset.public_id
+
+    @router.route('POST', '/api/upload/image', 'upload_bp.upload_file')
+    async def upload_image(request):
+        # Multipart forms and uploads attached to a product stay on the Flask route
+        raw = request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream'
+        if not raw or request.args.get('product_id'):
+            return FALLBACK
+
+        limited = await asyncio.to_thread(rate_limited, request, 'upload_bp.upload_file', '20/minute')
+        if limited:
+            return limited
+
+        max_bytes = flask_app.config['UPLOAD_MAX_IMAGE_BYTES']
+        spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY_BYTES)
+        with spool:
+            digest, size, image_type = hashlib.sha256(), 0, None
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_bytes:
+                    return {'error': 'File too large'}, 413
+                digest.update(chunk)
+                spool.write(chunk)
+                if image_type is None and size >= IMAGE_HEADER_SIZE:
+                    spool.seek(0)
+                    image_type = sniff_image_type(spool.read(IMAGE_HEADER_SIZE))
+                    if image_type is None:
+                        return {'error': 'Invalid file type'}, 400
+                    spool.seek(0, 2)
+            if image_type is None:
+                return {'error': 'Invalid file type'}, 400
+            spool.seek(0)
+
+            content_type, extension = IMAGE_TYPES[image_type]
+            filename = request.headers.get('x-filename', 'upload')
+            filename = f"{secure_filename(filename).rsplit('.', 1)[0] or 'upload'}.{extension}"
+            sha256 = digest.hexdigest()
+
+            asset = await asyncio.to_thread(in_app_context, acquire, sha256)
+            deduplicated = asset is not None
+            if not deduplicated:
+                try:
+                    response = await services.cloudinary().upload_stream(b'', spool, filename, content_type, size)
+                except ValueError:
+                    return {'error': 'Cloudinary configuration missing'}, 500
+                except Exception:
+                    logger.exception('Cloudinary upload failed', extra={'event': 'upload.cloudinary_error'})
+                    return {'error': 'Upload failed'}, 500
+                if response.status_code != 200:
+                    return {'error': 'Upload failed'}, 500
+                result = response.json()
+                asset = await asyncio.to_thread(in_app_context, record, sha256, result['secure_url'],
+                                                result['public_id'], content_type, size)
+
+        url, public_id = asset
+        return {
+            'message': 'File uploaded successfully',
+            'url': url,
+            'public_id': public_id,
+            'sha256': sha256,
+            'deduplicated': deduplicated
+        }, 200
@@ -0,0 +1,149 @@
+"""
+Async Socket.IO events for Soko Safi
+Chat handlers for python-socketio's AsyncServer, used by the ASGI entry point
+"""
+
+import asyncio
+import html
+import logging
+
+from sqlalchemy import and_, or_, select
+
+from app.extensions import connected_users
+from app.models import Message
+from app.utils.metrics import track_socket_event
+from app.utils.rate_limit import hit
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncEmitBridge:
+    """
+    Stands in for Flask-SocketIO's server so sync code can emit to async clients
+
+    send_notification() runs in WSGI worker threads and calls socketio.emit();
+    the emit is handed to the event loop and not waited for.
+    """
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.loop = None
+
+    def emit(self, event, *args, **kwargs):
+        if self.loop is None:
+            logger.warning('Socket.IO emit before startup', extra={'event': 'socket.emit_dropped', 'name': event})
+            return
+        asyncio.run_coroutine_threadsafe(self.sio.emit(event, *args, **kwargs), self.loop)
+
+
+def register_socket_events(sio, flask_app, sessions):
+    """
+    Register the chat events from app.sockets.chat_events on an AsyncServer
+
+    Messages are stored through the async engine. Users are tracked in the
+    shared connected_users map, so notifications reach clients connected here.
+
+    Args:
+        sio (socketio.AsyncServer): Server to register on
+        flask_app (Flask): App whose config the rate limiter reads
+        sessions (async_sessionmaker): Async database sessions
+    """
+
+    def _hit(name, identifier, limit):
+        with flask_app.app_context():
+            return hit(name, identifier, limit)
+
+    @sio.on('connect')
+    @track_socket_event('connect')
+    async def handle_connect(sid, environ, auth=None):
+        logger.info('Client connected', extra={'event': 'socket.connect'})
+        await sio.emit('status', {'msg': 'Connected to server'}, to=sid)
+
+    @sio.on('disconnect')
+    @track_socket_event('disconnect')
+    async def handle_disconnect(sid, reason=None):
+        user_id = next((uid for uid, user_sid in list(connected_users.items()) if user_sid == sid), None)
+        if user_id:
+            connected_users.pop(user_id, None)
+        logger.info('Client disconnected', extra={'event': 'socket.disconnect', 'user_id': user_id})
+
+    @sio.on('join')
+    @track_socket_event('join')
+    async def handle_join(sid, data):
+        if not data or 'user_id' not in data:
+            await sio.emit('error', {'msg': 'user_id is required'}, to=sid)
+            return
+
+        user_id = data['user_id']
+        connected_users[user_id] = sid
+        await sio.enter_room(sid, f'user_{user_id}')
+        await sio.emit('status', {'msg': f'User {user_id} joined'}, to=sid)
+
+    @sio.on('send_message')
+    @track_socket_event('send_message')
+    async def handle_message(sid, data):
+        try:
+            if not data or not all(k in data for k in ['sender_id', 'receiver_id', 'message']):
+                await sio.emit('error', {'msg': 'sender_id, receiver_id, and message are required'}, to=sid)
+                return
+
+            sender_id = data['sender_id']
+            receiver_id = data['receiver_id']
+            message_text = data['message']
+
+            # The limit store may be Redis, so count in a thread; sender_id comes
+            # from the client, so the limit is per connection
+            if await asyncio.to_thread(_hit, 'socket:send_message', sid, '30/minute'):
+                await sio.emit('error', {'msg': 'Too many messages, please slow down'}, to=sid)
+                return
+
+            if not message_text or len(message_text.strip()) == 0:
+                await sio.emit('error', {'msg': 'Message cannot be empty'}, to=sid)
+                return
+
+            async with sessions() as db_session:
+                message = Message(sender_id=sender_id, receiver_id=receiver_id, message=message_text)
+                db_session.add(message)
+                await db_session.commit()
+
+            if receiver_id in connected_users:
+                await sio.emit('new_message', {
+                    'id': message.id,
+                    'sender_id': sender_id,
+                    'message': html.escape(str(message_text)),
+                    'timestamp': message.timestamp.isoformat()
+                }, to=connected_users[receiver_id])
+
+            await sio.emit('message_sent', {'status': 'delivered', 'message_id': message.id}, to=sid)
+        except Exception:
+            logger.exception('Socket message failed', extra={'event': 'socket.send_message_error'})
+            await sio.emit('error', {'msg': 'Failed to send message'}, to=sid)
+
+    @sio.on('get_chat_history')
+    @track_socket_event('get_chat_history')
+    async def handle_chat_history(sid, data):
+        try:
+            if not data or not all(k in data for k in ['user1', 'user2']):
+                await sio.emit('error', {'msg': 'user1 and user2 are required'}, to=sid)
+                return
+
+            user1 = data['user1']
+            user2 = data['user2']
+            statement = select(Message).where(or_(
+                and_(Message.sender_id == user1, Message.receiver_id == user2),
+                and_(Message.sender_id == user2, Message.receiver_id == user1),
+            )).order_by(Message.timestamp).limit(100)
+            async with sessions() as db_session:
+                messages = (await db_session.scalars(statement)).all()
+
+            await sio.emit('chat_history', {'messages': [{
+                'id': msg.id,
+                'sender_id': msg.sender_id,
+                'receiver_id': msg.receiver_id,
+                'message': msg.message,
+                'timestamp': msg.timestamp.isoformat() if msg.timestamp else None,
+                'is_read': msg.is_read
+            } for msg in messages]}, to=sid)
+        except Exception:
+            logger.exception('Socket chat history failed', extra={'event': 'socket.chat_history_error'})
+            await sio.emit('error', {'msg': 'Failed to get chat history'}, to=sid)
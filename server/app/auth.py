@@ -3,10 +3,25 @@ Authentication utilities for Soko Safi
 Handles password hashing, verification, and session management
 """
 
-import bcrypt
+import os
+import threading
+import time
+from collections import namedtuple
 from functools import wraps
-from flask import session, request, jsonify, current_app
+from flask import session, request, jsonify, current_app, g
+from sqlalchemy import event
 from app.models import User, UserRole
+from app.utils import passwords
+from app.utils.sessions import revoke_current_session
+
+# Seconds a user's role/verified/active flags are cached per process
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 30))
+USER_CACHE_MAX_ENTRIES = 10000
+
+UserFlags = namedtuple('UserFlags', ['role', 'is_verified', 'is_active'])
+
+_user_flags_cache = {}
+_user_flags_lock = threading.Lock()
 
 def hash_password(password: str) -> str:
     """
@@ -18,9 +33,8 @@ def hash_password(password: str) -> str:
     Returns:
         str: Hashed password
     """
-    # Generate salt and hash password
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    # Hashed in a native thread at the cost that fits the latency budget
+    hashed = passwords.hashpw(password.encode('utf-8'))
     return hashed.decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
@@ -34,7 +48,22 @@ def verify_password(password: str, hashed: str) -> bool:
     Returns:
         bool: True if password matches, False otherwise
     """
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return passwords.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def password_needs_rehash(hashed: str) -> bool:
+    """
+    Check whether a hash was made at a lower cost than the current target
+
+    Hashes are only ever moved to a higher cost, so workers whose targets
+    differ never rehash the same password back and forth.
+
+    Args:
+        hashed (str): Hashed password from database
+
+    Returns:
+        bool: True if the password should be rehashed after a successful login
+    """
+    return passwords.hash_rounds(hashed) < passwords.cost_policy.target_rounds
 
 def login_user(user_id: str, role: str) -> None:
     """
@@ -50,8 +79,9 @@ def login_user(user_id: str, role: str) -> None:
 
 def logout_user() -> None:
     """
-    Clear user session
+    Clear user session and revoke it where the session backend supports it
     """
+    revoke_current_session()
     session.clear()
 
 def get_current_user() -> dict:
@@ -68,6 +98,96 @@ def get_current_user() -> dict:
         }
     return None
 
+def load_current_user():
+    """
+    Get the authenticated User model for this request
+
+    The row is loaded lazily and at most once per request, so decorators and
+    handlers can all call this without issuing extra queries.
+
+    Returns:
+        User: Current user, or None if not authenticated or not found
+    """
+    if '_current_user' not in g:
+        user_id = session.get('user_id') if session.get('authenticated') else None
+        g._current_user = User.query.get(user_id) if user_id else None
+    return g._current_user
+
+def get_user_flags(user_id: str) -> UserFlags:
+    """
+    Get a user's role, verified and active flags
+
+    Flags are cached per process for USER_CACHE_TTL seconds and dropped
+    whenever the user row is updated or deleted through the ORM.
+
+    Args:
+        user_id (str): User's unique identifier
+
+    Returns:
+        UserFlags: Cached flags, or None if the user does not exist
+    """
+    now = time.monotonic()
+    cached = _user_flags_cache.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    if user_id == session.get('user_id'):
+        user = load_current_user()
+    else:
+        user = User.query.get(user_id)
+
+    flags = None
+    if user:
+        flags = UserFlags(
+            role=user.role.value if user.role else None,
+            is_verified=bool(user.is_verified),
+            is_active=user.deleted_at is None
+        )
+
+    with _user_flags_lock:
+        if len(_user_flags_cache) >= USER_CACHE_MAX_ENTRIES:
+            _user_flags_cache.clear()
+        _user_flags_cache[user_id] = (now + USER_CACHE_TTL, flags)
+    return flags
+
+def invalidate_user_cache(user_id: str) -> None:
+    """
+    Drop cached flags for a user
+
+    Args:
+        user_id (str): User's unique identifier
+    """
+    with _user_flags_lock:
+        _user_flags_cache.pop(user_id, None)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user_on_change(mapper, connection, target):
+    invalidate_user_cache(target.id)
+
+def _authenticate():
+    """
+    Check the session belongs to an existing, active user
+
+    Returns:
+        tuple: (UserFlags, None) on success, (None, error response) otherwise
+    """
+    if not session.get('authenticated'):
+        return None, ({
+            'error': 'Authentication required',
+            'message': 'Please log in to access this resource'
+        }, 401)
+
+    flags = get_user_flags(session.get('user_id'))
+    if flags is None or not flags.is_active:
+        session.clear()
+        return None, ({
+            'error': 'Account disabled',
+            'message': 'This account is no longer active'
+        }, 401)
+
+    return flags, None
+
 def require_auth(f):
     """
     Decorator to require authentication for routes
@@ -79,11 +199,9 @@ def require_auth(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not session.get('authenticated'):
-            return {
-                'error': 'Authentication required',
-                'message': 'Please log in to access this resource'
-            }, 401
+        flags, error = _authenticate()
+        if error:
+            return error
         return f(*args, **kwargs)
     return decorated_function
 
@@ -102,14 +220,11 @@ def require_role(*allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not session.get('authenticated'):
-                return {
-                    'error': 'Authentication required',
-                    'message': 'Please log in to access this resource'
-                }, 401
+            flags, error = _authenticate()
+            if error:
+                return error
 
-            user_role = session.get('user_role')
-            if user_role not in allowed_roles:
+            if flags.role not in allowed_roles:
                 return {
                     'error': 'Insufficient permissions',
                     'message': f'This resource requires one of: {", ".join(allowed_roles)}'
@@ -135,17 +250,14 @@ def require_ownership_or_role(resource_user_id_param='user_id', *allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not session.get('authenticated'):
-                return {
-                    'error': 'Authentication required',
-                    'message': 'Please log in to access this resource'
-                }, 401
+            flags, error = _authenticate()
+            if error:
+                return error
 
             current_user_id = session.get('user_id')
-            user_role = session.get('user_role')
 
             # Check if user has required role
-            if user_role in allowed_roles:
+            if flags.role in allowed_roles:
                 return f(*args, **kwargs)
 
             # Check if user owns the resource
@@ -7,7 +7,9 @@ import os
 try:
     # Initialize extensions with proper error handling
     allowed_origins = os.getenv('CORS_ALLOWED_ORIGINS', '*').split(',')
-    socketio = SocketIO(cors_allowed_origins=allowed_origins)
+    # Auto-detection imports eventlet; scripts that never serve sockets can pass threading
+    socketio = SocketIO(cors_allowed_origins=allowed_origins,
+                        async_mode=os.getenv('SOCKETIO_ASYNC_MODE') or None)
     session = Session()
     cors = CORS()
     
@@ -1,10 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
+from app.utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 from .user import User, UserRole
 from .category import Category, Subcategory
-from .product import Product, ProductImage, Collection
+from .product import Product, ProductImage, Collection, collection_products
 from .artisan import ArtisanShowcaseMedia, ArtisanSocial
 from .cart import Cart, CartItem
 from .order import Order, OrderItem, OrderStatus
@@ -14,11 +15,13 @@ from .favorite import Favorite
 from .follow import Follow
 from .notification import Notification, NotificationType
 from .message import Message
+from .uploaded_asset import UploadedAsset
+from .change_log import ChangeLogEntry, ChangeLogState
 
 __all__ = [
     'db', 'User', 'UserRole', 'Category', 'Subcategory', 'Product', 'ProductImage',
-    'Collection', 'ArtisanShowcaseMedia', 'ArtisanSocial', 'Cart', 'CartItem',
+    'Collection', 'collection_products', 'ArtisanShowcaseMedia', 'ArtisanSocial', 'Cart', 'CartItem',
     'Order', 'OrderItem', 'OrderStatus', 'Payment', 'PaymentMethod', 'PaymentStatus',
     'ArtisanDisbursement', 'DisbursementStatus', 'Review', 'Favorite', 'Follow',
-    'Notification', 'NotificationType', 'Message'
+    'Notification', 'NotificationType', 'Message', 'UploadedAsset', 'ChangeLogEntry', 'ChangeLogState'
 ]
\ No newline at end of file
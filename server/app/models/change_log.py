@@ -0,0 +1,35 @@
+from datetime import datetime
+from . import db
+
+# BIGINT autoincrement on PostgreSQL; SQLite only autoincrements INTEGER keys
+BigIntegerKey = db.BigInteger().with_variant(db.Integer, 'sqlite')
+
+class ChangeLogEntry(db.Model):
+    """A row insert, update or delete recorded for /api/sync (app/services/change_log.py)"""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        # Serves the per-user "changes after seq N" scan
+        db.Index('ix_change_log_user_id_seq', 'user_id', 'seq'),
+        db.Index('ix_change_log_entity_entity_id', 'entity', 'entity_id'),
+    )
+
+    id = db.Column(BigIntegerKey, primary_key=True, autoincrement=True)
+    # Assigned after commit, in the order entries become visible; NULL until then
+    seq = db.Column(db.BigInteger, unique=True, index=True)
+    entity = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.String(36), nullable=False)
+    # insert, update or delete (soft deletes included)
+    operation = db.Column(db.String(10), nullable=False)
+    # User who may see the change; NULL for public rows such as products
+    user_id = db.Column(db.String(36))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ChangeLogState(db.Model):
+    """Single row holding the last assigned seq and the compaction horizon"""
+    __tablename__ = "change_log_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+    last_seq = db.Column(db.BigInteger, nullable=False, default=0)
+    # Entries up to this seq may have been removed; older sync tokens are expired
+    compacted_seq = db.Column(db.BigInteger, nullable=False, default=0)
+    compacted_at = db.Column(db.DateTime)
@@ -38,6 +38,8 @@ class Payment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    order = db.relationship('Order', backref='payments', lazy=True)
+
 class ArtisanDisbursement(db.Model):
     __tablename__ = "artisan_disbursements"
 
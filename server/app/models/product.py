@@ -1,7 +1,19 @@
 from datetime import datetime
+import json
 import uuid
 from . import db
 
+# Products in a collection, in display order
+collection_products = db.Table(
+    'collection_products',
+    db.Column('collection_id', db.String(36), db.ForeignKey('collections.id'), primary_key=True),
+    db.Column('product_id', db.String(36), db.ForeignKey('products.id'), primary_key=True),
+    db.Column('position', db.Integer, nullable=False),
+    db.Column('added_at', db.DateTime, default=datetime.utcnow),
+    # Serves paginated collection pages in position order
+    db.Index('ix_collection_products_collection_id_position', 'collection_id', 'position'),
+)
+
 class Collection(db.Model):
     __tablename__ = "collections"
     
@@ -34,7 +46,9 @@ class Product(db.Model):
     # Relationships
     category = db.relationship('Category', backref='products', lazy='joined')
     subcategory = db.relationship('Subcategory', backref='products', lazy='joined')
-    images = db.relationship('ProductImage', backref='product', lazy='dynamic', foreign_keys='ProductImage.product_id')
+    # Plain list so galleries can be batch-loaded with selectinload(Product.images)
+    images = db.relationship('ProductImage', backref='product', lazy='select', order_by='ProductImage.position',
+                             foreign_keys='ProductImage.product_id')
 
     @property
     def image(self):
@@ -50,10 +64,31 @@ class Product(db.Model):
 
 class ProductImage(db.Model):
     __tablename__ = "product_images"
+    __table_args__ = (
+        # Serves the position-ordered gallery lookup behind selectinload(Product.images)
+        db.Index('ix_product_images_product_id_position', 'product_id', 'position'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.String(36), db.ForeignKey('products.id'))
     url = db.Column(db.Text, nullable=False)
     alt_text = db.Column(db.String(255))
     position = db.Column(db.Integer)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    # JSON list of {url, width, format} written by the image worker
+    variants = db.Column(db.Text)
+    # pending, processing, ready or failed
+    variants_status = db.Column(db.String(20), default='pending', index=True)
+    # When a worker moved the image to processing; stale claims are requeued by --retry-failed
+    variants_claimed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def variant_list(self):
+        """Generated derivatives, smallest first"""
+        return json.loads(self.variants) if self.variants else []
+
+    @property
+    def srcset(self):
+        """srcset attribute value for the WebP derivatives, or None until they exist"""
+        webp = [v for v in self.variant_list if v['format'] == 'webp']
+        return ', '.join(f"{v['url']} {v['width']}w" for v in webp) or None
\ No newline at end of file
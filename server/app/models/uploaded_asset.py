@@ -0,0 +1,19 @@
+from datetime import datetime
+from . import db
+
+class UploadedAsset(db.Model):
+    """An image stored on Cloudinary, keyed by the SHA-256 of its bytes"""
+    __tablename__ = "uploaded_assets"
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    url = db.Column(db.Text, nullable=False)
+    public_id = db.Column(db.String(255))
+    content_type = db.Column(db.String(50))
+    size_bytes = db.Column(db.Integer, nullable=False)
+    # Uploads currently pointing at this asset; destroyed on Cloudinary at zero
+    ref_count = db.Column(db.Integer, nullable=False, default=1)
+    # Uploads answered from this row instead of Cloudinary
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
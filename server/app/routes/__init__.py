@@ -1,20 +1,44 @@
-from .user_routes import user_bp
-from .product_routes import product_bp
-from .order_routes import order_bp
-from .cart_routes import cart_bp
-from .category_routes import category_bp
-from .review_routes import review_bp
-from .message_routes import message_bp
-from .payment_routes import payment_bp
-from .favorite_routes import favorite_bp
+"""
+Route registration for Soko Safi
+Blueprint modules are imported when registered, so importing one route
+module no longer pulls in every other one
+"""
 
-def register_blueprints(app):
-    app.register_blueprint(user_bp, url_prefix='/api/users')
-    app.register_blueprint(product_bp, url_prefix='/api/products')
-    app.register_blueprint(order_bp, url_prefix='/api/orders')
-    app.register_blueprint(cart_bp, url_prefix='/api/cart')
-    app.register_blueprint(category_bp, url_prefix='/api/categories')
-    app.register_blueprint(review_bp, url_prefix='/api/reviews')
-    app.register_blueprint(message_bp, url_prefix='/api/messages')
-    app.register_blueprint(payment_bp, url_prefix='/api/payments')
-    app.register_blueprint(favorite_bp, url_prefix='/api/favorites')
\ No newline at end of file
+from contextlib import nullcontext
+from importlib import import_module
+
+# (module, blueprint attribute, URL prefix)
+BLUEPRINTS = [
+    ('app.routes.auth_routes', 'auth_bp', '/api/auth'),
+    ('app.routes.user_routes', 'user_bp', '/api/users'),
+    ('app.routes.product_routes_new', 'product_bp', '/api/products'),
+    ('app.routes.cart_routes', 'cart_bp', '/api/cart'),
+    ('app.routes.category_routes', 'category_bp', '/api/categories'),
+    ('app.routes.order_routes', 'order_bp', '/api/orders'),
+    ('app.routes.payment_routes', 'payment_bp', '/api/payments'),
+    ('app.routes.review_routes', 'review_bp', '/api/reviews'),
+    ('app.routes.message_routes', 'message_bp', '/api/messages'),
+    ('app.routes.favorite_routes', 'favorite_bp', '/api/favorites'),
+    ('app.routes.follow_routes', 'follow_bp', '/api/follows'),
+    ('app.routes.notification_routes', 'notification_bp', '/api/notifications'),
+    ('app.routes.artisan_routes', 'artisan_bp', '/api/artisan'),
+    ('app.routes.upload_routes', 'upload_bp', '/api/upload'),
+    ('app.routes.collection_routes', 'collection_bp', '/api/collections'),
+    ('app.routes.admin_routes', 'admin_bp', '/api/admin'),
+    ('app.routes.batch_routes', 'batch_bp', '/api/batch'),
+    ('app.routes.sync_routes', 'sync_bp', '/api/sync'),
+]
+
+
+def register_blueprints(app, profile=None):
+    """
+    Import and register every API blueprint
+
+    Args:
+        app: Flask application
+        profile (StartupProfile): Records the time spent per blueprint, if given
+    """
+    for module_name, attribute, url_prefix in BLUEPRINTS:
+        phase = profile.phase(f"blueprint:{module_name.rsplit('.', 1)[1]}") if profile else nullcontext()
+        with phase:
+            app.register_blueprint(getattr(import_module(module_name), attribute), url_prefix=url_prefix)
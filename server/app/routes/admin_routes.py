@@ -0,0 +1,54 @@
+"""
+Admin routes for Soko Safi
+Operational endpoints for administrators
+"""
+
+from flask_restful import Resource, Api
+from flask import Blueprint, current_app, request
+from app.models import db
+from app.auth import require_role
+from app.utils.db_config import describe_pool
+from app.utils.query_profiler import route_stats
+from app.utils.serialization import output_json
+
+admin_bp = Blueprint('admin_bp', __name__)
+admin_api = Api(admin_bp)
+admin_api.representations['application/json'] = output_json
+
+class DatabasePoolResource(Resource):
+    @require_role('admin')
+    def get(self):
+        """Get database pool statistics - Admin only"""
+        return {
+            'profile': current_app.config.get('DB_PROFILE'),
+            'pool': describe_pool(db.engine)
+        }
+
+class QueryProfileResource(Resource):
+    @require_role('admin')
+    def get(self):
+        """Get the routes with the most queries in this worker - Admin only, dev mode"""
+        if not current_app.config.get('SQL_PROFILER_ENDPOINT'):
+            return {'error': 'Not found'}, 404
+
+        sort = request.args.get('sort', 'queries')
+        if sort not in ('queries', 'db_ms', 'n_plus_one'):
+            return {'error': 'Invalid sort', 'message': 'sort must be queries, db_ms or n_plus_one'}, 400
+        limit = request.args.get('limit', 20, type=int)
+        return {
+            'n_plus_one_threshold': current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD'),
+            'routes': route_stats.worst(sort, limit)
+        }
+
+    @require_role('admin')
+    def delete(self):
+        """Reset query statistics - Admin only, dev mode"""
+        if not current_app.config.get('SQL_PROFILER_ENDPOINT'):
+            return {'error': 'Not found'}, 404
+
+        route_stats.reset()
+        return {'message': 'Query statistics reset'}
+
+# Register routes
+admin_api.add_resource(DatabasePoolResource, '/db/pool')
+admin_api.add_resource(QueryProfileResource, '/db/queries')
@@ -6,10 +6,15 @@ Handles CRUD operations for artisan showcase media and social links
 from flask_restful import Resource, Api
 from flask import Blueprint, request, jsonify
 from app.models import db, ArtisanShowcaseMedia, ArtisanSocial, User, Product
+from app.utils.serialization import output_json
+import logging
 # Removed problematic auth imports
 
+logger = logging.getLogger(__name__)
+
 artisan_bp = Blueprint('artisan_bp', __name__)
 artisan_api = Api(artisan_bp)
+artisan_api.representations['application/json'] = output_json
 
 class ArtisanShowcaseMediaListResource(Resource):
     def get(self):
@@ -243,8 +248,6 @@ class ArtisanDashboardResource(Resource):
             error_trace = traceback.format_exc()
             current_app.logger.error(f"Dashboard error: {e}")
             current_app.logger.error(f"Full traceback: {error_trace}")
-            print(f"Dashboard error: {e}")
-            print(f"Full traceback: {error_trace}")
             
             return {
                 'stats': {
@@ -261,8 +264,8 @@ class ArtisanOrdersResource(Resource):
         """Get orders for artisan's products - Public access with safe defaults"""
         try:
             return []
-        except Exception as e:
-            print(f"Orders error: {e}")
+        except Exception:
+            logger.exception('Failed to list artisan orders', extra={'event': 'artisan.orders_error'})
             return []
 
 class ArtisanMessagesResource(Resource):
@@ -270,8 +273,8 @@ class ArtisanMessagesResource(Resource):
         """Get messages for artisan - Public access with safe defaults"""
         try:
             return []
-        except Exception as e:
-            print(f"Messages error: {e}")
+        except Exception:
+            logger.exception('Failed to list artisan messages', extra={'event': 'artisan.messages_error'})
             return []
 
 class ArtisanProductsResource(Resource):
@@ -6,11 +6,17 @@ Handles user registration, login, logout, and profile management
 from flask import Blueprint, request, jsonify, session
 from flask_restful import Resource, Api
 from app.models import db, User, UserRole
-from app.auth import hash_password, verify_password, login_user, logout_user, get_current_user, require_auth, require_ownership_or_role
+from app.auth import hash_password, verify_password, password_needs_rehash, login_user, logout_user, get_current_user, load_current_user, require_auth, require_ownership_or_role
+from app.utils.rate_limit import rate_limit
+from app.utils.serialization import output_json
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 auth_bp = Blueprint('auth_bp', __name__)
 auth_api = Api(auth_bp)
+auth_api.representations['application/json'] = output_json
 
 def validate_email(email):
     """Validate email format"""
@@ -36,17 +42,16 @@ class RegisterResource(Resource):
         """Handle CORS preflight request"""
         return {}, 200
     
+    @rate_limit('10/hour', scope='ip')
     def post(self):
         try:
-            print(f"[REGISTER] Request received from {request.remote_addr}")
             data = request.get_json()
-            print(f"[REGISTER] Request data: {data}")
             
             # Validate required fields
             required_fields = ['email', 'password', 'full_name', 'role']
             for field in required_fields:
                 if not data.get(field):
-                    print(f"[REGISTER] Missing field: {field}")
+                    logger.info('Registration rejected', extra={'event': 'auth.register_rejected', 'reason': 'missing_field', 'field': field})
                     return {
                         'error': 'Missing required field',
                         'message': f'{field} is required'
@@ -58,45 +63,40 @@ class RegisterResource(Resource):
             role = data['role'].strip().lower()
             
             # Validate email format
-            print(f"[REGISTER] Validating email: {email}")
             if not validate_email(email):
-                print(f"[REGISTER] Invalid email format: {email}")
+                logger.info('Registration rejected', extra={'event': 'auth.register_rejected', 'reason': 'invalid_email'})
                 return {
                     'error': 'Invalid email format',
                     'message': 'Please provide a valid email address'
                 }, 400
             
             # Validate password strength
-            print(f"[REGISTER] Validating password strength")
             is_valid_password, password_message = validate_password(password)
             if not is_valid_password:
-                print(f"[REGISTER] Weak password: {password_message}")
+                logger.info('Registration rejected', extra={'event': 'auth.register_rejected', 'reason': 'weak_password'})
                 return {
                     'error': 'Weak password',
                     'message': password_message
                 }, 400
             
             # Validate role
-            print(f"[REGISTER] Validating role: {role}")
             if role not in ['buyer', 'artisan']:
-                print(f"[REGISTER] Invalid role: {role}")
+                logger.info('Registration rejected', extra={'event': 'auth.register_rejected', 'reason': 'invalid_role'})
                 return {
                     'error': 'Invalid role',
                     'message': 'Role must be either "buyer" or "artisan"'
                 }, 400
             
             # Check if user already exists
-            print(f"[REGISTER] Checking if user exists: {email}")
             existing_user = User.query.filter_by(email=email, deleted_at=None).first()
             if existing_user:
-                print(f"[REGISTER] User already exists: {email}")
+                logger.info('Registration rejected', extra={'event': 'auth.register_rejected', 'reason': 'user_exists'})
                 return {
                     'error': 'User already exists',
                     'message': 'An account with this email already exists'
                 }, 409
             
             # Create new user
-            print(f"[REGISTER] Creating new user: {email}")
             user = User(
                 email=email,
                 password_hash=hash_password(password),
@@ -107,16 +107,13 @@ class RegisterResource(Resource):
                 is_verified=False
             )
             
-            print(f"[REGISTER] Saving user to database")
             db.session.add(user)
             db.session.commit()
-            print(f"[REGISTER] User saved with ID: {user.id}")
             
             # Log in the user automatically after registration
-            print(f"[REGISTER] Logging in user: {user.id}")
             login_user(user.id, user.role.value)
             
-            print(f"[REGISTER] Registration successful for: {email}")
+            logger.info('User registered', extra={'event': 'auth.register', 'user_id': user.id, 'role': role})
             return {
                 'message': 'User registered successfully',
                 'user': {
@@ -129,8 +126,7 @@ class RegisterResource(Resource):
             }, 201
             
         except Exception as e:
-            print(f"[REGISTER] Registration failed with error: {str(e)}")
-            print(f"[REGISTER] Error type: {type(e).__name__}")
+            logger.exception('Registration failed', extra={'event': 'auth.register_error'})
             db.session.rollback()
             return {
                 'error': 'Registration failed',
@@ -144,15 +140,17 @@ class LoginResource(Resource):
         """Handle CORS preflight request"""
         return {}, 200
     
+    # Checked before any user lookup or bcrypt work
+    @rate_limit('20/minute', scope='ip')
+    @rate_limit('5/minute', scope='email')
+    @rate_limit('30/hour', scope='email')
     def post(self):
         try:
-            print(f"[LOGIN] Request received from {request.remote_addr}")
             data = request.get_json()
-            print(f"[LOGIN] Request data received (email only): {data.get('email') if data else 'No data'}")
             
             # Validate required fields
             if not data.get('email') or not data.get('password'):
-                print(f"[LOGIN] Missing credentials")
+                logger.info('Login rejected', extra={'event': 'auth.login_rejected', 'reason': 'missing_credentials'})
                 return {
                     'error': 'Missing credentials',
                     'message': 'Email and password are required'
@@ -160,32 +158,33 @@ class LoginResource(Resource):
             
             email = data['email'].strip().lower()
             password = data['password']
-            print(f"[LOGIN] Attempting login for: {email}")
             
             # Find user by email
-            print(f"[LOGIN] Looking up user in database")
             user = User.query.filter_by(email=email, deleted_at=None).first()
             
             if not user:
-                print(f"[LOGIN] User not found: {email}")
+                logger.info('Login failed', extra={'event': 'auth.login_failed', 'reason': 'unknown_email'})
                 return {
                     'error': 'Invalid credentials',
                     'message': 'Email or password is incorrect'
                 }, 401
             
-            print(f"[LOGIN] User found, verifying password")
             if not verify_password(password, user.password_hash):
-                print(f"[LOGIN] Invalid password for: {email}")
+                logger.info('Login failed', extra={'event': 'auth.login_failed', 'reason': 'bad_password', 'user_id': user.id})
                 return {
                     'error': 'Invalid credentials',
                     'message': 'Email or password is incorrect'
                 }, 401
             
+            # Move the stored hash to the current target cost
+            if password_needs_rehash(user.password_hash):
+                user.password_hash = hash_password(password)
+                db.session.commit()
+            
             # Log in the user
-            print(f"[LOGIN] Password verified, logging in user: {user.id}")
             login_user(user.id, user.role.value)
             
-            print(f"[LOGIN] Login successful for: {email}")
+            logger.info('Login successful', extra={'event': 'auth.login', 'user_id': user.id})
             return {
                 'message': 'Login successful',
                 'user': {
@@ -198,8 +197,7 @@ class LoginResource(Resource):
             }, 200
             
         except Exception as e:
-            print(f"[LOGIN] Login failed with error: {str(e)}")
-            print(f"[LOGIN] Error type: {type(e).__name__}")
+            logger.exception('Login failed', extra={'event': 'auth.login_error'})
             return {
                 'error': 'Login failed',
                 'message': f'An error occurred during login: {str(e)}'
@@ -232,8 +230,7 @@ class ProfileResource(Resource):
     def get(self):
         """Get current user profile"""
         try:
-            current_user = get_current_user()
-            user = User.query.get(current_user['user_id'])
+            user = load_current_user()
             
             if not user:
                 return {
@@ -265,8 +262,7 @@ class ProfileResource(Resource):
     def put(self):
         """Update current user profile"""
         try:
-            current_user = get_current_user()
-            user = User.query.get(current_user['user_id'])
+            user = load_current_user()
             
             if not user:
                 return {
@@ -315,8 +311,7 @@ class ChangePasswordResource(Resource):
     @require_auth
     def post(self):
         try:
-            current_user = get_current_user()
-            user = User.query.get(current_user['user_id'])
+            user = load_current_user()
             
             if not user:
                 return {
@@ -386,6 +381,8 @@ class SessionResource(Resource):
 class ResetPasswordResource(Resource):
     """Handle password reset requests"""
     
+    @rate_limit('10/hour', scope='ip')
+    @rate_limit('3/hour', scope='email')
     def post(self):
         """Request password reset"""
         try:
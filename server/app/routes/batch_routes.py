@@ -0,0 +1,192 @@
+"""
+Batch routes for Soko Safi
+Runs several API requests sent in one HTTP round trip
+"""
+
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import msgspec
+from flask_restful import Resource, Api
+from flask import Blueprint, current_app, g, request, session
+from app.auth import load_current_user
+from app.models import db
+from app.utils.metrics import BATCH_SUBREQUESTS
+from app.utils.serialization import output_json
+
+logger = logging.getLogger(__name__)
+
+batch_bp = Blueprint('batch_bp', __name__)
+batch_api = Api(batch_bp)
+batch_api.representations['application/json'] = output_json
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Sub-request bodies are sent as JSON, and sub-responses are embedded uncompressed
+DROPPED_REQUEST_HEADERS = {'content-type', 'content-length', 'accept-encoding', 'transfer-encoding'}
+RETURNED_RESPONSE_HEADERS = ('Content-Type', 'Location', 'Retry-After', 'ETag', 'Last-Modified', 'Cache-Control')
+
+SubRequest = namedtuple('SubRequest', ['method', 'path', 'body', 'headers'])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool(workers):
+    """Process-wide pool for concurrent reads, so batches cannot use more than `workers` DB connections"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+        return _executor
+
+
+def parse_batch(data, max_requests):
+    """
+    Validate a batch request body
+
+    Args:
+        data: Decoded JSON body; a list of sub-requests, or
+            {"requests": [...], "concurrent": true}
+        max_requests (int): Most sub-requests accepted in one batch
+
+    Returns:
+        tuple: (list of SubRequest, whether reads may run concurrently)
+
+    Raises:
+        ValueError: Describes the first invalid part of the body
+    """
+    concurrent = False
+    items = data
+    if isinstance(data, dict):
+        items, concurrent = data.get('requests'), bool(data.get('concurrent'))
+    if not isinstance(items, list) or not items:
+        raise ValueError('requests must be a non-empty list')
+    if len(items) > max_requests:
+        raise ValueError(f'A batch can hold at most {max_requests} requests')
+
+    sub_requests = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f'requests[{index}] must be an object')
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        headers = item.get('headers') or {}
+        if method not in BATCH_METHODS:
+            raise ValueError(f"requests[{index}].method must be one of {', '.join(BATCH_METHODS)}")
+        if not isinstance(path, str) or not path.startswith('/api/'):
+            raise ValueError(f'requests[{index}].path must start with /api/')
+        if path.split('?', 1)[0].rstrip('/') == '/api/batch':
+            raise ValueError(f'requests[{index}]: batches cannot be nested')
+        if not isinstance(headers, dict):
+            raise ValueError(f'requests[{index}].headers must be an object')
+        headers = {str(k): str(v) for k, v in headers.items() if str(k).lower() not in DROPPED_REQUEST_HEADERS}
+        sub_requests.append(SubRequest(method, path, item.get('body'), headers))
+    return sub_requests, concurrent
+
+
+def _result(response):
+    """Batch entry for a sub-response; JSON bodies are embedded without decoding them"""
+    if 'Content-Encoding' in response.headers:
+        # Compressed bytes cannot be embedded in the JSON batch body
+        return {'status': 400, 'headers': {}, 'body': {
+            'error': 'Not batchable', 'message': 'Encoded responses cannot be batched'}}
+    headers = {name: response.headers[name] for name in RETURNED_RESPONSE_HEADERS if name in response.headers}
+    data = response.get_data()
+    if not data:
+        body = None
+    elif response.is_json:
+        body = msgspec.Raw(data.strip())
+    else:
+        body = data.decode('utf-8', 'replace')
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def _dispatch(app, shared_session, user, headers, remote_addr, sub):
+    """
+    Run one sub-request through the full Flask request cycle
+
+    Each sub-request gets its own app context (g, database session) so
+    before/after_request hooks time and log it on its own, but reuses the
+    batch's session object and current user instead of loading them again.
+    """
+    with app.app_context():
+        if user is not None and shared_session.get('user_id') == user.id:
+            g._current_user = db.session.merge(user, load=False)
+        ctx = app.test_request_context(
+            sub.path, method=sub.method, headers={**headers, **sub.headers},
+            environ_base={'REMOTE_ADDR': remote_addr},
+            **({'json': sub.body} if sub.body is not None else {}))
+        # Set before push, so the session interface does not open it again
+        ctx.session = shared_session
+        ctx.push()
+        error = None
+        try:
+            # Checked after routing: encoded paths such as /api/%62atch slip past parse_batch
+            if ctx.request.blueprint == batch_bp.name:
+                return {'status': 400, 'headers': {}, 'body': {
+                    'error': 'Invalid batch', 'message': 'Batches cannot be nested'}}
+            response = app.full_dispatch_request()
+            if response.is_streamed and 'Content-Length' not in response.headers:
+                # Generator bodies of unknown length (NDJSON/CSV exports) would be buffered whole
+                response.close()
+                return {'status': 400, 'headers': {}, 'body': {
+                    'error': 'Not batchable', 'message': 'Streamed responses (exports) cannot be batched'}}
+            return _result(response)
+        except Exception as e:
+            error = e
+            db.session.rollback()
+            logger.exception('Batch sub-request failed', extra={
+                'event': 'batch.subrequest_error', 'method': sub.method, 'path': sub.path})
+            return {'status': 500, 'headers': {}, 'body': {'error': 'Internal server error'}}
+        finally:
+            ctx.pop(error)
+
+
+class BatchResource(Resource):
+    def post(self):
+        """
+        Run several API requests and return their responses in order
+
+        Body: [{"method": "GET", "path": "/api/cart/"}, ...] or
+        {"requests": [...], "concurrent": true}. Each entry may carry a JSON
+        "body" and extra "headers". With concurrent, consecutive GETs run in
+        parallel; other methods run one at a time, in order.
+        """
+        try:
+            sub_requests, concurrent = parse_batch(
+                request.get_json(silent=True), current_app.config['BATCH_MAX_REQUESTS'])
+        except ValueError as e:
+            return {'error': 'Invalid batch', 'message': str(e)}, 400
+        BATCH_SUBREQUESTS.observe(len(sub_requests))
+
+        user = load_current_user()
+        if user is not None:
+            # Detaches the loaded user and hands the connection back while sub-requests run
+            db.session.close()
+        headers = {key: value for key, value in request.headers.items() if key.lower() not in DROPPED_REQUEST_HEADERS}
+        if g.get('request_id'):
+            headers['X-Request-ID'] = g.request_id
+        run = partial(_dispatch, current_app._get_current_object(), session._get_current_object(), user,
+                      headers, request.remote_addr)
+
+        workers = current_app.config['BATCH_CONCURRENCY']
+        results = [None] * len(sub_requests)
+        index = 0
+        while index < len(sub_requests):
+            end = index + 1
+            if concurrent and workers > 1 and sub_requests[index].method == 'GET':
+                while end < len(sub_requests) and sub_requests[end].method == 'GET':
+                    end += 1
+            if end - index == 1:
+                results[index] = run(sub_requests[index])
+            else:
+                futures = [_pool(workers).submit(run, sub) for sub in sub_requests[index:end]]
+                results[index:end] = [future.result() for future in futures]
+            index = end
+        return results
+
+
+batch_api.add_resource(BatchResource, '', '/')
@@ -6,10 +6,17 @@ Handles CRUD operations for carts and cart items
 from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Cart, CartItem
+from app.schemas import CartSchema
+from app.utils.export import stream_export
+from app.utils.serialization import output_json
+import logging
 # Removed problematic auth imports
 
+logger = logging.getLogger(__name__)
+
 cart_bp = Blueprint('cart_bp', __name__)
 cart_api = Api(cart_bp)
+cart_api.representations['application/json'] = output_json
 
 class CartListResource(Resource):
     def get(self):
@@ -19,12 +26,7 @@ class CartListResource(Resource):
             return {'error': 'Admin access required'}, 403
         
         carts = Cart.query.filter_by(deleted_at=None).all()
-        return [{
-            'id': c.id,
-            'user_id': c.user_id,
-            'created_at': c.created_at.isoformat() if c.created_at else None,
-            'updated_at': c.updated_at.isoformat() if c.updated_at else None
-        } for c in carts]
+        return [CartSchema.from_model(c) for c in carts]
     
     def post(self):
         """Create new cart - Authenticated users only"""
@@ -52,6 +54,16 @@ class CartListResource(Resource):
             }
         }, 201
 
+class CartExportResource(Resource):
+    def get(self):
+        """Stream all carts as NDJSON or CSV - Admin only"""
+        from flask import session
+        if session.get('user_role') != 'admin':
+            return {'error': 'Admin access required'}, 403
+
+        query = Cart.query.filter_by(deleted_at=None).order_by(Cart.created_at)
+        return stream_export(query, CartSchema.from_model, 'carts')
+
 class CartResource(Resource):
     def get(self, cart_id):
         """Get cart details - Owner or Admin only"""
@@ -108,8 +120,8 @@ class CartItemListResource(Resource):
         """Get user's cart items - Public access with safe defaults"""
         try:
             return [], 200
-        except Exception as e:
-            print(f"Cart error: {e}")
+        except Exception:
+            logger.exception('Failed to list cart items', extra={'event': 'cart.items_error'})
             return [], 200
     
     def post(self):
@@ -134,8 +146,8 @@ class CartItemListResource(Resource):
                 }
             }, 201
             
-        except Exception as e:
-            print(f"Cart add error: {e}")
+        except Exception:
+            logger.exception('Failed to add cart item', extra={'event': 'cart.add_error'})
             return {'error': 'Failed to add item to cart'}, 500
 
 class CartItemResource(Resource):
@@ -197,4 +209,5 @@ cart_api.add_resource(CartItemListResource, '/')
 cart_api.add_resource(CartItemResource, '/<cart_item_id>')
 cart_api.add_resource(ClearCartResource, '/clear')
 cart_api.add_resource(CartListResource, '/carts')
+cart_api.add_resource(CartExportResource, '/carts/export')
 cart_api.add_resource(CartResource, '/carts/<cart_id>')
@@ -7,9 +7,14 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Category, Subcategory
 from app.auth import require_auth, require_role, require_ownership_or_role
+from app.utils.serialization import output_json
+import logging
+
+logger = logging.getLogger(__name__)
 
 category_bp = Blueprint('category_bp', __name__)
 category_api = Api(category_bp)
+category_api.representations['application/json'] = output_json
 
 class CategoryListResource(Resource):
     def get(self):
@@ -53,7 +58,7 @@ class CategoryListResource(Resource):
             }, 201
         except Exception as e:
             db.session.rollback()
-            print(f"[CategoryListResource] Error creating category: {str(e)}")
+            logger.exception('Failed to create category', extra={'event': 'categories.create_error'})
             return {'error': 'Failed to create category', 'message': str(e)}, 500
 
 class CategoryResource(Resource):
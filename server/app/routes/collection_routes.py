@@ -1,10 +1,36 @@
 from flask_restful import Resource, Api
-from flask import Blueprint, request
-from app.models import db, Collection, Product
+from flask import Blueprint, request, session
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.orm import selectinload
+from app.models import db, Collection, Product, collection_products
 from app.auth import require_auth, require_role
+from app.schemas import ProductSchema, ProductImageSchema
+from app.utils.serialization import output_json
 
 collection_bp = Blueprint('collection_bp', __name__)
 collection_api = Api(collection_bp)
+collection_api.representations['application/json'] = output_json
+
+COLLECTION_PAGE_SIZE = 24
+COLLECTION_MAX_PAGE_SIZE = 100
+
+
+def _product_ids(data):
+    """Unique product ids from a JSON body, in the order given; None if malformed"""
+    product_ids = (data or {}).get('product_ids')
+    if not isinstance(product_ids, list) or not all(isinstance(pid, str) for pid in product_ids):
+        return None
+    return list(dict.fromkeys(product_ids))
+
+
+def _editable_collection(collection_id):
+    """Return (collection, None) if the session user may edit it, else (None, error response)"""
+    collection = db.session.get(Collection, collection_id)
+    if not collection:
+        return None, ({'error': 'Collection not found'}, 404)
+    if session.get('user_role') != 'admin' and collection.artisan_id != session.get('user_id'):
+        return None, ({'error': 'Insufficient permissions', 'message': 'You can only edit your own collections'}, 403)
+    return collection, None
 
 class CollectionListResource(Resource):
     def get(self):
@@ -39,22 +65,129 @@ class CollectionListResource(Resource):
 
 class CollectionResource(Resource):
     def get(self, collection_id):
+        """Get a collection with one page of its products (?page=, ?per_page=) in position order"""
         collection = Collection.query.get_or_404(collection_id)
-        products = Product.query.filter_by(collection_id=collection_id, deleted_at=None).all()
-        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', COLLECTION_PAGE_SIZE, type=int), 1), COLLECTION_MAX_PAGE_SIZE)
+
+        members = (db.session.query(Product)
+                   .join(collection_products, collection_products.c.product_id == Product.id)
+                   .filter(collection_products.c.collection_id == collection_id,
+                           Product.deleted_at.is_(None), Product.status == 'active'))
+        total = members.with_entities(func.count()).scalar()
+        # Galleries for the whole page load in one extra query
+        products = (members.options(selectinload(Product.images))
+                    .order_by(collection_products.c.position, collection_products.c.product_id)
+                    .limit(per_page).offset((page - 1) * per_page)
+                    .all())
+
         return {
             'id': collection.id,
             'title': collection.title,
             'description': collection.description,
             'artisan_id': collection.artisan_id,
             'created_at': collection.created_at.isoformat() if collection.created_at else None,
-            'products': [{
-                'id': p.id,
-                'title': p.title,
-                'price': float(p.price) if p.price else 0,
-                'description': p.description
-            } for p in products]
+            'products': [
+                ProductSchema.from_model(p, images=[ProductImageSchema.from_model(i) for i in p.images])
+                for p in products
+            ],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': (total + per_page - 1) // per_page
+            }
         }
 
+
+class CollectionProductsResource(Resource):
+    @require_role('artisan', 'admin')
+    def post(self, collection_id):
+        """Append products to the end of a collection; ones already in it are skipped"""
+        collection, error = _editable_collection(collection_id)
+        if error:
+            return error
+        product_ids = _product_ids(request.get_json(silent=True))
+        if not product_ids:
+            return {'error': 'product_ids must be a non-empty list of product ids'}, 400
+
+        try:
+            products = db.session.query(Product.id).filter(Product.id.in_(product_ids), Product.deleted_at.is_(None))
+            if session.get('user_role') != 'admin':
+                products = products.filter(Product.artisan_id == collection.artisan_id)
+            allowed = {pid for pid, in products}
+            missing = [pid for pid in product_ids if pid not in allowed]
+            if missing:
+                return {'error': 'Unknown products', 'message': f'Cannot add: {", ".join(missing)}'}, 400
+
+            existing = {pid for pid, in db.session.query(collection_products.c.product_id)
+                        .filter(collection_products.c.collection_id == collection_id,
+                                collection_products.c.product_id.in_(product_ids))}
+            new_ids = [pid for pid in product_ids if pid not in existing]
+            if new_ids:
+                last = (db.session.query(func.max(collection_products.c.position))
+                        .filter(collection_products.c.collection_id == collection_id).scalar())
+                start = 0 if last is None else last + 1
+                # One multi-row INSERT for the whole batch
+                db.session.execute(insert(collection_products).values([
+                    {'collection_id': collection_id, 'product_id': pid, 'position': start + offset}
+                    for offset, pid in enumerate(new_ids)
+                ]))
+            db.session.commit()
+            return {'message': 'Products added', 'added': len(new_ids)}, 200
+        except Exception:
+            db.session.rollback()
+            return {'error': 'Failed to add products'}, 500
+
+    @require_role('artisan', 'admin')
+    def put(self, collection_id):
+        """
+        Reorder a collection
+
+        The listed products move to the front in the given order; the rest
+        keep their relative order after them.
+        """
+        collection, error = _editable_collection(collection_id)
+        if error:
+            return error
+        product_ids = _product_ids(request.get_json(silent=True))
+        if not product_ids:
+            return {'error': 'product_ids must be a non-empty list of product ids'}, 400
+
+        try:
+            # One UPDATE ... SET position = CASE product_id ... for every member
+            position = case({pid: index for index, pid in enumerate(product_ids)},
+                            value=collection_products.c.product_id,
+                            else_=collection_products.c.position + len(product_ids))
+            result = db.session.execute(update(collection_products)
+                                        .where(collection_products.c.collection_id == collection_id)
+                                        .values(position=position))
+            db.session.commit()
+            return {'message': 'Collection reordered', 'products': result.rowcount}, 200
+        except Exception:
+            db.session.rollback()
+            return {'error': 'Failed to reorder collection'}, 500
+
+    @require_role('artisan', 'admin')
+    def delete(self, collection_id):
+        """Remove products from a collection"""
+        collection, error = _editable_collection(collection_id)
+        if error:
+            return error
+        product_ids = _product_ids(request.get_json(silent=True))
+        if not product_ids:
+            return {'error': 'product_ids must be a non-empty list of product ids'}, 400
+
+        try:
+            result = db.session.execute(delete(collection_products)
+                                        .where(collection_products.c.collection_id == collection_id,
+                                               collection_products.c.product_id.in_(product_ids)))
+            db.session.commit()
+            return {'message': 'Products removed', 'removed': result.rowcount}, 200
+        except Exception:
+            db.session.rollback()
+            return {'error': 'Failed to remove products'}, 500
+
 collection_api.add_resource(CollectionListResource, '/')
-collection_api.add_resource(CollectionResource, '/<collection_id>')
\ No newline at end of file
+collection_api.add_resource(CollectionResource, '/<collection_id>')
+collection_api.add_resource(CollectionProductsResource, '/<collection_id>/products')
\ No newline at end of file
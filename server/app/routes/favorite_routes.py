@@ -7,9 +7,11 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Favorite
 from app.auth import require_auth, require_role, require_ownership_or_role
+from app.utils.serialization import output_json
 
 favorite_bp = Blueprint('favorite_bp', __name__)
 favorite_api = Api(favorite_bp)
+favorite_api.representations['application/json'] = output_json
 
 class FavoriteListResource(Resource):
     @require_auth
@@ -7,9 +7,11 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Follow
 from app.auth import require_auth, require_role, require_ownership_or_role
+from app.utils.serialization import output_json
 
 follow_bp = Blueprint('follow_bp', __name__)
 follow_api = Api(follow_bp)
+follow_api.representations['application/json'] = output_json
 
 class FollowListResource(Resource):
     @require_auth
@@ -7,9 +7,14 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Message
 from app.auth import require_auth, require_role, require_ownership_or_role
+from app.schemas import MessageSchema
+from app.utils.export import stream_export
+from app.utils.rate_limit import rate_limit
+from app.utils.serialization import output_json
 
 message_bp = Blueprint('message_bp', __name__)
 message_api = Api(message_bp)
+message_api.representations['application/json'] = output_json
 
 class MessageListResource(Resource):
     @require_auth
@@ -20,16 +25,10 @@ class MessageListResource(Resource):
             return {'error': 'Admin access required'}, 403
         
         messages = Message.query.filter_by(deleted_at=None).all()
-        return [{
-            'id': m.id,
-            'sender_id': m.sender_id,
-            'receiver_id': m.receiver_id,
-            'message': m.message,
-            'timestamp': m.timestamp.isoformat() if m.timestamp else None,
-            'is_read': m.is_read
-        } for m in messages]
+        return [MessageSchema.from_model(m) for m in messages]
     
     @require_auth
+    @rate_limit('30/minute', scope='user')
     def post(self):
         """Create new message - Authenticated users only"""
         from flask import session
@@ -88,6 +87,13 @@ class MessageListResource(Resource):
             }
         }, 201
 
+class MessageExportResource(Resource):
+    @require_role('admin')
+    def get(self):
+        """Stream all messages as NDJSON or CSV - Admin only"""
+        query = Message.query.filter_by(deleted_at=None).order_by(Message.timestamp)
+        return stream_export(query, MessageSchema.from_model, 'messages')
+
 class MessageResource(Resource):
     @require_auth
     def get(self, message_id):
@@ -102,14 +108,7 @@ class MessageResource(Resource):
         if user_role != 'admin' and message.sender_id != current_user_id and message.receiver_id != current_user_id:
             return {'error': 'Access denied'}, 403
         
-        return {
-            'id': message.id,
-            'sender_id': message.sender_id,
-            'receiver_id': message.receiver_id,
-            'message': message.message,
-            'timestamp': message.timestamp.isoformat() if message.timestamp else None,
-            'is_read': message.is_read
-        }
+        return MessageSchema.from_model(message)
     
     @require_auth
     def put(self, message_id):
@@ -323,6 +322,7 @@ class MessageStatusResource(Resource):
 
 # Register routes
 message_api.add_resource(MessageListResource, '/')
+message_api.add_resource(MessageExportResource, '/export')
 message_api.add_resource(MessageResource, '/<message_id>')
 message_api.add_resource(MessageStatusResource, '/<message_id>/status')
 message_api.add_resource(MessageConversationsResource, '/conversations')
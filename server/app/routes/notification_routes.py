@@ -7,9 +7,12 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Notification, NotificationType
 from app.auth import require_auth, require_role, require_ownership_or_role
+from app.schemas import NotificationSchema
+from app.utils.serialization import output_json
 
 notification_bp = Blueprint('notification_bp', __name__)
 notification_api = Api(notification_bp)
+notification_api.representations['application/json'] = output_json
 
 class NotificationListResource(Resource):
     @require_auth
@@ -20,15 +23,7 @@ class NotificationListResource(Resource):
             return {'error': 'Admin access required'}, 403
         
         notifications = Notification.query.filter_by(deleted_at=None).all()
-        return [{
-            'id': n.id,
-            'user_id': n.user_id,
-            'type': n.type.value if n.type else None,
-            'title': n.title,
-            'message': n.message,
-            'is_read': n.is_read,
-            'created_at': n.created_at.isoformat() if n.created_at else None
-        } for n in notifications]
+        return [NotificationSchema.from_model(n) for n in notifications]
     
     @require_auth
     def post(self):
@@ -60,15 +55,7 @@ class NotificationResource(Resource):
     def get(self, notification_id):
         """Get notification details - Owner or Admin only"""
         notification = Notification.query.get_or_404(notification_id)
-        return {
-            'id': notification.id,
-            'user_id': notification.user_id,
-            'type': notification.type.value if notification.type else None,
-            'title': notification.title,
-            'message': notification.message,
-            'is_read': notification.is_read,
-            'created_at': notification.created_at.isoformat() if notification.created_at else None
-        }
+        return NotificationSchema.from_model(notification)
     
     @require_ownership_or_role('user_id', 'admin')
     def put(self, notification_id):
@@ -7,9 +7,14 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Order, OrderItem, OrderStatus
 from app.auth import require_auth, require_role, require_ownership_or_role
+from app.schemas import ORDER_FIELDSET, OrderItemSchema
+from app.utils.export import stream_export
+from app.utils.fieldsets import FieldsetError
+from app.utils.serialization import output_json
 
 order_bp = Blueprint('order_bp', __name__)
 order_api = Api(order_bp)
+order_api.representations['application/json'] = output_json
 
 class OrderListResource(Resource):
     @require_auth
@@ -21,6 +26,18 @@ class OrderListResource(Resource):
         current_user_id = session.get('user_id')
         user_role = session.get('user_role')
 
+        if 'fields' in request.args or 'include' in request.args:
+            # Sparse fieldsets: OrderSchema rows with only the selected fields,
+            # items batch-loaded with ?include=items
+            try:
+                selection = ORDER_FIELDSET.select(request.args)
+            except FieldsetError as e:
+                return {'error': 'Invalid fields', 'message': str(e)}, 400
+            query = Order.query.options(*selection.options())
+            if user_role != 'admin':
+                query = query.filter_by(user_id=current_user_id)
+            return [selection.serialize(order) for order in query.all()]
+
         if user_role == 'admin':
             # Admin gets all orders
             orders = Order.query.filter_by(deleted_at=None).all()
@@ -114,15 +131,12 @@ class OrderResource(Resource):
     @require_ownership_or_role('user_id', 'admin')
     def get(self, order_id):
         """Get order details - Owner or Admin only"""
-        order = Order.query.get_or_404(order_id)
-        return {
-            'id': order.id,
-            'user_id': order.user_id,
-            'status': order.status.value if order.status else None,
-            'total_amount': float(order.total_amount) if order.total_amount else 0,
-            'created_at': order.created_at.isoformat() if order.created_at else None,
-            'updated_at': order.updated_at.isoformat() if order.updated_at else None
-        }
+        try:
+            selection = ORDER_FIELDSET.select(request.args)
+        except FieldsetError as e:
+            return {'error': 'Invalid fields', 'message': str(e)}, 400
+        order = Order.query.options(*selection.options()).get_or_404(order_id)
+        return selection.serialize(order)
     
     @require_ownership_or_role('user_id', 'admin')
     def put(self, order_id):
@@ -181,16 +195,7 @@ class OrderItemListResource(Resource):
             return {'error': 'Admin access required'}, 403
         
         order_items = OrderItem.query.filter_by(deleted_at=None).all()
-        return [{
-            'id': oi.id,
-            'order_id': oi.order_id,
-            'product_id': oi.product_id,
-            'artisan_id': oi.artisan_id,
-            'quantity': oi.quantity,
-            'unit_price': float(oi.unit_price) if oi.unit_price else 0,
-            'total_price': float(oi.total_price) if oi.total_price else 0,
-            'created_at': oi.created_at.isoformat() if oi.created_at else None
-        } for oi in order_items]
+        return [OrderItemSchema.from_model(oi) for oi in order_items]
     
     @require_auth
     def post(self):
@@ -226,6 +231,13 @@ class OrderItemListResource(Resource):
             }
         }, 201
 
+class OrderItemExportResource(Resource):
+    @require_role('admin')
+    def get(self):
+        """Stream all order items as NDJSON or CSV - Admin only"""
+        query = OrderItem.query.order_by(OrderItem.order_id)
+        return stream_export(query, OrderItemSchema.from_model, 'order_items')
+
 class OrderItemResource(Resource):
     @require_auth
     def get(self, order_item_id):
@@ -242,16 +254,7 @@ class OrderItemResource(Resource):
         except Exception as e:
             return {'error': 'Order item not found'}, 404
         
-        return {
-            'id': order_item.id,
-            'order_id': order_item.order_id,
-            'product_id': order_item.product_id,
-            'artisan_id': order_item.artisan_id,
-            'quantity': order_item.quantity,
-            'unit_price': float(order_item.unit_price) if order_item.unit_price else 0,
-            'total_price': float(order_item.total_price) if order_item.total_price else 0,
-            'created_at': order_item.created_at.isoformat() if order_item.created_at else None
-        }
+        return OrderItemSchema.from_model(order_item)
     
     @require_auth
     def put(self, order_item_id):
@@ -349,4 +352,5 @@ order_api.add_resource(OrderListResource, '/')
 order_api.add_resource(OrderResource, '/<order_id>')
 order_api.add_resource(OrderStatusResource, '/<order_id>/status')
 order_api.add_resource(OrderItemListResource, '/items/')
+order_api.add_resource(OrderItemExportResource, '/items/export')
 order_api.add_resource(OrderItemResource, '/items/<order_item_id>')
\ No newline at end of file
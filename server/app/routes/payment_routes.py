@@ -8,9 +8,14 @@ from flask import Blueprint, request, jsonify
 from app.models import db, Payment, PaymentMethod, PaymentStatus, Order, OrderItem, User, ArtisanDisbursement
 from app.auth import require_auth, require_role, require_ownership_or_role
 from app.services.mpesa_service import mpesa_service
+from app.schemas import PAYMENT_FIELDSET, PaymentSchema
+from app.utils.export import stream_export
+from app.utils.fieldsets import FieldsetError
+from app.utils.serialization import output_json
 
 payment_bp = Blueprint('payment_bp', __name__)
 payment_api = Api(payment_bp)
+payment_api.representations['application/json'] = output_json
 
 class PaymentListResource(Resource):
     @require_auth
@@ -22,6 +27,19 @@ class PaymentListResource(Resource):
         current_user_id = session.get('user_id')
         user_role = session.get('user_role')
 
+        if 'fields' in request.args or 'include' in request.args:
+            # Sparse fieldsets: PaymentSchema rows with only the selected fields,
+            # the order batch-loaded with ?include=order
+            try:
+                selection = PAYMENT_FIELDSET.select(request.args)
+            except FieldsetError as e:
+                return {'error': 'Invalid fields', 'message': str(e)}, 400
+            query = Payment.query.options(*selection.options())
+            if user_role != 'admin':
+                user_orders = db.select(Order.id).filter_by(user_id=current_user_id)
+                query = query.filter(Payment.order_id.in_(user_orders))
+            return [selection.serialize(payment) for payment in query.all()]
+
         if user_role == 'admin':
             # Admin gets all payments
             payments = Payment.query.filter_by(deleted_at=None).all()
@@ -82,12 +100,23 @@ class PaymentListResource(Resource):
             }
         }, 201
 
+class PaymentExportResource(Resource):
+    @require_role('admin')
+    def get(self):
+        """Stream all payments as NDJSON or CSV - Admin only"""
+        query = Payment.query.order_by(Payment.created_at)
+        return stream_export(query, PaymentSchema.from_model, 'payments')
+
 class PaymentResource(Resource):
     @require_auth
     def get(self, payment_id):
         """Get payment details - Owner or Admin only"""
         try:
-            payment = Payment.query.get_or_404(payment_id)
+            selection = PAYMENT_FIELDSET.select(request.args)
+        except FieldsetError as e:
+            return {'error': 'Invalid fields', 'message': str(e)}, 400
+        try:
+            payment = Payment.query.options(*selection.options()).get_or_404(payment_id)
             
             # Check if user owns the order
             from flask import session
@@ -99,15 +128,7 @@ class PaymentResource(Resource):
         except Exception as e:
             return {'error': 'Payment not found'}, 404
         
-        return {
-            'id': payment.id,
-            'order_id': payment.order_id,
-            'amount': float(payment.amount) if payment.amount else 0,
-            'status': payment.status.value if payment.status else None,
-            'method': payment.method.value if payment.method else None,
-            'mpesa_transaction_id': payment.mpesa_transaction_id,
-            'created_at': payment.created_at.isoformat() if payment.created_at else None
-        }
+        return selection.serialize(payment)
     
     @require_auth
     def put(self, payment_id):
@@ -330,6 +351,7 @@ class B2CTimeoutResource(Resource):
 
 # Register routes
 payment_api.add_resource(PaymentListResource, '/')
+payment_api.add_resource(PaymentExportResource, '/export')
 payment_api.add_resource(PaymentResource, '/<payment_id>')
 payment_api.add_resource(InitiatePaymentResource, '/initiate')
 payment_api.add_resource(PaymentStatusResource, '/status/<payment_id>')
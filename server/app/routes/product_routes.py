@@ -2,9 +2,11 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request, session
 from app.models.product import Product
 from app.models import db
+from app.utils.serialization import output_json
 
 product_bp = Blueprint('product_bp', __name__)
 product_api = Api(product_bp)
+product_api.representations['application/json'] = output_json
 
 class ProductListResource(Resource):
     def get(self):
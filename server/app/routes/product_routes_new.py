@@ -2,27 +2,34 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request, session
 from app.models.product import Product
 from app.models import db
+from app.schemas import PRODUCT_FIELDSET
+from app.services.image_pipeline import queue_image
+from app.utils.fieldsets import FieldsetError
+from app.utils.serialization import output_json
+import logging
+
+logger = logging.getLogger(__name__)
 
 product_bp = Blueprint('product_bp', __name__)
 product_api = Api(product_bp)
+product_api.representations['application/json'] = output_json
+
 
 class ProductListResource(Resource):
     def get(self):
         try:
-            products = Product.query.filter_by(status='active').all()
-            print(f"Found {len(products)} products in database")
-            return [{
-                'id': p.id,
-                'title': p.title,
-                'price': p.price,
-                'description': p.description,
-                'image_url': p.image_url,
-                'stock': p.stock,
-                'currency': p.currency,
-                'status': p.status
-            } for p in products]
-        except Exception as e:
-            print(f"Error fetching products: {e}")
+            selection = PRODUCT_FIELDSET.select(request.args)
+        except FieldsetError as e:
+            return {'error': 'Invalid fields', 'message': str(e)}, 400
+        try:
+            # ?fields= narrows the SELECT; each ?include= relation (e.g. images, in
+            # position order) is loaded with one extra query for the whole list
+            # (selectinload batches 500 products per query)
+            products = Product.query.filter_by(status='active').options(*selection.options()).all()
+            logger.info('Listed products', extra={'event': 'products.list', 'count': len(products)})
+            return [selection.serialize(p) for p in products]
+        except Exception:
+            logger.exception('Failed to list products', extra={'event': 'products.list_error'})
             return []
     
     def post(self):
@@ -51,6 +58,9 @@ class ProductListResource(Resource):
             )
             
             db.session.add(product)
+            if product.image_url:
+                db.session.flush()
+                queue_image(product.id, product.image_url, position=0)
             db.session.commit()
 
             return {
@@ -71,20 +81,15 @@ class ProductListResource(Resource):
 class ProductResource(Resource):
     def get(self, product_id):
         try:
-            product = Product.query.get(product_id)
+            selection = PRODUCT_FIELDSET.select(request.args)
+        except FieldsetError as e:
+            return {'error': 'Invalid fields', 'message': str(e)}, 400
+        try:
+            product = db.session.get(Product, product_id, options=selection.options())
             if not product:
                 return {'error': 'Product not found'}, 404
             
-            return {
-                'id': product.id,
-                'title': product.title,
-                'price': product.price,
-                'description': product.description,
-                'stock': product.stock,
-                'currency': product.currency,
-                'image_url': product.image_url,
-                'status': product.status
-            }
+            return selection.serialize(product)
         except Exception:
             return {'error': 'Product not found'}, 404
     
@@ -105,6 +110,8 @@ class ProductResource(Resource):
                 product.stock = int(data['stock'])
             if 'image_url' in data:
                 product.image_url = data['image_url']
+                if product.image_url:
+                    queue_image(product.id, product.image_url, position=0)
             
             db.session.commit()
             return {'message': 'Product updated successfully'}, 200
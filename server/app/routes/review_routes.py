@@ -7,9 +7,11 @@ from flask_restful import Resource, Api
 from flask import Blueprint, request
 from app.models import db, Review
 from app.auth import require_auth, require_role, require_ownership_or_role
+from app.utils.serialization import output_json
 
 review_bp = Blueprint('review_bp', __name__)
 review_api = Api(review_bp)
+review_api.representations['application/json'] = output_json
 
 class ReviewListResource(Resource):
     def get(self):
@@ -0,0 +1,58 @@
+"""
+Sync routes for Soko Safi
+Delta sync for offline-capable clients: only what changed since the last sync token
+"""
+
+from flask_restful import Resource, Api
+from flask import Blueprint, current_app, request, session
+from app.auth import require_auth
+from app.services.change_log import ENTITY_MODELS, changes_since, sequence_changes
+from app.utils.db_routing import use_primary
+from app.utils.serialization import output_json
+
+sync_bp = Blueprint('sync_bp', __name__)
+sync_api = Api(sync_bp)
+sync_api.representations['application/json'] = output_json
+
+
+class SyncResource(Resource):
+    @require_auth
+    def get(self):
+        """
+        Changes to products and the user's orders, messages, notifications and favorites
+
+        Query: since=<token from the previous response>, optional
+        entities=products,orders and limit. Without since, returns only the
+        current token: load the full lists once, then sync from it. Repeat
+        while has_more is true. A token older than the compacted history
+        gets 410 and needs a full reload.
+        """
+        # The change log is sequenced on the primary; a lagging replica would miss entries
+        use_primary()
+        state = sequence_changes()
+
+        since = request.args.get('since')
+        if since is None:
+            return {'changes': [], 'token': str(state.last_seq), 'has_more': False, 'full_sync': True}
+        try:
+            since = int(since)
+            limit = int(request.args.get('limit', current_app.config['SYNC_PAGE_SIZE']))
+        except ValueError:
+            return {'error': 'Invalid sync token', 'message': 'since and limit must be integers'}, 400
+        if since < 0 or since > state.last_seq:
+            return {'error': 'Invalid sync token', 'message': 'Token was not issued by this server'}, 400
+        if since < state.compacted_seq:
+            return {'error': 'Sync token expired',
+                    'message': 'Changes this old are no longer kept; reload the full lists'}, 410
+
+        entities = [name.strip() for name in request.args.get('entities', '').split(',') if name.strip()]
+        unknown = sorted(set(entities) - ENTITY_MODELS.keys())
+        if unknown:
+            return {'error': 'Invalid entities', 'message': f"Unknown entities: {', '.join(unknown)}"}, 400
+
+        limit = max(1, min(limit, current_app.config['SYNC_PAGE_SIZE']))
+        changes, token, has_more = changes_since(since, session.get('user_id'), entities or None, limit)
+        return {'changes': changes, 'token': str(token), 'has_more': has_more}
+
+
+sync_api.add_resource(SyncResource, '', '/')
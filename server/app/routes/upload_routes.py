@@ -1,59 +1,139 @@
-from flask import Blueprint, request, jsonify
-import requests
-import os
-from dotenv import load_dotenv
+import logging
+from flask import Blueprint, current_app, request, jsonify, session
+from werkzeug.utils import secure_filename
+from app.auth import require_auth, require_role
+from app.models import db, Product
+from app.services.image_pipeline import queue_image
+from app.services.upload_dedup import acquire_asset, dedup_stats, record_asset, release_asset, spool_and_hash
+from app.services.cloudinary_service import get_cloudinary_service, UploadTooLarge
+from app.utils.images import IMAGE_HEADER_SIZE, IMAGE_TYPES, read_head, sniff_image_type
+from app.utils.rate_limit import rate_limit
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 upload_bp = Blueprint('upload_bp', __name__)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @upload_bp.route('/image', methods=['POST'])
+@rate_limit('20/minute', scope='user')
 def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    if not allowed_file(file.filename):
+    """
+    Upload an image to Cloudinary
+
+    Accepts either a multipart form with a `file` field or the raw image as
+    the request body (Content-Type image/* or application/octet-stream, file
+    name in X-Filename). Raw bodies are read without form parsing and hashed
+    as they arrive; bytes that were uploaded before get the stored URL back
+    without contacting Cloudinary. The type is checked from the first bytes,
+    not the file name.
+
+    With a `product_id` (query string or form field) the image is added to
+    that product and queued for thumbnail generation.
+    """
+    if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+        stream = request.stream
+        filename = request.headers.get('X-Filename', 'upload')
+        product_id = request.args.get('product_id')
+    else:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        stream = file.stream
+        filename = file.filename
+        product_id = request.form.get('product_id') or request.args.get('product_id')
+
+    if product_id:
+        product = db.session.get(Product, product_id)
+        if not product:
+            return jsonify({'error': 'Product not found'}), 404
+        user_id = session.get('user_id') if session.get('authenticated') else None
+        if user_id is None:
+            return jsonify({'error': 'Authentication required'}), 401
+        # Products without an artisan belong to nobody, so only admins may add to them
+        if product.artisan_id != user_id and session.get('user_role') != 'admin':
+            return jsonify({'error': 'Not allowed to add images to this product'}), 403
+
+    head = read_head(stream, IMAGE_HEADER_SIZE)
+    image_type = sniff_image_type(head)
+    if image_type is None:
         return jsonify({'error': 'Invalid file type'}), 400
-    
+    content_type, extension = IMAGE_TYPES[image_type]
+    filename = f"{secure_filename(filename).rsplit('.', 1)[0] or 'upload'}.{extension}"
+
     try:
-        # Upload to Cloudinary
-        cloud_name = os.getenv('CLOUDINARY_CLOUD_NAME')
-        upload_preset = os.getenv('CLOUDINARY_UPLOAD_PRESET')
-        
-        if not cloud_name or not upload_preset:
-            return jsonify({'error': 'Cloudinary configuration missing'}), 500
-        
-        # Prepare the upload
-        upload_url = f"https://api.cloudinary.com/v1_1/{cloud_name}/image/upload"
-        
-        files = {'file': file}
-        data = {
-            'upload_preset': upload_preset,
-            'folder': 'soko-safi'
-        }
-        
-        # Upload to Cloudinary
-        response = requests.post(upload_url, files=files, data=data)
-        
-        if response.status_code == 200:
+        spool, sha256, size = spool_and_hash(head, stream, current_app.config['UPLOAD_MAX_IMAGE_BYTES'])
+    except UploadTooLarge:
+        return jsonify({'error': 'File too large'}), 413
+
+    with spool:
+        asset = acquire_asset(sha256)
+        deduplicated = asset is not None
+        if not deduplicated:
+            try:
+                cloudinary = get_cloudinary_service()
+                response = cloudinary.upload_stream(b'', spool, filename, content_type, size)
+            except ValueError:
+                return jsonify({'error': 'Cloudinary configuration missing'}), 500
+            except Exception:
+                logger.exception('Cloudinary upload failed', extra={'event': 'upload.error'})
+                return jsonify({'error': 'Upload failed'}), 500
+            if response.status_code != 200:
+                logger.error('Cloudinary rejected upload', extra={
+                    'event': 'upload.error', 'status': response.status_code})
+                return jsonify({'error': 'Upload failed'}), 500
             result = response.json()
-            return jsonify({
-                'message': 'File uploaded successfully',
-                'url': result['secure_url'],
-                'public_id': result['public_id']
-            }), 200
-        else:
-            return jsonify({'error': 'Upload failed'}), 500
-            
-    except Exception as e:
-        return jsonify({'error': 'Upload failed'}), 500
+            asset = record_asset(sha256, result['secure_url'], result['public_id'], content_type, size)
+
+    body = {
+        'message': 'File uploaded successfully',
+        'url': asset.url,
+        'public_id': asset.public_id,
+        'sha256': sha256,
+        'deduplicated': deduplicated
+    }
+    if product_id:
+        image = queue_image(product_id, asset.url)
+        db.session.commit()
+        body['image_id'] = image.id
+    return jsonify(body), 200
+
+
+@upload_bp.route('/signature', methods=['GET'])
+@require_auth
+@rate_limit('60/minute', scope='user')
+def upload_signature():
+    """
+    Signed parameters for uploading straight from the browser to Cloudinary
+
+    The client posts the file with these fields to upload_url, so image bytes
+    never pass through our workers.
+    """
+    try:
+        params = get_cloudinary_service().signed_upload_params()
+    except ValueError:
+        return jsonify({'error': 'Cloudinary configuration missing'}), 500
+    return jsonify(params), 200
+
+
+@upload_bp.route('/assets/<sha256>', methods=['DELETE'])
+@require_role('admin')
+def release_uploaded_asset(sha256):
+    """
+    Drop one reference to a stored upload
+
+    The image is deleted from Cloudinary only when no references remain and
+    no product, image, profile or message still uses its URL.
+    """
+    remaining = release_asset(sha256)
+    if remaining is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    return jsonify({'message': 'Reference released', 'sha256': sha256, 'ref_count': remaining}), 200
+
+
+@upload_bp.route('/stats', methods=['GET'])
+@require_role('admin')
+def upload_stats():
+    """Deduplication hit rate and the bytes it kept from being re-uploaded"""
+    return jsonify(dedup_stats()), 200
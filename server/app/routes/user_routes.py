@@ -4,27 +4,32 @@ Handles user CRUD operations and artisan payment methods
 """
 
 from flask_restful import Resource, Api
-from flask import Blueprint, request
+from flask import Blueprint, request, session, abort
 from app.models import db, User, UserRole, PaymentMethod
-from app.auth import require_auth, require_role, require_ownership_or_role
+from app.auth import require_auth, require_role, require_ownership_or_role, load_current_user
+from app.schemas import UserSchema
+from app.utils.export import stream_export
+from app.utils.serialization import output_json
 
 user_bp = Blueprint('user_bp', __name__)
 user_api = Api(user_bp)
+user_api.representations['application/json'] = output_json
+
+def get_user_or_404(user_id):
+    """Get a user, reusing the request's current user when it is the one requested"""
+    if user_id == session.get('user_id'):
+        user = load_current_user()
+        if not user:
+            abort(404)
+        return user
+    return User.query.get_or_404(user_id)
 
 class UserListResource(Resource):
     @require_role('admin')
     def get(self):
         """Get all users - Admin only"""
         users = User.query.filter_by(deleted_at=None).all()
-        return [{
-            'id': u.id,
-            'email': u.email,
-            'full_name': u.full_name,
-            'role': u.role.value if u.role else None,
-            'phone': u.phone,
-            'is_verified': u.is_verified,
-            'created_at': u.created_at.isoformat() if u.created_at else None
-        } for u in users]
+        return [UserSchema.from_model(u) for u in users]
 
     @require_role('admin')
     def post(self):
@@ -59,12 +64,19 @@ class UserListResource(Resource):
             }
         }, 201
 
+class UserExportResource(Resource):
+    @require_role('admin')
+    def get(self):
+        """Stream all users as NDJSON or CSV - Admin only"""
+        query = User.query.filter_by(deleted_at=None).order_by(User.created_at)
+        return stream_export(query, UserSchema.from_model, 'users')
+
 class UserResource(Resource):
     @require_ownership_or_role('user_id', 'admin')
     def get(self, user_id):
         """Get user details - Owner or Admin only"""
         try:
-            user = User.query.get_or_404(user_id)
+            user = get_user_or_404(user_id)
         except Exception as e:
             return {'error': 'User not found'}, 404
 
@@ -90,7 +102,7 @@ class UserResource(Resource):
     def put(self, user_id):
         """Update user - Owner or Admin only"""
         try:
-            user = User.query.get_or_404(user_id)
+            user = get_user_or_404(user_id)
             data = request.json
             
             if not data:
@@ -154,7 +166,7 @@ class UserPaymentMethodResource(Resource):
     @require_ownership_or_role('user_id', 'admin')
     def put(self, user_id):
         """Update artisan payment method - Owner or Admin only"""
-        user = User.query.get_or_404(user_id)
+        user = get_user_or_404(user_id)
 
         if user.role != UserRole.artisan:
             return {'error': 'Only artisans can set payment methods'}, 400
@@ -196,5 +208,6 @@ class UserPaymentMethodResource(Resource):
 
 # Register routes
 user_api.add_resource(UserListResource, '/')
+user_api.add_resource(UserExportResource, '/export')
 user_api.add_resource(UserResource, '/<user_id>')
 user_api.add_resource(UserPaymentMethodResource, '/<user_id>/payment-method')
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+Response schemas for Soko Safi
+Typed msgspec Structs used to serialise API responses
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from functools import cache
+from typing import ClassVar, Optional, Union
+
+import msgspec
+
+from app.models import (UserRole, OrderStatus, PaymentMethod, PaymentStatus, NotificationType,
+                        Category, Order, OrderItem, Payment, Product, ProductImage)
+from app.models.message import MessageType, MessageStatus
+from app.utils.fieldsets import Fieldset
+
+
+class ModelSchema(msgspec.Struct):
+    """Base schema that can be built directly from a SQLAlchemy model"""
+
+    # Fields for related rows; passed to from_model, never read from the model
+    related_fields: ClassVar[tuple] = ()
+
+    @classmethod
+    def from_model(cls, obj, **related):
+        """
+        Build a schema instance from a model instance
+
+        Columns that are None fall back to the schema field default, so
+        money fields default to 0 and status fields to their initial state.
+
+        Args:
+            obj: SQLAlchemy model instance
+            **related: Values for related_fields, e.g. already-built child schemas
+
+        Returns:
+            ModelSchema: Populated schema instance
+        """
+        values = dict(related)
+        for name in cls.__struct_fields__:
+            if name in cls.related_fields:
+                continue
+            value = getattr(obj, name, None)
+            if value is not None:
+                values[name] = value
+        return cls(**values)
+
+    @classmethod
+    def field_names(cls):
+        """JSON field name -> attribute name"""
+        return {field.encode_name: field.name for field in _struct_fields(cls)}
+
+    @classmethod
+    def partial(cls, obj, fields, **related):
+        """
+        Dict of only some fields of a model instance, for sparse fieldsets
+
+        Values and defaults are the same as from_model's, and columns that
+        were not selected are never read, so rows loaded with load_only are
+        not refreshed.
+
+        Args:
+            obj: SQLAlchemy model instance
+            fields: JSON field names to include
+            **related: Values for related_fields, always included
+
+        Returns:
+            dict: Field values keyed by JSON name, in schema order
+        """
+        values = {}
+        for field in _struct_fields(cls):
+            if field.name in related:
+                values[field.encode_name] = related[field.name]
+            elif field.encode_name in fields and field.name not in cls.related_fields:
+                value = getattr(obj, field.name, None)
+                if value is None and field.default is not msgspec.NODEFAULT:
+                    value = field.default
+                elif value is None and field.default_factory is not msgspec.NODEFAULT:
+                    value = field.default_factory()
+                values[field.encode_name] = value
+        return values
+
+
+@cache
+def _struct_fields(cls):
+    return msgspec.structs.fields(cls)
+
+
+class UserSchema(ModelSchema):
+    id: str
+    email: str
+    full_name: Optional[str] = None
+    role: Optional[UserRole] = None
+    phone: Optional[str] = None
+    is_verified: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
+
+class CartSchema(ModelSchema):
+    id: str
+    user_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ProductImageVariantSchema(msgspec.Struct):
+    url: str
+    width: int
+    format: str
+
+
+class ProductImageSchema(ModelSchema):
+    url: str
+    alt_text: Optional[str] = None
+    position: Optional[int] = None
+    srcset: Optional[str] = None
+    variants: list[ProductImageVariantSchema] = []
+
+    related_fields: ClassVar[tuple] = ('variants',)
+
+    @classmethod
+    def from_model(cls, obj):
+        variants = [ProductImageVariantSchema(**variant) for variant in obj.variant_list]
+        return super().from_model(obj, variants=variants)
+
+    @classmethod
+    def partial(cls, obj, fields):
+        if 'variants' not in fields:
+            return super().partial(obj, fields)
+        variants = [ProductImageVariantSchema(**variant) for variant in obj.variant_list]
+        return super().partial(obj, fields, variants=variants)
+
+
+class CategorySchema(ModelSchema):
+    id: str
+    name: str
+    description: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class ProductSchema(ModelSchema):
+    id: str
+    title: str
+    price: float = 0.0
+    description: Optional[str] = None
+    image_url: Optional[str] = None
+    stock: int = 0
+    currency: Optional[str] = None
+    status: Optional[str] = None
+    # Related rows are omitted from the JSON unless the route loads them (?include=)
+    images: Union[list[ProductImageSchema], msgspec.UnsetType] = msgspec.UNSET
+    category: Union[Optional[CategorySchema], msgspec.UnsetType] = msgspec.UNSET
+
+    related_fields: ClassVar[tuple] = ('images', 'category')
+
+
+class OrderItemSchema(ModelSchema):
+    id: str
+    order_id: Optional[str] = None
+    product_id: Optional[str] = None
+    artisan_id: Optional[str] = None
+    quantity: int = 0
+    unit_price: Decimal = Decimal(0)
+    total_price: Decimal = Decimal(0)
+
+
+class OrderSchema(ModelSchema):
+    id: str
+    user_id: Optional[str] = None
+    status: Optional[OrderStatus] = None
+    total_amount: Decimal = Decimal(0)
+    placed_at: Optional[datetime] = msgspec.field(default=None, name='created_at')
+    updated_at: Optional[datetime] = None
+    items: Union[list[OrderItemSchema], msgspec.UnsetType] = msgspec.UNSET
+
+    related_fields: ClassVar[tuple] = ('items',)
+
+
+class PaymentSchema(ModelSchema):
+    id: str
+    order_id: Optional[str] = None
+    amount: Decimal = Decimal(0)
+    currency: Optional[str] = None
+    status: PaymentStatus = PaymentStatus.pending
+    method: PaymentMethod = PaymentMethod.mpesa
+    mpesa_transaction_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    order: Union[Optional[OrderSchema], msgspec.UnsetType] = msgspec.UNSET
+
+    related_fields: ClassVar[tuple] = ('order',)
+
+
+class MessageSchema(ModelSchema):
+    id: str
+    sender_id: str
+    receiver_id: str
+    message: Optional[str] = None
+    message_type: MessageType = MessageType.TEXT
+    attachment_url: Optional[str] = None
+    attachment_name: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    is_read: bool = False
+    status: MessageStatus = MessageStatus.SENT
+
+
+class FavoriteSchema(ModelSchema):
+    id: str
+    user_id: Optional[str] = None
+    product_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class NotificationSchema(ModelSchema):
+    id: str
+    user_id: Optional[str] = None
+    type: Optional[NotificationType] = None
+    title: Optional[str] = None
+    message: Optional[str] = None
+    is_read: bool = False
+    created_at: Optional[datetime] = None
+
+
+# ?fields= / ?include= selections (app/utils/fieldsets.py)
+PRODUCT_IMAGE_FIELDSET = Fieldset('images', ProductImage, ProductImageSchema,
+                                  columns={'srcset': ('variants',), 'variants': ('variants',)})
+CATEGORY_FIELDSET = Fieldset('category', Category, CategorySchema)
+PRODUCT_FIELDSET = Fieldset('products', Product, ProductSchema, relations={
+    'images': ('images', PRODUCT_IMAGE_FIELDSET),
+    'category': ('category', CATEGORY_FIELDSET),
+})
+# Ownership checks read orders.user_id and payments.order_id
+ORDER_FIELDSET = Fieldset('orders', Order, OrderSchema, relations={
+    'items': ('order_items', Fieldset('items', OrderItem, OrderItemSchema)),
+}, always_load=('user_id',))
+PAYMENT_FIELDSET = Fieldset('payments', Payment, PaymentSchema, relations={
+    'order': ('order', Fieldset('order', Order, OrderSchema)),
+}, always_load=('order_id',))
@@ -0,0 +1,252 @@
+"""
+Change tracking for Soko Safi
+Records inserts, updates and deletes of synced models for delta sync (/api/sync)
+
+Every flush that touches a tracked model adds change_log rows in the same
+transaction, one per user allowed to see the row (NULL for public rows).
+Rows get their `seq` only after they are committed: sequence_changes()
+numbers every visible unnumbered row under a lock on change_log_state, so a
+row committed late can never get a lower seq than one a client has already
+read past. Sync tokens are seqs.
+
+compact_change_log() drops entries superseded by a newer one for the same
+row and user, and expires entries older than the retention period; tokens
+older than the expired entries must do a full sync.
+"""
+
+import logging
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, event, exists, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from app.models import db, ChangeLogEntry, ChangeLogState, Favorite, Message, Notification, Order, Product
+from app.utils.db_routing import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+# Entries numbered per sequence_changes() call
+SEQUENCE_BATCH_SIZE = 10000
+
+Tracked = namedtuple('Tracked', ['entity', 'audience', 'is_deleted'])
+Change = namedtuple('Change', ['operation', 'seq'])
+
+
+def _soft_deleted(obj):
+    return getattr(obj, 'deleted_at', None) is not None
+
+
+# Model -> (entity name, users who may see a row, whether a row counts as deleted)
+TRACKED_MODELS = {
+    # Public catalogue; products that leave the active listing are deletes for clients
+    Product: Tracked('products', lambda p: [None], lambda p: p.status != 'active' or _soft_deleted(p)),
+    Order: Tracked('orders', lambda o: [o.user_id], _soft_deleted),
+    Message: Tracked('messages', lambda m: {m.sender_id, m.receiver_id}, _soft_deleted),
+    Notification: Tracked('notifications', lambda n: [n.user_id], _soft_deleted),
+    Favorite: Tracked('favorites', lambda f: [f.user_id], _soft_deleted),
+}
+ENTITY_MODELS = {tracked.entity: model for model, tracked in TRACKED_MODELS.items()}
+
+
+def _entries(obj, operation):
+    tracked = TRACKED_MODELS[type(obj)]
+    if operation != 'delete' and tracked.is_deleted(obj):
+        operation = 'delete'
+    # Rows without an owner (e.g. orders with no user_id) are left out rather than made public
+    users = [user_id for user_id in tracked.audience(obj) if user_id is not None] or (
+        [None] if None in tracked.audience(obj) else [])
+    return [{'entity': tracked.entity, 'entity_id': obj.id, 'operation': operation, 'user_id': user_id}
+            for user_id in users]
+
+
+class ChangeTrackingSession(Session):
+    """Plain session carrying the change log listeners, for the ASGI async_sessionmaker"""
+
+
+# Flask requests use RoutingSession; the ASGI entry point's native handlers use ChangeTrackingSession
+SESSION_CLASSES = (RoutingSession, ChangeTrackingSession)
+
+
+def _write(db_session, rows):
+    if rows:
+        db_session.connection().execute(ChangeLogEntry.__table__.insert(), rows)
+
+
+def _record_flush(db_session, flush_context):
+    rows = []
+    for obj in db_session.new:
+        if type(obj) in TRACKED_MODELS:
+            rows += _entries(obj, 'insert')
+    for obj in db_session.dirty:
+        if type(obj) in TRACKED_MODELS and db_session.is_modified(obj, include_collections=False):
+            rows += _entries(obj, 'update')
+    for obj in db_session.deleted:
+        if type(obj) in TRACKED_MODELS:
+            rows += _entries(obj, 'delete')
+    _write(db_session, rows)
+
+
+def _record_bulk_write(orm_execute_state):
+    """Record Query.update()/delete() and update()/delete() statements, which skip the flush"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ not in TRACKED_MODELS:
+        return None
+    statement = orm_execute_state.statement
+    # The affected rows are selected first; the ORM then applies the update to them in the session
+    targets = select(mapper.class_)
+    if statement.whereclause is not None:
+        targets = targets.where(statement.whereclause)
+    objects = orm_execute_state.session.execute(targets).scalars().all()
+    result = orm_execute_state.invoke_statement()
+    operation = 'delete' if orm_execute_state.is_delete else 'update'
+    _write(orm_execute_state.session, [row for obj in objects for row in _entries(obj, operation)])
+    return result
+
+
+for _session_class in SESSION_CLASSES:
+    event.listen(_session_class, 'after_flush', _record_flush)
+    event.listen(_session_class, 'do_orm_execute', _record_bulk_write)
+
+
+def _state(for_update=False):
+    """The change_log_state row, created on first use"""
+    # populate_existing: a state read earlier in this session may be stale once the lock is held
+    state = db.session.get(ChangeLogState, 1, with_for_update=for_update, populate_existing=True)
+    if state is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(ChangeLogState(id=1, last_seq=0, compacted_seq=0))
+        except IntegrityError:
+            pass  # Created concurrently
+        state = db.session.get(ChangeLogState, 1, with_for_update=for_update, populate_existing=True)
+    return state
+
+
+def sequence_changes(limit=SEQUENCE_BATCH_SIZE):
+    """
+    Number committed change_log entries that have no seq yet, oldest first
+
+    Commits the session. Cheap when there is nothing to number.
+
+    Returns:
+        ChangeLogState: State after numbering
+    """
+    pending = db.session.scalar(select(ChangeLogEntry.id).filter(ChangeLogEntry.seq.is_(None)).limit(1))
+    if pending is None:
+        state = _state()
+        db.session.commit()
+        return state
+
+    # The row lock serialises numbering, so seqs are handed out in commit order
+    state = _state(for_update=True)
+    ids = db.session.scalars(select(ChangeLogEntry.id).filter(ChangeLogEntry.seq.is_(None))
+                             .order_by(ChangeLogEntry.id).limit(limit)).all()
+    if ids:
+        db.session.execute(db.update(ChangeLogEntry), [
+            {'id': entry_id, 'seq': state.last_seq + offset} for offset, entry_id in enumerate(ids, 1)])
+        state.last_seq += len(ids)
+    db.session.commit()
+    return state
+
+
+def changes_since(since, user_id=None, entities=None, limit=500):
+    """
+    Changes visible to a user after a sync token
+
+    Several entries for the same row collapse into one, reported with the
+    row's current data; rows that no longer exist or are soft-deleted are
+    reported as deletes. Clients should upsert on insert and update.
+
+    Args:
+        since (int): Token from the previous sync
+        user_id (str): Only changes to public rows and this user's rows; None for every change (admins)
+        entities (list): Entity names to include, or None for all
+        limit (int): Most log entries read per call
+
+    Returns:
+        tuple: (list of change dicts, next token, whether more changes are waiting)
+    """
+    from app.schemas import FavoriteSchema, MessageSchema, NotificationSchema, OrderSchema, ProductSchema
+    schemas = {'products': ProductSchema, 'orders': OrderSchema, 'messages': MessageSchema,
+               'notifications': NotificationSchema, 'favorites': FavoriteSchema}
+
+    state = _state()
+    query = ChangeLogEntry.query.filter(ChangeLogEntry.seq > since, ChangeLogEntry.seq <= state.last_seq)
+    if user_id is not None:
+        query = query.filter(db.or_(ChangeLogEntry.user_id.is_(None), ChangeLogEntry.user_id == user_id))
+    if entities:
+        query = query.filter(ChangeLogEntry.entity.in_(entities))
+    entries = query.order_by(ChangeLogEntry.seq).limit(limit + 1).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    # Entries this user cannot see are skipped over, so the token can move past them
+    token = entries[-1].seq if has_more else max(state.last_seq, since)
+
+    latest = {}
+    for entry in entries:
+        key = (entry.entity, entry.entity_id)
+        first = latest.pop(key, entry)
+        # insert then update is still an insert for this client
+        operation = 'insert' if first.operation == 'insert' and entry.operation != 'delete' else entry.operation
+        latest[key] = Change(operation, entry.seq)
+
+    rows = {}
+    for entity in {entity for entity, _ in latest}:
+        model = ENTITY_MODELS[entity]
+        ids = [entity_id for name, entity_id in latest if name == entity]
+        rows.update({(entity, obj.id): obj for obj in model.query.filter(model.id.in_(ids))})
+
+    changes = []
+    for (entity, entity_id), entry in latest.items():
+        obj = rows.get((entity, entity_id))
+        if entry.operation == 'delete' or obj is None or TRACKED_MODELS[type(obj)].is_deleted(obj):
+            changes.append({'entity': entity, 'id': entity_id, 'op': 'delete', 'seq': entry.seq})
+        else:
+            changes.append({'entity': entity, 'id': entity_id, 'op': entry.operation, 'seq': entry.seq,
+                            'data': schemas[entity].from_model(obj)})
+    return changes, token, has_more
+
+
+def compact_change_log(retention_days):
+    """
+    Shrink the change log
+
+    Entries superseded by a newer entry for the same row and user are
+    dropped (the newer one still reaches every client that needs it), and
+    entries older than `retention_days` are expired. Tokens at or below the
+    newest expired seq are answered with 410 Gone.
+
+    Returns:
+        dict: Counts of superseded and expired entries, and the new compacted_seq
+    """
+    sequence_changes()
+    newer = aliased(ChangeLogEntry)
+    superseded = db.session.execute(db.delete(ChangeLogEntry).where(
+        ChangeLogEntry.seq.is_not(None),
+        exists().where(and_(
+            newer.entity == ChangeLogEntry.entity,
+            newer.entity_id == ChangeLogEntry.entity_id,
+            newer.user_id.is_not_distinct_from(ChangeLogEntry.user_id),
+            newer.seq > ChangeLogEntry.seq,
+        )),
+    ).execution_options(synchronize_session=False)).rowcount
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    state = _state(for_update=True)
+    horizon = db.session.scalar(select(db.func.max(ChangeLogEntry.seq)).filter(
+        ChangeLogEntry.seq.is_not(None), ChangeLogEntry.created_at < cutoff))
+    expired = 0
+    if horizon is not None:
+        expired = db.session.execute(db.delete(ChangeLogEntry).where(
+            ChangeLogEntry.seq <= horizon).execution_options(synchronize_session=False)).rowcount
+        state.compacted_seq = max(state.compacted_seq, horizon)
+    state.compacted_at = datetime.utcnow()
+    db.session.commit()
+    logger.info('Compacted change log', extra={
+        'event': 'change_log.compact', 'superseded': superseded, 'expired': expired,
+        'compacted_seq': state.compacted_seq})
+    return {'superseded': superseded, 'expired': expired, 'compacted_seq': state.compacted_seq}
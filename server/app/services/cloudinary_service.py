@@ -0,0 +1,173 @@
+"""
+Cloudinary upload service for Soko Safi
+Streams image uploads through a pooled HTTP session and signs direct browser uploads
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CLOUDINARY_CONNECT_TIMEOUT = float(os.getenv('CLOUDINARY_CONNECT_TIMEOUT', 5))
+CLOUDINARY_UPLOAD_TIMEOUT = float(os.getenv('CLOUDINARY_UPLOAD_TIMEOUT', 60))
+# Pooled connections to Cloudinary per worker process
+CLOUDINARY_POOL_SIZE = int(os.getenv('CLOUDINARY_POOL_SIZE', 10))
+# Bytes read from the client and forwarded per chunk
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised while streaming when an upload passes its size limit"""
+
+
+class CloudinaryService:
+    def __init__(self):
+        self.cloud_name = os.getenv('CLOUDINARY_CLOUD_NAME')
+        self.upload_preset = os.getenv('CLOUDINARY_UPLOAD_PRESET')
+        self.api_key = os.getenv('CLOUDINARY_API_KEY')
+        self.api_secret = os.getenv('CLOUDINARY_API_SECRET')
+        self.base_url = os.getenv('CLOUDINARY_API_BASE_URL', 'https://api.cloudinary.com')
+
+        if not self.cloud_name:
+            raise ValueError('Cloudinary configuration missing')
+
+        self.upload_url = f"{self.base_url}/v1_1/{self.cloud_name}/image/upload"
+        # Reuses TLS connections to Cloudinary across uploads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CLOUDINARY_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def upload_stream(self, head, stream, filename, content_type, max_bytes, folder='soko-safi'):
+        """
+        Forward an image to Cloudinary as it is read, with chunked transfer encoding
+
+        The multipart body is generated on the fly, so at most one chunk of
+        the image is held in memory.
+
+        Args:
+            head (bytes): Bytes already read from the start of the image
+            stream: File-like object with the rest of the image
+            filename (str): File name sent to Cloudinary
+            content_type (str): Image content type
+            max_bytes (int): Size limit for the whole image
+            folder (str): Cloudinary folder
+
+        Returns:
+            requests.Response: Cloudinary's response
+
+        Raises:
+            ValueError: If CLOUDINARY_UPLOAD_PRESET is not set
+            UploadTooLarge: If the image is larger than max_bytes
+        """
+        if not self.upload_preset:
+            raise ValueError('Cloudinary upload preset missing')
+
+        body = _MultipartBody({'upload_preset': self.upload_preset, 'folder': folder},
+                               head, stream, filename, content_type, max_bytes)
+        return self.session.post(
+            self.upload_url,
+            data=body,
+            headers={'Content-Type': f'multipart/form-data; boundary={body.boundary}'},
+            timeout=(CLOUDINARY_CONNECT_TIMEOUT, CLOUDINARY_UPLOAD_TIMEOUT)
+        )
+
+    def signed_upload_params(self, folder='soko-safi'):
+        """
+        Parameters for a signed upload straight from the browser to Cloudinary
+
+        Returns:
+            dict: upload_url and the form fields to post with the file
+
+        Raises:
+            ValueError: If CLOUDINARY_API_KEY or CLOUDINARY_API_SECRET is not set
+        """
+        return {
+            'upload_url': self.upload_url,
+            'fields': self._signed({'folder': folder, 'timestamp': int(time.time())}),
+        }
+
+    def destroy(self, public_id):
+        """
+        Delete an uploaded image from Cloudinary
+
+        Returns:
+            requests.Response: Cloudinary's response
+
+        Raises:
+            ValueError: If CLOUDINARY_API_KEY or CLOUDINARY_API_SECRET is not set
+        """
+        return self.session.post(
+            f"{self.base_url}/v1_1/{self.cloud_name}/image/destroy",
+            data=self._signed({'public_id': public_id, 'timestamp': int(time.time())}),
+            timeout=(CLOUDINARY_CONNECT_TIMEOUT, CLOUDINARY_UPLOAD_TIMEOUT)
+        )
+
+    def _signed(self, params):
+        """Add api_key and the SHA-1 signature Cloudinary expects to `params`"""
+        if not self.api_key or not self.api_secret:
+            raise ValueError('Cloudinary API credentials missing')
+
+        to_sign = '&'.join(f'{key}={value}' for key, value in sorted(params.items()))
+        return {
+            **params,
+            'api_key': self.api_key,
+            'signature': hashlib.sha1((to_sign + self.api_secret).encode()).hexdigest(),
+        }
+
+
+class _MultipartBody:
+    """Iterable multipart/form-data body that streams the file part"""
+
+    def __init__(self, fields, head, stream, filename, content_type, max_bytes):
+        self.boundary = uuid.uuid4().hex
+        self.fields = fields
+        self.head = head
+        self.stream = stream
+        self.filename = filename.replace('"', '')
+        self.content_type = content_type
+        self.max_bytes = max_bytes
+
+    def __iter__(self):
+        preamble = ''.join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in self.fields.items()
+        )
+        preamble += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="file"; '
+                     f'filename="{self.filename}"\r\nContent-Type: {self.content_type}\r\n\r\n')
+        yield preamble.encode()
+
+        size = len(self.head)
+        yield self.head
+        while True:
+            chunk = self.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise UploadTooLarge(f'Upload is larger than {self.max_bytes} bytes')
+            yield chunk
+        yield f'\r\n--{self.boundary}--\r\n'.encode()
+
+
+_cloudinary_service = None
+_cloudinary_service_lock = threading.Lock()
+
+
+def get_cloudinary_service():
+    """
+    Return the shared CloudinaryService, creating it on first use
+
+    Raises:
+        ValueError: If CLOUDINARY_CLOUD_NAME is not set
+    """
+    global _cloudinary_service
+    if _cloudinary_service is None:
+        with _cloudinary_service_lock:
+            if _cloudinary_service is None:
+                _cloudinary_service = CloudinaryService()
+    return _cloudinary_service
@@ -0,0 +1,260 @@
+"""
+Image derivative pipeline for Soko Safi
+Turns pending ProductImage rows into resized WebP/AVIF variants for responsive srcsets
+"""
+
+import io
+import ipaddress
+import json
+import logging
+import multiprocessing
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlsplit
+
+from sqlalchemy import and_, exists, func, or_
+
+from app.models import db, Product, ProductImage
+from app.services.cloudinary_service import CLOUDINARY_CONNECT_TIMEOUT, CLOUDINARY_UPLOAD_TIMEOUT, get_cloudinary_service
+from app.utils.images import DERIVATIVE_FORMATS, available_formats, render_derivatives
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in os.getenv('IMAGE_DERIVATIVE_WIDTHS', '320,640,1024').split(',')]
+IMAGE_DERIVATIVE_FORMATS = os.getenv('IMAGE_DERIVATIVE_FORMATS', 'webp,avif').split(',')
+# Originals larger than this are marked failed instead of downloaded
+IMAGE_SOURCE_MAX_BYTES = int(os.getenv('IMAGE_SOURCE_MAX_BYTES', 20 * 1024 * 1024))
+DERIVATIVE_FOLDER = 'soko-safi/derivatives'
+# Images still processing this long after they were claimed belong to a dead worker
+IMAGE_CLAIM_LEASE_SECONDS = int(os.getenv('IMAGE_CLAIM_LEASE_SECONDS', 15 * 60))
+# Redirects followed when downloading an original; each hop is checked like the first URL
+IMAGE_SOURCE_MAX_REDIRECTS = 3
+
+
+def check_source_url(url):
+    """
+    Refuse original URLs that could reach the worker's own network
+
+    Only http(s) URLs whose host resolves exclusively to public addresses
+    are downloaded, so a product image URL cannot point the worker at
+    loopback, private, link-local (cloud metadata) or reserved addresses.
+
+    Raises:
+        ValueError: If the URL may not be downloaded
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f'Unsupported image URL: {url}')
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or None)}
+    except socket.gaierror as e:
+        raise ValueError(f'Cannot resolve image host {parts.hostname}') from e
+    for address in addresses:
+        # Drop any IPv6 zone (fe80::1%eth0) before parsing
+        if not ipaddress.ip_address(address.split('%')[0]).is_global:
+            raise ValueError(f'Image host {parts.hostname} resolves to a non-public address')
+
+
+def _abandoned(cutoff):
+    """Images left processing by a worker that died: claimed before `cutoff`, or never stamped"""
+    return and_(ProductImage.variants_status == 'processing',
+                or_(ProductImage.variants_claimed_at.is_(None), ProductImage.variants_claimed_at < cutoff))
+
+
+def _claimable(cutoff):
+    return or_(ProductImage.variants_status == 'pending', ProductImage.variants_status.is_(None), _abandoned(cutoff))
+
+
+def queue_image(product_id, url, position=None, alt_text=None):
+    """
+    Add or replace a product image and mark it for derivative generation
+
+    An image already at `position` is repointed at the new URL and its old
+    variants dropped; otherwise a row is appended after the last image.
+    The caller commits.
+
+    Args:
+        product_id (str): Product the image belongs to
+        url (str): Original image URL
+        position (int): Slot to replace, e.g. 0 for the product's main image
+        alt_text (str): Alternative text
+
+    Returns:
+        ProductImage: The pending image
+    """
+    image = None
+    if position is not None:
+        image = ProductImage.query.filter_by(product_id=product_id, position=position).first()
+    if image is None:
+        if position is None:
+            last = db.session.query(func.max(ProductImage.position)).filter_by(product_id=product_id).scalar()
+            position = 0 if last is None else last + 1
+        image = ProductImage(product_id=product_id, position=position)
+        db.session.add(image)
+    elif image.url == url:
+        return image
+
+    image.url = url
+    image.alt_text = alt_text or image.alt_text
+    image.variants = None
+    image.variants_status = 'pending'
+    return image
+
+
+class ImagePipeline:
+    """
+    Generates derivatives for pending images
+
+    Downloads and uploads run on a thread pool; resizing and encoding run on
+    a process pool so they use every core. Both pools are bounded by
+    `workers`, which caps the images in flight. Images a dead worker left
+    processing for longer than `lease_seconds` are claimed again.
+    """
+
+    def __init__(self, app, workers=None, lease_seconds=IMAGE_CLAIM_LEASE_SECONDS):
+        self.app = app
+        self.workers = workers or os.cpu_count() or 1
+        self.lease_seconds = lease_seconds
+        self.formats = available_formats(IMAGE_DERIVATIVE_FORMATS)
+        # spawn: forking a process that already runs I/O threads can deadlock the child
+        self.processes = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        self.threads = ThreadPoolExecutor(self.workers, thread_name_prefix='image-pipeline')
+        self.cloudinary = get_cloudinary_service()
+
+    def close(self):
+        self.threads.shutdown()
+        self.processes.shutdown()
+
+    def run_pending(self, limit=None):
+        """
+        Process pending and abandoned images, oldest first
+
+        Args:
+            limit (int): Maximum number of images to process
+
+        Returns:
+            dict: Number of images that became ready and that failed
+        """
+        with self.app.app_context():
+            query = (db.session.query(ProductImage.id)
+                     .filter(_claimable(self._lease_cutoff()))
+                     .order_by(ProductImage.id))
+            if limit:
+                query = query.limit(limit)
+            image_ids = [image_id for image_id, in query]
+
+        results = list(self.threads.map(self.process, image_ids))
+        return {'ready': results.count('ready'), 'failed': results.count('failed')}
+
+    def process(self, image_id):
+        """
+        Generate, upload and record the derivatives of one image
+
+        Returns:
+            str: ready, failed, or None if another worker claimed the image first
+        """
+        with self.app.app_context():
+            if not self._claim(image_id):
+                return None
+            image = db.session.get(ProductImage, image_id)
+            try:
+                original = self._download(image.url)
+                rendered = self.processes.submit(
+                    render_derivatives, original, IMAGE_DERIVATIVE_WIDTHS, self.formats).result()
+                variants = [
+                    {'url': self._upload(image_id, width, fmt, data), 'width': width, 'format': fmt}
+                    for width, fmt, data in rendered
+                ]
+                image.variants = json.dumps(variants)
+                image.variants_status = 'ready'
+                db.session.commit()
+                logger.info('Image derivatives ready', extra={
+                    'event': 'images.derivatives_ready', 'image_id': image_id, 'variants': len(variants)})
+                return 'ready'
+            except Exception:
+                db.session.rollback()
+                logger.exception('Image derivatives failed', extra={
+                    'event': 'images.derivatives_error', 'image_id': image_id})
+                ProductImage.query.filter_by(id=image_id).update({'variants_status': 'failed'})
+                db.session.commit()
+                return 'failed'
+
+    def _lease_cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+
+    def _claim(self, image_id):
+        """Move a pending or abandoned image to processing; False if someone else got it"""
+        # Re-stamping the claim makes the image unclaimable for any other worker racing on it
+        claimed = (ProductImage.query
+                   .filter(ProductImage.id == image_id, _claimable(self._lease_cutoff()))
+                   .update({'variants_status': 'processing', 'variants_claimed_at': datetime.utcnow()},
+                           synchronize_session=False))
+        db.session.commit()
+        return claimed == 1
+
+    def _download(self, url):
+        for _ in range(IMAGE_SOURCE_MAX_REDIRECTS + 1):
+            check_source_url(url)
+            response = self.cloudinary.session.get(url, stream=True, allow_redirects=False,
+                                                   timeout=(CLOUDINARY_CONNECT_TIMEOUT, CLOUDINARY_UPLOAD_TIMEOUT))
+            if not response.is_redirect:
+                break
+            url = urljoin(url, response.headers['Location'])
+            response.close()
+        else:
+            raise ValueError(f'Too many redirects for image {url}')
+        with response:
+            response.raise_for_status()
+            body = io.BytesIO()
+            for chunk in response.iter_content(64 * 1024):
+                body.write(chunk)
+                if body.tell() > IMAGE_SOURCE_MAX_BYTES:
+                    raise ValueError(f'Original is larger than {IMAGE_SOURCE_MAX_BYTES} bytes')
+            return body.getvalue()
+
+    def _upload(self, image_id, width, fmt, data):
+        content_type = DERIVATIVE_FORMATS[fmt][1]
+        response = self.cloudinary.upload_stream(
+            b'', io.BytesIO(data), f'{image_id}-{width}.{fmt}', content_type, len(data), folder=DERIVATIVE_FOLDER)
+        response.raise_for_status()
+        return response.json()['secure_url']
+
+
+def backfill_product_images():
+    """
+    Queue the main image of every product that has an image_url but no ProductImage rows
+
+    Returns:
+        int: Number of images queued
+    """
+    products = (db.session.query(Product.id, Product.image_url)
+                .filter(Product.image_url.isnot(None), Product.image_url != '',
+                        ~exists().where(ProductImage.product_id == Product.id))
+                .all())
+    db.session.add_all(ProductImage(product_id=product_id, url=url, position=0, variants_status='pending')
+                       for product_id, url in products)
+    db.session.commit()
+    return len(products)
+
+
+def retry_failed_images(lease_seconds=IMAGE_CLAIM_LEASE_SECONDS):
+    """
+    Put failed images back in the queue, and images whose worker died mid-way
+
+    An image counts as abandoned when it has been processing for longer than
+    the claim lease, or was claimed before claims were timestamped.
+
+    Args:
+        lease_seconds (int): How long a claimed image may stay processing
+
+    Returns:
+        int: Number of images requeued
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    count = (ProductImage.query
+             .filter(or_(ProductImage.variants_status == 'failed', _abandoned(cutoff)))
+             .update({'variants_status': 'pending', 'variants_claimed_at': None}, synchronize_session=False))
+    db.session.commit()
+    return count
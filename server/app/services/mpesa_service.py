@@ -7,11 +7,16 @@ import os
 import requests
 import base64
 import json
+import logging
 from datetime import datetime, timedelta
+import threading
 import time
-from flask import current_app
+from werkzeug.local import LocalProxy
 from app.models import db, Payment, PaymentStatus, ArtisanDisbursement, DisbursementStatus, User
 from app.sockets.notifications import send_notification
+from app.utils.metrics import MPESA_REQUEST_DURATION, MPESA_ERRORS
+
+logger = logging.getLogger(__name__)
 
 
 class MpesaService:
@@ -26,77 +31,107 @@ class MpesaService:
         if not all([self.consumer_key, self.consumer_secret, self.shortcode, self.passkey]):
             raise ValueError('Missing required M-Pesa credentials in environment variables')
  
+    def _request(self, endpoint, method, path, **kwargs):
+        """Call a Daraja API endpoint, recording latency and failures by endpoint"""
+        start = time.perf_counter()
+        try:
+            response = requests.request(method, f'{self.base_url}{path}', **kwargs)
+            response.raise_for_status()
+            return response
+        except requests.Timeout:
+            MPESA_ERRORS.labels(endpoint, 'timeout').inc()
+            raise
+        except requests.HTTPError:
+            MPESA_ERRORS.labels(endpoint, 'http').inc()
+            raise
+        except requests.RequestException:
+            MPESA_ERRORS.labels(endpoint, 'connection').inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            MPESA_REQUEST_DURATION.labels(endpoint).observe(elapsed)
+            logger.info('Daraja request', extra={
+                'event': 'mpesa.request', 'endpoint': endpoint, 'duration_ms': round(elapsed * 1000, 1)
+            })
+
     def get_access_token(self):
         """Get M-Pesa access token"""
         try:
-            if not self.consumer_key or not self.consumer_secret:
-                raise ValueError('M-Pesa credentials not configured')
-                
-            auth = base64.b64encode(f"{self.consumer_key}:{self.consumer_secret}".encode()).decode()
-            headers = {
-                'Authorization': f'Basic {auth}',
-                'Content-Type': 'application/json'
-            }
-            response = requests.get(f'{self.base_url}/oauth/v1/generate?grant_type=client_credentials', headers=headers, timeout=30)
-            response.raise_for_status()
+            response = self._request('oauth', 'GET', '/oauth/v1/generate?grant_type=client_credentials',
+                                     headers=self._basic_auth_headers(), timeout=30)
             return response.json()['access_token']
         except Exception as e:
-            current_app.logger.error(f"Failed to get M-Pesa access token: {str(e)}")
+            logger.exception('Failed to get M-Pesa access token', extra={'event': 'mpesa.oauth_error'})
             raise
 
     def initiate_stk_push(self, phone_number, amount, order_id, account_reference):
         """Initiate STK Push for customer payment"""
         try:
             access_token = self.get_access_token()
-            # Format phone number (remove + and ensure 254 format)
-            phone = phone_number.replace('+', '')
-            if phone.startswith('0'):
-                phone = '254' + phone[1:]
-            elif not phone.startswith('254'):
-                phone = '254' + phone
-
-            # Generate timestamp and password 
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            password = base64.b64encode(f"{self.shortcode}{self.passkey}{timestamp}".encode()).decode()
-
-            payload = {
-                "BusinessShortCode": self.shortcode,
-                "Password": password,
-                "Timestamp": timestamp,
-                "TransactionType": "CustomerPayBillOnline",
-                "Amount": int(amount),
-                "PartyA": phone,
-                "PartyB": self.shortcode,
-                "PhoneNumber": phone,
-                "CallBackURL": f"{os.getenv('BASE_URL', 'http://localhost:5001')}/api/payments/callback",
-                "AccountReference": account_reference,
-                "TransactionDesc": f"Payment for Order {order_id}"
-            }
-
+            payload = self._stk_push_payload(phone_number, amount, order_id, account_reference)
             headers = {
                 'Authorization': f'Bearer {access_token}',
                 'Content-Type': 'application/json'
             }
 
-            response = requests.post(f'{self.base_url}/mpesa/stkpush/v1/processrequest', json=payload, headers=headers)
-            response.raise_for_status()
-
-            result = response.json()
-            return {
-                'success': True,
-                'checkout_request_id': result.get('CheckoutRequestID'),
-                'response_code': result.get('ResponseCode'),
-                'response_description': result.get('ResponseDescription'),
-                'customer_message': result.get('CustomerMessage')
-            }
+            response = self._request('stkpush', 'POST', '/mpesa/stkpush/v1/processrequest', json=payload, headers=headers)
+            return self._stk_push_result(response.json())
 
         except Exception as e:
-            current_app.logger.error(f"STK Push failed: {str(e)}")
+            logger.exception('STK Push failed', extra={'event': 'mpesa.stkpush_error', 'order_id': order_id})
             return {
                 'success': False,
                 'error': str(e)
             }
 
+    def _basic_auth_headers(self):
+        """Headers for the OAuth token request"""
+        if not self.consumer_key or not self.consumer_secret:
+            raise ValueError('M-Pesa credentials not configured')
+
+        auth = base64.b64encode(f"{self.consumer_key}:{self.consumer_secret}".encode()).decode()
+        return {
+            'Authorization': f'Basic {auth}',
+            'Content-Type': 'application/json'
+        }
+
+    def _stk_push_payload(self, phone_number, amount, order_id, account_reference):
+        """Build the STK Push request body"""
+        # Format phone number (remove + and ensure 254 format)
+        phone = phone_number.replace('+', '')
+        if phone.startswith('0'):
+            phone = '254' + phone[1:]
+        elif not phone.startswith('254'):
+            phone = '254' + phone
+
+        # Generate timestamp and password 
+        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+        password = base64.b64encode(f"{self.shortcode}{self.passkey}{timestamp}".encode()).decode()
+
+        return {
+            "BusinessShortCode": self.shortcode,
+            "Password": password,
+            "Timestamp": timestamp,
+            "TransactionType": "CustomerPayBillOnline",
+            "Amount": int(amount),
+            "PartyA": phone,
+            "PartyB": self.shortcode,
+            "PhoneNumber": phone,
+            "CallBackURL": f"{os.getenv('BASE_URL', 'http://localhost:5001')}/api/payments/callback",
+            "AccountReference": account_reference,
+            "TransactionDesc": f"Payment for Order {order_id}"
+        }
+
+    @staticmethod
+    def _stk_push_result(result):
+        return {
+            'success': True,
+            'checkout_request_id': result.get('CheckoutRequestID'),
+            'response_code': result.get('ResponseCode'),
+            'response_description': result.get('ResponseDescription'),
+            'customer_message': result.get('CustomerMessage')
+        }
+
     def disburse_to_artisan(self, disbursement_id):
         """Disburse payment to artisan via B2C"""
         try:
@@ -136,8 +171,7 @@ class MpesaService:
                 'Content-Type': 'application/json'
             }
 
-            response = requests.post(f'{self.base_url}/mpesa/b2c/v1/paymentrequest', json=payload, headers=headers)
-            response.raise_for_status()
+            response = self._request('b2c', 'POST', '/mpesa/b2c/v1/paymentrequest', json=payload, headers=headers)
 
             result = response.json()
             return {
@@ -149,7 +183,7 @@ class MpesaService:
             }
 
         except Exception as e:
-            current_app.logger.error(f"B2C disbursement failed: {str(e)}")
+            logger.exception('B2C disbursement failed', extra={'event': 'mpesa.b2c_error', 'disbursement_id': disbursement_id})
             return {'success': False, 'error': str(e)}
 
     def process_stk_callback(self, callback_data):
@@ -163,7 +197,9 @@ class MpesaService:
             # Find payment by checkout request ID (you'll need to store this mapping) 
             payment = Payment.query.filter_by(mpesa_transaction_id=checkout_request_id).first()
             if not payment:
-                current_app.logger.error(f"Payment not found for checkout_request_id: {checkout_request_id}")
+                logger.error('Payment not found for STK callback', extra={
+                    'event': 'mpesa.stk_callback_unmatched', 'checkout_request_id': checkout_request_id
+                })
                 return
 
             if result_code == 0:
@@ -171,7 +207,7 @@ class MpesaService:
                 payment.status = PaymentStatus.success
                 payment.mpesa_transaction_id = callback_metadata.get('Item', [{}])[1].get('Value')  # MpesaReceiptNumber
                 payment.received_at = datetime.utcnow()
-                payment.callback_payload = callback_data
+                payment.callback_payload = json.dumps(callback_data)
 
                 # Trigger artisan disbursements
                 self._trigger_artisan_disbursements(payment.id)
@@ -199,7 +235,7 @@ class MpesaService:
             db.session.commit()
 
         except Exception as e:
-            current_app.logger.error(f"STK callback processing failed: {str(e)}") 
+            logger.exception('STK callback processing failed', extra={'event': 'mpesa.stk_callback_error'})
             db.session.rollback()
 
     def process_b2c_result(self, result_data):
@@ -213,7 +249,9 @@ class MpesaService:
             # Find disbursement by conversation ID (you'll need to store this mapping)
             disbursement = ArtisanDisbursement.query.filter_by(mpesa_transaction_id=conversation_id).first()
             if not disbursement:
-                current_app.logger.error(f"Disbursement not found for conversation_id: {conversation_id}")
+                logger.error('Disbursement not found for B2C result', extra={
+                    'event': 'mpesa.b2c_result_unmatched', 'conversation_id': conversation_id
+                })
                 return
 
             if result_code == 0:
@@ -238,7 +276,7 @@ class MpesaService:
             db.session.commit()
 
         except Exception as e:
-            current_app.logger.error(f"B2C result processing failed: {str(e)}") 
+            logger.exception('B2C result processing failed', extra={'event': 'mpesa.b2c_result_error'})
             db.session.rollback()
 
     def _trigger_artisan_disbursements(self, payment_id):
@@ -284,7 +322,9 @@ class MpesaService:
                 db.session.commit()
 
         except Exception as e:
-            current_app.logger.error(f"Failed to trigger artisan disbursements: {str(e)}") 
+            logger.exception('Failed to trigger artisan disbursements', extra={
+                'event': 'mpesa.disbursement_trigger_error', 'payment_id': payment_id
+            })
             db.session.rollback()
 
     def _handle_disbursement_failure(self, disbursement):
@@ -301,7 +341,9 @@ class MpesaService:
                 # In a real implementation, you'd use a task queue like Celery
                 # For now, we'll mark as retry and log
                 disbursement.status = DisbursementStatus.retry
-                current_app.logger.info(f"Disbursement {disbursement.id} scheduled for retry in {delay} seconds")
+                logger.info('Disbursement scheduled for retry', extra={
+                    'event': 'mpesa.disbursement_retry', 'disbursement_id': disbursement.id, 'delay_seconds': delay
+                })
 
                 # Notify artisan of retry
                 send_notification(disbursement.artisan_id, 'disbursement_retry', {
@@ -324,8 +366,29 @@ class MpesaService:
                 # TODO: Notify admin for manual processing
 
         except Exception as e:
-            current_app.logger.error(f"Failed to handle disbursement failure: {str(e)}") 
+            logger.exception('Failed to handle disbursement failure', extra={
+                'event': 'mpesa.disbursement_failure_error', 'disbursement_id': disbursement.id
+            }) 
+
+
+_mpesa_service = None
+_mpesa_service_lock = threading.Lock()
+
+
+def get_mpesa_service():
+    """
+    Return the shared MpesaService, creating it on first use
+
+    Building it at import time made the whole app fail to start when M-Pesa
+    credentials were missing; now only payment calls fail.
+    """
+    global _mpesa_service
+    if _mpesa_service is None:
+        with _mpesa_service_lock:
+            if _mpesa_service is None:
+                _mpesa_service = MpesaService()
+    return _mpesa_service
 
 
-# Global service instance
-mpesa_service = MpesaService()
\ No newline at end of file
+# Global service instance, constructed on first use
+mpesa_service = LocalProxy(get_mpesa_service)
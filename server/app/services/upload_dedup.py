@@ -0,0 +1,206 @@
+"""
+Upload deduplication for Soko Safi
+Serves repeat image uploads from the uploaded_assets table instead of Cloudinary
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, ArtisanShowcaseMedia, Message, Product, ProductImage, UploadedAsset, User
+from app.services.cloudinary_service import UPLOAD_CHUNK_SIZE, UploadTooLarge, get_cloudinary_service
+from app.utils.metrics import UPLOAD_DEDUP_LOOKUPS, UPLOAD_DEDUP_SAVED_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Uploads up to this size are spooled in memory, larger ones to a temporary file
+UPLOAD_SPOOL_MEMORY_BYTES = int(os.getenv('UPLOAD_SPOOL_MEMORY_BYTES', 1024 * 1024))
+
+# Columns that may hold the URL of an uploaded asset; checked before destroying one
+ASSET_REFERENCES = [
+    ProductImage.url,
+    Product.image_url,
+    User.profile_picture_url,
+    User.banner_image_url,
+    ArtisanShowcaseMedia.url,
+    Message.attachment_url,
+]
+
+
+def spool_and_hash(head, stream, max_bytes):
+    """
+    Read an upload into a spool file while computing its SHA-256
+
+    The digest has to be known before deciding whether to contact
+    Cloudinary, so the body is buffered; at most UPLOAD_SPOOL_MEMORY_BYTES
+    of it is kept in memory.
+
+    Args:
+        head (bytes): Bytes already read from the start of the upload
+        stream: File-like object with the rest of the upload
+        max_bytes (int): Size limit for the whole upload
+
+    Returns:
+        tuple: (spool file positioned at the start, hex digest, size in bytes)
+
+    Raises:
+        UploadTooLarge: If the upload is larger than max_bytes
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MEMORY_BYTES)
+    digest = hashlib.sha256(head)
+    spool.write(head)
+    size = len(head)
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            spool.close()
+            raise UploadTooLarge(f'Upload is larger than {max_bytes} bytes')
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, digest.hexdigest(), size
+
+
+def acquire_asset(sha256):
+    """
+    Take a reference on an already stored asset
+
+    Args:
+        sha256 (str): Hex digest of the upload
+
+    Returns:
+        UploadedAsset: The stored asset, or None if these bytes were never uploaded
+    """
+    updated = (UploadedAsset.query.filter_by(sha256=sha256)
+               .update({'ref_count': UploadedAsset.ref_count + 1,
+                        'hit_count': UploadedAsset.hit_count + 1,
+                        'last_used_at': datetime.utcnow()}, synchronize_session=False))
+    if not updated:
+        UPLOAD_DEDUP_LOOKUPS.labels(result='miss').inc()
+        return None
+    db.session.commit()
+    asset = UploadedAsset.query.filter_by(sha256=sha256).first()
+    UPLOAD_DEDUP_LOOKUPS.labels(result='hit').inc()
+    UPLOAD_DEDUP_SAVED_BYTES.inc(asset.size_bytes)
+    return asset
+
+
+def record_asset(sha256, url, public_id, content_type, size_bytes):
+    """
+    Store a freshly uploaded asset with one reference
+
+    If a concurrent upload of the same bytes recorded it first, a reference
+    is taken on that row instead and this upload's copy is deleted from
+    Cloudinary, since nothing will ever point at it.
+
+    Returns:
+        UploadedAsset: The stored asset
+    """
+    asset = UploadedAsset(sha256=sha256, url=url, public_id=public_id,
+                          content_type=content_type, size_bytes=size_bytes)
+    db.session.add(asset)
+    try:
+        db.session.commit()
+        return asset
+    except IntegrityError:
+        db.session.rollback()
+        UploadedAsset.query.filter_by(sha256=sha256).update(
+            {'ref_count': UploadedAsset.ref_count + 1}, synchronize_session=False)
+        db.session.commit()
+        winner = UploadedAsset.query.filter_by(sha256=sha256).first()
+        if public_id and public_id != winner.public_id:
+            _destroy(public_id)
+        return winner
+
+
+def _destroy(public_id):
+    """Delete an image from Cloudinary; failures are logged, not raised"""
+    try:
+        get_cloudinary_service().destroy(public_id).raise_for_status()
+    except Exception:
+        logger.exception('Failed to delete asset from Cloudinary', extra={
+            'event': 'uploads.destroy_error', 'public_id': public_id})
+
+
+def count_asset_users(url):
+    """Rows in ASSET_REFERENCES columns that point at `url`"""
+    return sum(db.session.query(func.count()).filter(column == url).scalar() for column in ASSET_REFERENCES)
+
+
+def release_asset(sha256):
+    """
+    Drop a reference; the last one deletes the image from Cloudinary
+
+    ref_count only follows uploads, not the products, images and profiles
+    that go on to use the URL, so before destroying anything the rows in
+    ASSET_REFERENCES are counted. If any still point at the asset it is
+    kept, with ref_count set to that number.
+
+    Args:
+        sha256 (str): Hex digest of the asset
+
+    Returns:
+        int: References left, or None if the asset does not exist
+    """
+    released = (UploadedAsset.query.filter(UploadedAsset.sha256 == sha256, UploadedAsset.ref_count > 0)
+                .update({'ref_count': UploadedAsset.ref_count - 1}, synchronize_session=False))
+    db.session.commit()
+    if not released:
+        return None
+
+    asset = UploadedAsset.query.filter_by(sha256=sha256).first()
+    if asset.ref_count > 0:
+        return asset.ref_count
+
+    in_use = count_asset_users(asset.url)
+    if in_use:
+        UploadedAsset.query.filter_by(sha256=sha256, ref_count=0).update(
+            {'ref_count': in_use}, synchronize_session=False)
+        db.session.commit()
+        logger.warning('Kept asset still used by other rows', extra={
+            'event': 'uploads.release_in_use', 'sha256': sha256, 'references': in_use})
+        return in_use
+
+    public_id = asset.public_id
+    # Conditional delete: an upload that re-acquired the asset meanwhile keeps it alive
+    deleted = UploadedAsset.query.filter_by(sha256=sha256, ref_count=0).delete(synchronize_session=False)
+    db.session.commit()
+    if deleted and public_id:
+        _destroy(public_id)
+    return 0
+
+
+def dedup_stats():
+    """
+    Totals since uploaded_assets was created
+
+    Every row is one upload that reached Cloudinary; every hit is one that did not.
+
+    Returns:
+        dict: assets, stored_bytes, references, hits, misses, hit_rate and saved_bytes
+    """
+    assets, stored_bytes, references, hits, saved_bytes = db.session.query(
+        func.count(UploadedAsset.id),
+        func.coalesce(func.sum(UploadedAsset.size_bytes), 0),
+        func.coalesce(func.sum(UploadedAsset.ref_count), 0),
+        func.coalesce(func.sum(UploadedAsset.hit_count), 0),
+        func.coalesce(func.sum(UploadedAsset.hit_count * UploadedAsset.size_bytes), 0),
+    ).one()
+    lookups = hits + assets
+    return {
+        'assets': assets,
+        'stored_bytes': stored_bytes,
+        'references': references,
+        'hits': hits,
+        'misses': assets,
+        'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+        'saved_bytes': saved_bytes,
+    }
@@ -1,14 +1,21 @@
-from flask import request
+import logging
+from flask import request, session
 from flask_socketio import emit, join_room
 from app.extensions import socketio, connected_users
 from app.models import db, Message
+from app.utils.rate_limit import hit
+from app.utils.metrics import track_socket_event
+
+logger = logging.getLogger(__name__)
 
 @socketio.on('connect')
+@track_socket_event('connect')
 def handle_connect():
-    print(f'Client {request.sid} connected')
+    logger.info('Client connected', extra={'event': 'socket.connect'})
     emit('status', {'msg': 'Connected to server'})
 
 @socketio.on('disconnect')
+@track_socket_event('disconnect')
 def handle_disconnect():
     user_id = None
     for uid, sid in connected_users.items():
@@ -17,9 +24,10 @@ def handle_disconnect():
             break
     if user_id:
         del connected_users[user_id]
-    print(f'Client {request.sid} disconnected')
+    logger.info('Client disconnected', extra={'event': 'socket.disconnect', 'user_id': user_id})
 
 @socketio.on('join')
+@track_socket_event('join')
 def handle_join(data):
     try:
         if not data or 'user_id' not in data:
@@ -30,11 +38,12 @@ def handle_join(data):
         connected_users[user_id] = request.sid
         join_room(f'user_{user_id}')
         emit('status', {'msg': f'User {user_id} joined'})
-    except Exception as e:
-        print(f'Error in handle_join: {e}')
+    except Exception:
+        logger.exception('Socket join failed', extra={'event': 'socket.join_error'})
         emit('error', {'msg': 'Failed to join'})
 
 @socketio.on('send_message')
+@track_socket_event('send_message')
 def handle_message(data):
     try:
         if not data or not all(k in data for k in ['sender_id', 'receiver_id', 'message']):
@@ -45,6 +54,11 @@ def handle_message(data):
         receiver_id = data['receiver_id']
         message_text = data['message']
         
+        # sender_id comes from the client; count per logged-in user or connection instead
+        if hit('socket:send_message', session.get('user_id') or request.sid, '30/minute'):
+            emit('error', {'msg': 'Too many messages, please slow down'})
+            return
+        
         if not message_text or len(message_text.strip()) == 0:
             emit('error', {'msg': 'Message cannot be empty'})
             return
@@ -72,12 +86,13 @@ def handle_message(data):
         
         # Confirm to sender
         emit('message_sent', {'status': 'delivered', 'message_id': message.id})
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f'Error in handle_message: {e}')
+        logger.exception('Socket message failed', extra={'event': 'socket.send_message_error'})
         emit('error', {'msg': 'Failed to send message'})
 
 @socketio.on('get_chat_history')
+@track_socket_event('get_chat_history')
 def handle_chat_history(data):
     try:
         if not data or not all(k in data for k in ['user1', 'user2']):
@@ -102,6 +117,6 @@ def handle_chat_history(data):
         } for msg in messages]
         
         emit('chat_history', {'messages': chat_history})
-    except Exception as e:
-        print(f'Error in handle_chat_history: {e}')
+    except Exception:
+        logger.exception('Socket chat history failed', extra={'event': 'socket.chat_history_error'})
         emit('error', {'msg': 'Failed to get chat history'})
\ No newline at end of file
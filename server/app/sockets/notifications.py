@@ -1,12 +1,18 @@
 from datetime import datetime
 import json
+import logging
 from app.extensions import socketio, connected_users, db
+from app.utils.metrics import NOTIFICATIONS_PENDING, NOTIFICATIONS_SENT, NOTIFICATIONS_FAILED
+
+logger = logging.getLogger(__name__)
 
 def send_notification(user_id, notification_type, data):
     """Send real-time notification to user via WebSocket"""
+    NOTIFICATIONS_PENDING.inc()
     try:
         # Send via WebSocket if user is connected
-        if user_id in connected_users:
+        delivery = 'websocket' if user_id in connected_users else 'stored'
+        if delivery == 'websocket':
             socketio.emit('notification', {
                 'type': notification_type,
                 'data': data,
@@ -24,9 +30,15 @@ def send_notification(user_id, notification_type, data):
         )
         db.session.add(notification)
         db.session.commit()
+        NOTIFICATIONS_SENT.labels(notification_type, delivery).inc()
 
-    except Exception as e:
-        print(f"Failed to send notification: {str(e)}")
+    except Exception:
+        NOTIFICATIONS_FAILED.labels(notification_type).inc()
+        logger.exception('Failed to send notification', extra={
+            'event': 'notifications.send_error', 'user_id': user_id, 'type': notification_type
+        })
+    finally:
+        NOTIFICATIONS_PENDING.dec()
 
 
 def get_notification_type_enum(notification_type):
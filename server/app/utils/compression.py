@@ -0,0 +1,272 @@
+"""
+Response compression for Soko Safi
+Gzip/Brotli-encodes responses the client accepts and reuses compressed copies of repeated payloads
+"""
+
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import current_app, request
+
+from app.utils.metrics import COMPRESSION_CACHE_LOOKUPS, COMPRESSION_INPUT_BYTES, COMPRESSION_OUTPUT_BYTES, COMPRESSION_SECONDS
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Preferred encoding first when the client accepts several with the same q-value
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+    'image/svg+xml', 'text/',
+)
+
+
+def accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header
+
+    Returns:
+        dict: q-value by lower-cased coding, including '*' if present
+    """
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate(header, encodings=ENCODINGS):
+    """
+    Pick a content coding for a request
+
+    The highest q-value wins; ties go to the first of `encodings`. `*`
+    covers codings not listed explicitly, and q=0 rules a coding out.
+
+    Args:
+        header (str): The request's Accept-Encoding value
+        encodings (tuple): Codings the server can produce, in preference order
+
+    Returns:
+        str: 'br' or 'gzip', or None to send the body uncompressed
+    """
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+class StreamCompressor:
+    """Incremental encoder whose output after each chunk can be decoded right away"""
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._encoder = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 writes the gzip header and trailer
+            self._encoder = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.encoding == 'br':
+            return self._encoder.process(chunk) + self._encoder.flush()
+        return self._encoder.compress(chunk) + self._encoder.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._encoder.finish()
+        return self._encoder.flush(zlib.Z_FINISH)
+
+
+class ResponseCompressor:
+    """
+    Compresses response bodies, keeping compressed copies of cacheable ones
+
+    Cached copies are keyed by a digest of the uncompressed body, so a
+    catalogue listing served to many clients is compressed once, and a
+    changed body can never be answered with a stale copy. The cache is
+    per process and bounded by total size (least recently used first out).
+
+    Args:
+        min_bytes (int): Bodies smaller than this are sent as they are
+        gzip_level (int): zlib level, 1-9
+        brotli_quality (int): Brotli quality, 0-11
+        cache_bytes (int): Total size of cached compressed bodies; 0 disables the cache
+        cache_max_entry (int): Largest uncompressed body that is cached
+    """
+
+    def __init__(self, min_bytes=1024, gzip_level=6, brotli_quality=4, cache_bytes=16 * 1024 * 1024,
+                 cache_max_entry=2 * 1024 * 1024):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_bytes = cache_bytes
+        self.cache_max_entry = cache_max_entry
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def compress(self, data, encoding, cacheable=False):
+        """
+        Compress a whole body
+
+        Args:
+            data (bytes): Uncompressed body
+            encoding (str): 'br' or 'gzip'
+            cacheable (bool): Look up and store the result in the compressed cache
+
+        Returns:
+            bytes: Compressed body, or None if compressing would not make it smaller
+        """
+        key = None
+        if cacheable and self.cache_bytes and len(data) <= self.cache_max_entry:
+            key = (hashlib.blake2b(data, digest_size=16).digest(), encoding)
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+            COMPRESSION_CACHE_LOOKUPS.labels('hit' if cached is not None else 'miss').inc()
+            if cached is not None:
+                COMPRESSION_INPUT_BYTES.labels(encoding).inc(len(data))
+                COMPRESSION_OUTPUT_BYTES.labels(encoding).inc(len(cached or data))
+                return cached or None
+
+        start = time.perf_counter()
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            encoder = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            compressed = encoder.compress(data) + encoder.flush()
+        COMPRESSION_SECONDS.labels(encoding).inc(time.perf_counter() - start)
+        if len(compressed) >= len(data):
+            compressed = b''
+        COMPRESSION_INPUT_BYTES.labels(encoding).inc(len(data))
+        COMPRESSION_OUTPUT_BYTES.labels(encoding).inc(len(compressed or data))
+
+        if key is not None:
+            self._store(key, compressed)
+        return compressed or None
+
+    def _store(self, key, compressed):
+        # Incompressible bodies are cached as b'' so they are not retried
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = compressed
+            self._cached_bytes += len(compressed)
+            while self._cached_bytes > self.cache_bytes and self._cache:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+    def stream(self, chunks, encoding):
+        """
+        Compress a generator body chunk by chunk
+
+        Each chunk is flushed, so clients can decode it as soon as it
+        arrives; chunks of a few hundred rows lose little ratio to this.
+        """
+        encoder = StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            start = time.perf_counter()
+            output = encoder.compress(chunk)
+            COMPRESSION_SECONDS.labels(encoding).inc(time.perf_counter() - start)
+            COMPRESSION_INPUT_BYTES.labels(encoding).inc(len(chunk))
+            COMPRESSION_OUTPUT_BYTES.labels(encoding).inc(len(output))
+            if output:
+                yield output
+        tail = encoder.finish()
+        COMPRESSION_OUTPUT_BYTES.labels(encoding).inc(len(tail))
+        yield tail
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._cache), 'bytes': self._cached_bytes}
+
+
+def cacheable(method, status, cache_control):
+    """Whether a compressed copy of the body may be kept for other requests"""
+    directives = (cache_control or '').lower()
+    return method in ('GET', 'HEAD') and status == 200 and 'no-store' not in directives and 'private' not in directives
+
+
+def _compress_response(response):
+    compressor = current_app.extensions['compression']
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+            or not compressible(response.mimetype)
+            or 'no-transform' in response.headers.get('Cache-Control', '').lower()):
+        return response
+
+    # The body depends on Accept-Encoding even when this one goes out uncompressed
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compressor.stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < compressor.min_bytes:
+            return response
+        compressed = compressor.compress(data, encoding, cacheable(
+            request.method, response.status_code, response.headers.get('Cache-Control')))
+        if compressed is None:
+            return response
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    # A strong ETag names exact bytes; the compressed body is only equivalent
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(flask_app):
+    """
+    Compress responses when COMPRESSION_ENABLED is set
+
+    Uses COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY, COMPRESSION_CACHE_BYTES and
+    COMPRESSION_CACHE_MAX_ENTRY from the app config. Brotli is offered
+    only when the Brotli package is installed.
+    """
+    flask_app.extensions['compression'] = ResponseCompressor(
+        min_bytes=flask_app.config['COMPRESSION_MIN_BYTES'],
+        gzip_level=flask_app.config['COMPRESSION_GZIP_LEVEL'],
+        brotli_quality=flask_app.config['COMPRESSION_BROTLI_QUALITY'],
+        cache_bytes=flask_app.config['COMPRESSION_CACHE_BYTES'],
+        cache_max_entry=flask_app.config['COMPRESSION_CACHE_MAX_ENTRY'],
+    )
+    if flask_app.config.get('COMPRESSION_ENABLED'):
+        flask_app.after_request(_compress_response)
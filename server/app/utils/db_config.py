@@ -0,0 +1,190 @@
+"""
+Database engine configuration for Soko Safi
+Selects SQLAlchemy engine and pool options per deployment profile and tracks pool statistics
+"""
+
+import os
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.utils.green_db import eventlet_patched, green_wait_callback_installed
+from app.utils.metrics import observe_pool_wait
+
+# sqlite-dev: local SQLite file
+# postgres-prod: direct PostgreSQL connections pooled by SQLAlchemy
+# postgres-pgbouncer: PgBouncer in transaction mode does the pooling
+DB_PROFILES = ('sqlite-dev', 'postgres-prod', 'postgres-pgbouncer')
+
+
+class PoolStats:
+    """Counters for connection checkouts, wait time and pool timeouts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'total_wait_ms': round(self.total_wait * 1000, 3),
+                'avg_wait_ms': round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            wait = time.perf_counter() - start
+            pool_stats.record(wait, timed_out=True)
+            observe_pool_wait(wait, timed_out=True)
+            raise
+        wait = time.perf_counter() - start
+        pool_stats.record(wait)
+        observe_pool_wait(wait)
+        return connection
+
+
+def normalize_database_url(url: str) -> str:
+    """Render and Heroku hand out postgres:// URLs, which SQLAlchemy 2 rejects"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def detect_profile(url: str) -> str:
+    """
+    Pick the engine profile from DB_PROFILE or the database URL
+
+    Returns:
+        str: One of DB_PROFILES
+    """
+    profile = os.getenv('DB_PROFILE')
+    if profile:
+        if profile not in DB_PROFILES:
+            raise ValueError(f'DB_PROFILE must be one of: {", ".join(DB_PROFILES)}')
+        return profile
+    return 'sqlite-dev' if url.startswith('sqlite') else 'postgres-prod'
+
+
+def engine_options(profile: str, url: str = '', green: bool = False) -> dict:
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for a profile
+
+    Pool sizes and timeouts can be tuned with DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE and DB_STATEMENT_TIMEOUT_MS. QueuePool
+    waits on threading primitives, which are green on eventlet workers, so a
+    green thread waiting for a connection yields to the hub instead of
+    blocking it. If eventlet patched sockets but not threads, that wait
+    would block the hub, so green engines fall back to NullPool.
+
+    Args:
+        profile (str): One of DB_PROFILES
+        url (str): Database URL, used to spot in-memory SQLite databases
+        green (bool): psycopg2 yields to the eventlet hub (install_green_wait_callback)
+
+    Returns:
+        dict: Engine options for Flask-SQLAlchemy
+    """
+    application_name = os.getenv('DB_APPLICATION_NAME', 'soko-safi')
+    statement_timeout = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+    if profile == 'sqlite-dev':
+        if url in ('sqlite://', 'sqlite:///:memory:'):
+            # In-memory databases live in a single connection; keep SQLAlchemy's default pool
+            return {'connect_args': {'check_same_thread': False}}
+        return {
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'connect_args': {'check_same_thread': False, 'timeout': 15},
+        }
+
+    connect_args = {
+        'application_name': application_name,
+        'connect_timeout': 10,
+        # Detect connections dropped by Render's network without waiting for TCP timeouts
+        'keepalives': 1,
+        'keepalives_idle': 30,
+        'keepalives_interval': 10,
+        'keepalives_count': 3,
+    }
+
+    if profile == 'postgres-pgbouncer':
+        # PgBouncer owns the pool; it rejects the `options` startup parameter,
+        # so statement_timeout must be set on the database role instead
+        return {
+            'poolclass': NullPool,
+            'pool_pre_ping': False,
+            'connect_args': connect_args,
+        }
+
+    connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+    if green and not eventlet_patched('thread'):
+        return {
+            'poolclass': NullPool,
+            'connect_args': connect_args,
+        }
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+        # Render's managed Postgres drops idle connections; recycle before that happens
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+        'connect_args': connect_args,
+    }
+
+
+def describe_pool(engine) -> dict:
+    """
+    Current pool state and checkout statistics for an engine
+
+    Returns:
+        dict: Pool class, size, checked-out/overflow counts and wait times
+    """
+    pool = engine.pool
+    state = {'pool_class': type(pool).__name__, 'green_wait_callback': green_wait_callback_installed()}
+    if isinstance(pool, QueuePool):
+        state.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(0, pool.overflow()),
+            'timeout': pool.timeout(),
+        })
+    state.update(pool_stats.snapshot())
+    return state
@@ -2,8 +2,23 @@ from sqlalchemy import inspect, text
 from app.models import db
 
 
-def ensure_deleted_at_columns(app):
-    """Ensure `deleted_at` column exists on categories and subcategories tables.
+# (table, column, SQL type) added to existing databases when missing
+OPTIONAL_COLUMNS = [
+    ("categories", "deleted_at", "DATETIME"),
+    ("subcategories", "deleted_at", "DATETIME"),
+    ("product_images", "variants", "TEXT"),
+    ("product_images", "variants_status", "VARCHAR(20)"),
+    ("product_images", "variants_claimed_at", "DATETIME"),
+]
+
+# (table, index name) declared on the models and created on existing databases when missing
+OPTIONAL_INDEXES = [
+    ("product_images", "ix_product_images_product_id_position"),
+]
+
+
+def ensure_optional_columns(app):
+    """Ensure columns added after a table was first created exist (OPTIONAL_COLUMNS).
     This performs a simple ALTER TABLE ADD COLUMN when using SQLite. For other
     dialects this function logs a message recommending a migration.
 
@@ -18,12 +33,7 @@ def ensure_deleted_at_columns(app):
         print(f"Failed to initialize database inspector: {e}")
         return
 
-    tables = [
-        ("categories", "deleted_at"),
-        ("subcategories", "deleted_at"),
-    ]
-
-    for table_name, col in tables:
+    for table_name, col, col_type in OPTIONAL_COLUMNS:
         if not insp.has_table(table_name):
             continue
         columns = [c["name"] for c in insp.get_columns(table_name)]
@@ -34,10 +44,10 @@ def ensure_deleted_at_columns(app):
         if engine.dialect.name == "sqlite":
             try:
                 # SQLite doesn't support parameterized table/column names, so validate input
-                if not table_name.isalnum() or not col.replace('_', '').isalnum():
+                if not table_name.replace('_', '').isalnum() or not col.replace('_', '').isalnum():
                     raise ValueError(f"Invalid table or column name: {table_name}.{col}")
                 
-                sql = text(f"ALTER TABLE {table_name} ADD COLUMN {col} DATETIME")
+                sql = text(f"ALTER TABLE {table_name} ADD COLUMN {col} {col_type}")
                 with engine.connect() as conn:
                     conn.execute(sql)
                     conn.commit()
@@ -48,3 +58,20 @@ def ensure_deleted_at_columns(app):
         else:
             # For other DBs, log and skip - migrations required
             print(f"Column {col} missing on {table_name}. Please run a DB migration for {engine.dialect.name}.")
+
+
+def ensure_indexes(app):
+    """Ensure indexes added after a table was first created exist (OPTIONAL_INDEXES).
+    db.create_all() only creates indexes together with new tables. CREATE INDEX
+    is portable, so unlike columns this runs on every dialect.
+
+    NOTE: this function expects to be called while the Flask app context is active.
+    """
+    engine = db.engine
+    for table_name, index_name in OPTIONAL_INDEXES:
+        table = db.metadata.tables[table_name]
+        index = next(i for i in table.indexes if i.name == index_name)
+        try:
+            index.create(engine, checkfirst=True)
+        except Exception as e:
+            print(f"Failed to create index {index_name}: {e}")
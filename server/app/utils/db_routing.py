@@ -0,0 +1,90 @@
+"""
+Read-replica routing for Soko Safi
+Sends reads from safe GET requests to replica databases and everything else to the primary
+"""
+
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Session key holding the time until which this client reads from the primary
+PRIMARY_UNTIL_KEY = '_primary_until'
+
+
+def replica_bind_keys(replica_urls):
+    """Bind keys used for DATABASE_REPLICA_URLS entries"""
+    return [f'replica_{index}' for index in range(len(replica_urls))]
+
+
+def use_primary():
+    """Send the rest of this request's queries to the primary database"""
+    if has_request_context():
+        g._use_primary = True
+
+
+def _mark_write():
+    """
+    Stick to the primary after a write
+
+    The rest of the request reads from the primary, and so do this client's
+    requests for DATABASE_REPLICA_STICKY_SECONDS, so users read their own
+    writes even while replicas lag behind.
+
+    The sticky marker is only stored when replicas are configured and the
+    client already has a session (logged in, or sticky from an earlier
+    write): anonymous writes such as M-Pesa callbacks would otherwise create
+    a throwaway server-side session and Set-Cookie on every request.
+    """
+    if not has_request_context():
+        return
+    g._use_primary = True
+    if not current_app.config.get('DATABASE_REPLICA_BINDS'):
+        return
+    sticky_seconds = current_app.config.get('DATABASE_REPLICA_STICKY_SECONDS', 0)
+    if sticky_seconds and (session.get('user_id') or PRIMARY_UNTIL_KEY in session):
+        session[PRIMARY_UNTIL_KEY] = time.time() + sticky_seconds
+
+
+def _replica_allowed():
+    if not has_request_context() or request.method not in SAFE_METHODS:
+        return False
+    if g.get('_use_primary'):
+        return False
+    return session.get(PRIMARY_UNTIL_KEY, 0) <= time.time()
+
+
+class RoutingSession(Session):
+    """
+    Session that routes plain SELECTs on safe requests to a replica
+
+    Flushes, bulk UPDATE/DELETE statements, raw SQL and every query on
+    non-GET requests go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and getattr(clause, 'is_select', False)
+            and _replica_allowed()
+        ):
+            replica_keys = current_app.config.get('DATABASE_REPLICA_BINDS')
+            if replica_keys:
+                return self._db.engines[random.choice(replica_keys)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(db_session, flush_context):
+    _mark_write()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _after_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
@@ -0,0 +1,89 @@
+"""
+Streaming export helpers for Soko Safi
+Streams admin listings as NDJSON or CSV without loading whole tables into memory
+"""
+
+import csv
+import io
+
+import msgspec
+from flask import Response, request, stream_with_context
+
+from app.utils.serialization import json_encoder
+
+# Rows fetched per server-side cursor round trip and written per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def stream_export(query, to_row, filename):
+    """
+    Stream a query as newline-delimited JSON or CSV
+
+    The query is iterated with yield_per, which uses a server-side cursor
+    (stream_results) on PostgreSQL, so memory stays bounded by the batch
+    size regardless of table size. The output format is chosen with the
+    `format` query parameter (ndjson by default).
+
+    Args:
+        query: SQLAlchemy query to export
+        to_row: Callable turning a model instance into a dict or Struct
+        filename (str): Download name without extension
+
+    Returns:
+        Response: Chunked streaming response, or an error tuple
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return {
+            'error': 'Invalid format',
+            'message': f'format must be one of: {", ".join(EXPORT_FORMATS)}'
+        }, 400
+
+    rows = (to_row(obj) for obj in query.yield_per(EXPORT_BATCH_SIZE))
+    chunks = _ndjson_chunks(rows) if export_format == 'ndjson' else _csv_chunks(rows)
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
+
+
+def _ndjson_chunks(rows):
+    """Yield NDJSON in chunks of EXPORT_BATCH_SIZE rows"""
+    buffer = bytearray()
+    count = 0
+    for row in rows:
+        json_encoder.encode_into(row, buffer, -1)
+        buffer.extend(b'\n')
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _csv_chunks(rows):
+    """Yield CSV (header first) in chunks of EXPORT_BATCH_SIZE rows"""
+    buffer = io.StringIO()
+    writer = None
+    count = 0
+    for row in rows:
+        row = msgspec.to_builtins(row)
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
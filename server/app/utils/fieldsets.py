@@ -0,0 +1,159 @@
+"""
+Sparse fieldsets for Soko Safi
+Parses ?fields= and ?include= into loader options and trimmed response payloads
+
+    GET /api/products/?fields=id,title,price
+    GET /api/products/<id>?include=images,category&fields[images]=url,srcset
+    GET /api/orders/?include=items&fields=id,status&fields[items]=product_id,quantity
+
+Only the selected columns are loaded (load_only), included relations are
+loaded for every row in one extra query (selectinload), and the payload
+carries only the selected fields. `id` is always returned.
+"""
+
+from functools import cached_property
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import lazyload, load_only, selectinload
+
+
+class FieldsetError(ValueError):
+    """A field or relation the resource does not have was requested"""
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class Fieldset:
+    """
+    Fields and relations a client may select for one resource type
+
+    Args:
+        name (str): Resource type, used in error messages
+        model: SQLAlchemy model the rows come from
+        schema (ModelSchema): Schema used to serialise the rows
+        relations (dict): include name -> (relationship attribute, Fieldset); the
+            schema needs a related field of the same name
+        columns (dict): schema field -> model columns it is computed from, for
+            fields that are not a column of the same name
+        always_load (tuple): Columns loaded whatever the selection, e.g. ones
+            read by access checks
+    """
+
+    def __init__(self, name, model, schema, relations=None, columns=None, always_load=()):
+        self.name = name
+        self.model = model
+        self.schema = schema
+        self.relations = relations or {}
+        self.columns = columns or {}
+        self.always_load = always_load
+
+    @cached_property
+    def fields(self):
+        """JSON field name -> schema attribute; relations are selected with include= instead"""
+        return {name: attribute for name, attribute in self.schema.field_names().items()
+                if attribute not in self.relations}
+
+    @cached_property
+    def _mapper(self):
+        return inspect(self.model)
+
+    def parse_fields(self, value, label=None):
+        """
+        Validate a comma separated field list
+
+        Returns:
+            frozenset: Selected JSON field names, or None for every field
+        """
+        if value is None:
+            return None
+        names = _names(value)
+        unknown = sorted(set(names) - self.fields.keys())
+        if unknown:
+            raise FieldsetError(f"Unknown field(s) for {label or self.name}: {', '.join(unknown)}")
+        if 'id' in self.fields:
+            names.append('id')
+        return frozenset(names)
+
+    def select(self, args):
+        """
+        Read fields=, include= and fields[<include>]= from query arguments
+
+        Args:
+            args: request.args, or any mapping of query parameters
+
+        Returns:
+            Selection: What to load and serialise
+
+        Raises:
+            FieldsetError: For unknown fields or includes, or fields[x] without include=x
+        """
+        includes = _names(args.get('include'))
+        unknown = sorted(set(includes) - self.relations.keys())
+        if unknown:
+            raise FieldsetError(f"Unknown include(s) for {self.name}: {', '.join(unknown)}")
+        for key in args:
+            if key.startswith('fields[') and key.endswith(']') and key[7:-1] not in includes:
+                raise FieldsetError(f'{key} needs include={key[7:-1]}')
+
+        related = {}
+        for name in includes:
+            attribute, fieldset = self.relations[name]
+            related[name] = (attribute, Selection(fieldset, fieldset.parse_fields(args.get(f'fields[{name}]'), name)))
+        return Selection(self, self.parse_fields(args.get('fields')), related)
+
+    def load_columns(self, fields, relation_attributes=()):
+        """Model attributes to load for `fields` and the foreign keys of the included relations"""
+        column_keys = {attr.key for attr in self._mapper.column_attrs}
+        keys = {self._mapper.get_property_by_column(column).key for column in self._mapper.primary_key}
+        keys.update(self.always_load)
+        for name in fields:
+            attribute = self.fields[name]
+            keys.update(self.columns.get(attribute, (attribute,) if attribute in column_keys else ()))
+        for attribute in relation_attributes:
+            # A many-to-one relation is looked up by this row's foreign key
+            for column in self._mapper.relationships[attribute].local_columns:
+                keys.add(self._mapper.get_property_by_column(column).key)
+        return [getattr(self.model, key) for key in sorted(keys)]
+
+
+class Selection:
+    """Fields of one resource to return, plus the related rows to include"""
+
+    def __init__(self, fieldset, fields=None, related=None):
+        self.fieldset = fieldset
+        self.fields = fields
+        self.related = related or {}
+
+    def options(self):
+        """
+        Loader options for a query over the fieldset's model
+
+        Relationships that are not included are not loaded at all, so
+        eager (lazy='joined') relations the schema never reads cost nothing.
+        """
+        model = self.fieldset.model
+        options = [lazyload('*')]
+        if self.fields is not None:
+            attributes = [attribute for attribute, _ in self.related.values()]
+            options.append(load_only(*self.fieldset.load_columns(self.fields, attributes)))
+        for attribute, selection in self.related.values():
+            option = selectinload(getattr(model, attribute))
+            if selection.fields is not None:
+                option = option.load_only(*selection.fieldset.load_columns(selection.fields))
+            options.append(option)
+        return options
+
+    def serialize(self, obj):
+        """Schema instance, or a dict of the selected fields, for a row loaded with options()"""
+        related = {}
+        for name, (attribute, selection) in self.related.items():
+            value = getattr(obj, attribute)
+            if isinstance(value, list):
+                related[name] = [selection.serialize(child) for child in value]
+            else:
+                related[name] = selection.serialize(value) if value is not None else None
+        if self.fields is None:
+            return self.fieldset.schema.from_model(obj, **related)
+        return self.fieldset.schema.partial(obj, self.fields, **related)
@@ -0,0 +1,67 @@
+"""
+Cooperative PostgreSQL I/O for Soko Safi
+Makes sure psycopg2 yields to the eventlet hub while it waits on the database
+
+psycopg2 talks to the server through libpq in C, so eventlet's socket
+patching never sees it: without a wait callback a slow query on one green
+thread freezes every other green thread on the worker, Socket.IO clients
+included. A full eventlet.monkey_patch() installs eventlet's callback, but
+only if psycopg2 is importable at that moment and psycopg patching was not
+left out (a partial monkey_patch(socket=True, ...) skips it silently).
+"""
+
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def eventlet_patched(module='socket'):
+    """Whether eventlet has monkey-patched `module` (socket, thread, ...)"""
+    # Nothing is patched if eventlet was never imported; importing it just to check is slow
+    if 'eventlet' not in sys.modules:
+        return False
+    from eventlet import patcher
+    return patcher.is_monkey_patched(module)
+
+
+def install_green_wait_callback():
+    """
+    Make psycopg2 cooperative on monkey-patched eventlet workers
+
+    Installs eventlet's wait callback if monkey patching did not. Does
+    nothing outside eventlet or when psycopg2 is not installed. With
+    DB_GREEN_WAIT_CALLBACK=false the callback is removed instead, so queries
+    block the worker (a baseline for benchmarks). Must run before the first
+    connection is opened. COPY is not available on connections in green mode.
+
+    Returns:
+        bool: True if psycopg2 yields to the hub
+    """
+    if not eventlet_patched():
+        return False
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+
+    if os.getenv('DB_GREEN_WAIT_CALLBACK', 'True').lower() != 'true':
+        extensions.set_wait_callback(None)
+        logger.warning('psycopg2 wait callback disabled; queries block the eventlet hub',
+                       extra={'event': 'db.green_wait_callback', 'installed': False})
+        return False
+
+    if extensions.get_wait_callback() is None:
+        from eventlet.support.psycopg2_patcher import make_psycopg_green
+        make_psycopg_green()
+        logger.info('psycopg2 wait callback installed', extra={'event': 'db.green_wait_callback', 'installed': True})
+    return True
+
+
+def green_wait_callback_installed():
+    """Whether psycopg2 currently has a wait callback"""
+    if 'psycopg2' not in sys.modules:
+        return False
+    from psycopg2 import extensions
+    return extensions.get_wait_callback() is not None
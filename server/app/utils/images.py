@@ -0,0 +1,115 @@
+"""
+Image helpers for Soko Safi
+Identifies uploaded images by their leading bytes and renders resized derivatives
+"""
+
+import io
+
+# Bytes needed to recognise every supported format
+IMAGE_HEADER_SIZE = 12
+
+# (content type, extension) by signature check on the first bytes
+IMAGE_TYPES = {
+    'png': ('image/png', 'png'),
+    'jpeg': ('image/jpeg', 'jpg'),
+    'gif': ('image/gif', 'gif'),
+    'webp': ('image/webp', 'webp'),
+}
+
+
+def sniff_image_type(head):
+    """
+    Identify an image format from its first bytes
+
+    Args:
+        head (bytes): At least IMAGE_HEADER_SIZE leading bytes of the file
+
+    Returns:
+        str: png, jpeg, gif or webp, or None if the bytes are not a supported image
+    """
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def read_head(stream, size):
+    """
+    Read up to `size` bytes, looping over short reads from network streams
+
+    Returns:
+        bytes: The bytes read; shorter than `size` only at end of stream
+    """
+    chunks, remaining = [], size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+# Encoder options per derivative format
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'avif': ('AVIF', 'image/avif', {'quality': 50, 'speed': 6}),
+}
+
+
+def available_formats(formats):
+    """
+    Drop formats the installed Pillow cannot encode
+
+    AVIF needs Pillow built with libavif or the pillow-avif-plugin package.
+
+    Returns:
+        list: The encodable subset of `formats`, in order
+    """
+    from PIL import Image
+    try:
+        import pillow_avif  # noqa: F401  registers the AVIF encoder
+    except ImportError:
+        pass
+    Image.init()
+    return [fmt for fmt in formats if DERIVATIVE_FORMATS[fmt][0] in Image.SAVE]
+
+
+def render_derivatives(data, widths, formats):
+    """
+    Resize an image to each width and encode it in each format
+
+    CPU-bound; meant to run in a worker process. Images are never upscaled,
+    so widths at or above the original collapse into one original-width
+    derivative.
+
+    Args:
+        data (bytes): Original image
+        widths (list): Target widths in pixels
+        formats (list): Keys of DERIVATIVE_FORMATS, already checked with available_formats
+
+    Returns:
+        list: (width, format, bytes) for each derivative, smallest first
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    targets = sorted({min(width, image.width) for width in widths})
+    derivatives = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            pillow_format, _, options = DERIVATIVE_FORMATS[fmt]
+            out = io.BytesIO()
+            resized.save(out, pillow_format, **options)
+            derivatives.append((width, fmt, out.getvalue()))
+    return derivatives
@@ -0,0 +1,120 @@
+"""
+Key-value store helpers for Soko Safi
+Provides Redis clients and an in-process stand-in that speaks the same subset of commands
+"""
+
+import heapq
+import threading
+import time
+
+
+class MemoryStore:
+    """
+    In-process stand-in for the Redis commands used by the app
+
+    Supports get, set (with ex/nx), delete, exists, incr and expire. Data is
+    per-process, so it is only suitable for development, tests and benchmarks
+    or for state that does not need to be shared between workers.
+
+    Expired keys are dropped when read, and also swept on every write from a
+    heap of expiry times, so keys that are never read again (old rate limit
+    windows) do not pile up.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        # (expires_at, name); entries whose expiry has since changed are skipped
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+
+    def _set_expiry(self, name, seconds):
+        expires_at = time.monotonic() + int(seconds)
+        self._expires[name] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, name))
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, name = heapq.heappop(self._expiry_heap)
+            if self._expires.get(name) == expires_at:
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+
+    def _alive(self, name):
+        expires_at = self._expires.get(name)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return name in self._data
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode('utf-8')
+
+    def get(self, name):
+        with self._lock:
+            return self._data[name] if self._alive(name) else None
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            self._purge_expired()
+            if nx and self._alive(name):
+                return None
+            self._data[name] = self._encode(value)
+            if ex is not None:
+                self._set_expiry(name, ex)
+            else:
+                self._expires.pop(name, None)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            removed = 0
+            for name in names:
+                if self._alive(name):
+                    removed += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return removed
+
+    def exists(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._alive(name))
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._purge_expired()
+            value = int(self._data[name]) + amount if self._alive(name) else amount
+            self._data[name] = self._encode(value)
+            return value
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if not self._alive(name):
+                return False
+            self._set_expiry(name, seconds)
+            return True
+
+
+def create_store(url):
+    """
+    Create a key-value client from a URL
+
+    Args:
+        url (str): memory:// for the in-process stand-in, otherwise any
+            redis://, rediss:// or unix:// URL understood by redis-py
+
+    Returns:
+        MemoryStore or redis.Redis: Client exposing the Redis command subset
+    """
+    if not url or url.startswith('memory://'):
+        return MemoryStore()
+
+    try:
+        import redis
+    except ImportError:
+        raise ValueError(f'redis package is required for store URL {url}')
+    return redis.Redis.from_url(url)
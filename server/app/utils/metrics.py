@@ -0,0 +1,255 @@
+"""
+Prometheus metrics for Soko Safi
+HTTP, database pool, Socket.IO, M-Pesa and notification metrics exposed at /metrics
+
+With several gunicorn workers, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py
+does this) so every worker writes its samples to a shared directory and
+/metrics aggregates all of them, whichever worker serves the scrape.
+"""
+
+import hmac
+import inspect
+import os
+import time
+from functools import wraps
+
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+HTTP_REQUEST_DURATION = Histogram(
+    'soko_http_request_duration_seconds',
+    'HTTP request latency',
+    ['method', 'blueprint', 'endpoint', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    'soko_http_requests_in_progress',
+    'HTTP requests being handled',
+    multiprocess_mode='livesum',
+)
+
+DB_CONNECTIONS_OPEN = Gauge(
+    'soko_db_connections_open',
+    'Database connections held by the pool',
+    multiprocess_mode='livesum',
+)
+DB_CONNECTIONS_CHECKED_OUT = Gauge(
+    'soko_db_connections_checked_out',
+    'Database connections in use',
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAIT = Histogram(
+    'soko_db_pool_wait_seconds',
+    'Time spent waiting for a pooled database connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+DB_POOL_TIMEOUTS = Counter(
+    'soko_db_pool_timeouts_total',
+    'Connection checkouts that timed out waiting for the pool',
+)
+
+SOCKETIO_CONNECTED_CLIENTS = Gauge(
+    'soko_socketio_connected_clients',
+    'Connected Socket.IO clients',
+    multiprocess_mode='livesum',
+)
+SOCKETIO_EVENTS = Counter(
+    'soko_socketio_events_total',
+    'Socket.IO events received',
+    ['event'],
+)
+
+MPESA_REQUEST_DURATION = Histogram(
+    'soko_mpesa_request_duration_seconds',
+    'Daraja API call latency',
+    ['endpoint'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+MPESA_ERRORS = Counter(
+    'soko_mpesa_errors_total',
+    'Failed Daraja API calls',
+    ['endpoint', 'reason'],
+)
+
+NOTIFICATIONS_PENDING = Gauge(
+    'soko_notifications_pending',
+    'Notifications being delivered',
+    multiprocess_mode='livesum',
+)
+NOTIFICATIONS_SENT = Counter(
+    'soko_notifications_total',
+    'Notifications sent, by type and whether the user was connected',
+    ['type', 'delivery'],
+)
+NOTIFICATIONS_FAILED = Counter(
+    'soko_notifications_failed_total',
+    'Notifications that could not be stored',
+    ['type'],
+)
+
+UPLOAD_DEDUP_LOOKUPS = Counter(
+    'soko_upload_dedup_lookups_total',
+    'Image uploads checked against uploaded_assets, by hit or miss',
+    ['result'],
+)
+UPLOAD_DEDUP_SAVED_BYTES = Counter(
+    'soko_upload_dedup_saved_bytes_total',
+    'Bytes not sent to Cloudinary because the image was already stored',
+)
+
+COMPRESSION_INPUT_BYTES = Counter(
+    'soko_http_compression_input_bytes_total',
+    'Response bytes before compression, by content coding',
+    ['encoding'],
+)
+COMPRESSION_OUTPUT_BYTES = Counter(
+    'soko_http_compression_output_bytes_total',
+    'Response bytes sent after compression, by content coding',
+    ['encoding'],
+)
+COMPRESSION_SECONDS = Counter(
+    'soko_http_compression_seconds_total',
+    'CPU time spent compressing responses, by content coding',
+    ['encoding'],
+)
+COMPRESSION_CACHE_LOOKUPS = Counter(
+    'soko_http_compression_cache_lookups_total',
+    'Cacheable responses looked up in the compressed body cache, by hit or miss',
+    ['result'],
+)
+
+BATCH_SUBREQUESTS = Histogram(
+    'soko_batch_subrequests',
+    'Sub-requests per /api/batch call',
+    buckets=(1, 2, 4, 8, 12, 16, 20, 32, 50),
+)
+
+
+@event.listens_for(Pool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    DB_CONNECTIONS_OPEN.inc()
+
+
+@event.listens_for(Pool, 'close')
+def _on_close(dbapi_connection, connection_record):
+    DB_CONNECTIONS_OPEN.dec()
+
+
+@event.listens_for(Pool, 'detach')
+def _on_detach(dbapi_connection, connection_record):
+    DB_CONNECTIONS_OPEN.dec()
+
+
+@event.listens_for(Pool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_CONNECTIONS_CHECKED_OUT.inc()
+
+
+@event.listens_for(Pool, 'checkin')
+def _on_checkin(dbapi_connection, connection_record):
+    DB_CONNECTIONS_CHECKED_OUT.dec()
+
+
+def observe_pool_wait(seconds, timed_out=False):
+    """Record a connection checkout wait"""
+    if timed_out:
+        DB_POOL_TIMEOUTS.inc()
+    else:
+        DB_POOL_WAIT.observe(seconds)
+
+
+def track_socket_event(name):
+    """
+    Decorator to count a Socket.IO event and keep the connected client gauge
+
+    Usage:
+        @socketio.on('join')
+        @track_socket_event('join')
+        def handle_join(data):
+            ...
+    """
+    def count(result):
+        SOCKETIO_EVENTS.labels(name).inc()
+        if name == 'connect' and result is not False:
+            SOCKETIO_CONNECTED_CLIENTS.inc()
+        elif name == 'disconnect':
+            SOCKETIO_CONNECTED_CLIENTS.dec()
+
+    def decorator(f):
+        # python-socketio's AsyncServer only awaits handlers that are coroutine functions
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def decorated_coroutine(*args, **kwargs):
+                result = await f(*args, **kwargs)
+                count(result)
+                return result
+            return decorated_coroutine
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Count after the call: Flask-SocketIO retries connect handlers
+            # without arguments when the first call raises TypeError
+            result = f(*args, **kwargs)
+            count(result)
+            return result
+        return decorated_function
+    return decorator
+
+
+def _start_timer():
+    g._metrics_start = time.perf_counter()
+    HTTP_REQUESTS_IN_PROGRESS.inc()
+
+
+def _observe_request(response):
+    start = g.get('_metrics_start')
+    if start is not None:
+        HTTP_REQUEST_DURATION.labels(
+            request.method,
+            request.blueprint or 'app',
+            request.endpoint or 'unmatched',
+            response.status_code,
+        ).observe(time.perf_counter() - start)
+    return response
+
+
+def _end_request(exc):
+    if g.pop('_metrics_start', None) is not None:
+        HTTP_REQUESTS_IN_PROGRESS.dec()
+
+
+def metrics_view():
+    """
+    Prometheus scrape endpoint
+
+    Requires METRICS_AUTH_TOKEN as a bearer token when set. Without a token
+    it is only served outside gunicorn (PROMETHEUS_MULTIPROC_DIR unset),
+    i.e. in local development; deployments answer 404 until a token is
+    configured.
+    """
+    token = current_app.config.get('METRICS_AUTH_TOKEN')
+    multiprocess_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if not token and multiprocess_dir:
+        return Response('Not Found\n', status=404, mimetype='text/plain')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    if multiprocess_dir:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(flask_app):
+    """Time every request and serve /metrics"""
+    flask_app.before_request(_start_timer)
+    flask_app.after_request(_observe_request)
+    flask_app.teardown_request(_end_request)
+    flask_app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,139 @@
+"""
+Password hashing support for Soko Safi
+Runs bcrypt in native threads with a concurrency cap and raises the cost when the latency budget allows
+"""
+
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# Latency budget for a single hash/verify, the configured cost floor and the ceiling
+PASSWORD_HASH_TARGET_MS = float(os.getenv('PASSWORD_HASH_TARGET_MS', 250))
+PASSWORD_HASH_MIN_ROUNDS = int(os.getenv('PASSWORD_HASH_MIN_ROUNDS', 12))
+PASSWORD_HASH_MAX_ROUNDS = int(os.getenv('PASSWORD_HASH_MAX_ROUNDS', 14))
+# Maximum bcrypt jobs running at once per worker process
+PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 2))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix='bcrypt')
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_CONCURRENCY)
+
+
+def _eventlet_tpool():
+    """Return eventlet's tpool when running on a monkey-patched eventlet worker"""
+    if 'eventlet' not in sys.modules:
+        return None
+    from eventlet import patcher, tpool
+    return tpool if patcher.is_monkey_patched('thread') else None
+
+
+def run_in_native_thread(fn, *args):
+    """
+    Run a CPU-bound call in a native OS thread and wait for the result
+
+    On eventlet workers the standard threading module is green, so the call
+    goes through eventlet.tpool and the hub keeps serving other green threads
+    while bcrypt runs. Elsewhere a ThreadPoolExecutor is used. At most
+    PASSWORD_HASH_CONCURRENCY calls run at once; others wait for a slot.
+
+    Args:
+        fn: Callable to run
+        *args: Arguments passed to fn
+
+    Returns:
+        The return value of fn
+    """
+    with _slots:
+        tpool = _eventlet_tpool()
+        if tpool is not None:
+            return tpool.execute(fn, *args)
+        return _executor.submit(fn, *args).result()
+
+
+class CostPolicy:
+    """
+    Chooses the bcrypt cost, starting at the configured floor
+
+    Every hash/verify reports its duration, normalised to the cost of
+    PASSWORD_HASH_MIN_ROUNDS (each extra round doubles the work), and
+    smoothed with an exponential moving average. When the estimated time at
+    the current target is under half the budget, the target is raised to
+    what the budget allows. It is never lowered: timings rise under load or
+    a login flood, and following them down would weaken stored hashes.
+    """
+
+    SMOOTHING = 0.2
+
+    def __init__(self, budget_ms, min_rounds, max_rounds):
+        self.budget = budget_ms / 1000
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.base_seconds = None
+        self.target_rounds = min(min_rounds, max_rounds)
+        self._lock = threading.Lock()
+
+    def record(self, rounds, seconds):
+        """
+        Record how long an operation at a given cost took
+
+        Args:
+            rounds (int): bcrypt cost of the operation
+            seconds (float): Wall time spent in bcrypt
+        """
+        base = seconds / (2 ** (rounds - self.min_rounds))
+        with self._lock:
+            if self.base_seconds is None:
+                self.base_seconds = base
+            else:
+                self.base_seconds += self.SMOOTHING * (base - self.base_seconds)
+
+            estimate = self.base_seconds * 2 ** (self.target_rounds - self.min_rounds)
+            if estimate >= self.budget / 2:
+                return
+
+            ideal = self.min_rounds + round(math.log2(self.budget / self.base_seconds))
+            self.target_rounds = max(self.target_rounds, min(ideal, self.max_rounds))
+
+
+cost_policy = CostPolicy(PASSWORD_HASH_TARGET_MS, PASSWORD_HASH_MIN_ROUNDS, PASSWORD_HASH_MAX_ROUNDS)
+
+
+def hash_rounds(hashed: str) -> int:
+    """
+    Read the cost factor from a bcrypt hash such as $2b$12$...
+
+    Returns:
+        int: Cost factor, or 0 if the hash is not a bcrypt hash
+    """
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def _timed(fn, *args):
+    """Call fn in the worker thread and return (result, seconds)"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def hashpw(password: bytes) -> bytes:
+    """Hash a password at the current target cost in a native thread"""
+    rounds = cost_policy.target_rounds
+    hashed, seconds = run_in_native_thread(_timed, bcrypt.hashpw, password, bcrypt.gensalt(rounds))
+    cost_policy.record(rounds, seconds)
+    return hashed
+
+
+def checkpw(password: bytes, hashed: bytes) -> bool:
+    """Check a password against a bcrypt hash in a native thread"""
+    matches, seconds = run_in_native_thread(_timed, bcrypt.checkpw, password, hashed)
+    rounds = hash_rounds(hashed.decode('utf-8'))
+    if rounds:
+        cost_policy.record(rounds, seconds)
+    return matches
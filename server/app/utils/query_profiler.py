@@ -0,0 +1,194 @@
+"""
+SQL query profiler for Soko Safi
+Counts queries and database time per request and flags repeated statements (N+1 patterns)
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text kept in logs and route statistics
+STATEMENT_PREVIEW_LENGTH = 200
+
+
+class RequestProfile:
+    """Queries run while handling a single request"""
+
+    __slots__ = ('queries', 'db_time', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.db_time += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold):
+        """
+        Statements run at least `threshold` times with different parameters
+
+        Returns:
+            list: (statement, count) pairs, most repeated first
+        """
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+class RouteStats:
+    """Per-route query totals for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, profile, repeated):
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                'route': route,
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_ms': 0.0,
+                'max_db_ms': 0.0,
+                'n_plus_one': 0,
+                'repeated_statement': None,
+            })
+            db_ms = profile.db_time * 1000
+            stats['requests'] += 1
+            stats['queries'] += profile.queries
+            stats['max_queries'] = max(stats['max_queries'], profile.queries)
+            stats['db_ms'] += db_ms
+            stats['max_db_ms'] = max(stats['max_db_ms'], db_ms)
+            if repeated:
+                stats['n_plus_one'] += 1
+                stats['repeated_statement'] = repeated[0][0][:STATEMENT_PREVIEW_LENGTH]
+
+    def worst(self, sort='queries', limit=20):
+        """
+        Routes ordered by average queries, average database time or N+1 hits
+
+        Args:
+            sort (str): queries, db_ms or n_plus_one
+            limit (int): Maximum number of routes returned
+
+        Returns:
+            list: Route statistics dictionaries
+        """
+        with self._lock:
+            routes = []
+            for stats in self._routes.values():
+                requests = stats['requests']
+                routes.append({
+                    **stats,
+                    'db_ms': round(stats['db_ms'], 3),
+                    'max_db_ms': round(stats['max_db_ms'], 3),
+                    'avg_queries': round(stats['queries'] / requests, 2),
+                    'avg_db_ms': round(stats['db_ms'] / requests, 3),
+                })
+        key = {'queries': 'avg_queries', 'db_ms': 'avg_db_ms'}.get(sort, sort)
+        routes.sort(key=lambda stats: stats[key], reverse=True)
+        return routes[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStats()
+
+
+def _current_profile():
+    if not has_request_context():
+        return None
+    return g.get('_sql_profile')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile() is not None:
+        conn.info.setdefault('_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    starts = conn.info.get('_query_start')
+    if profile is not None and starts:
+        profile.record(statement, time.perf_counter() - starts.pop())
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and not conn.closed and not conn.invalidated:
+        conn.info.pop('_query_start', None)
+
+
+ENGINE_LISTENERS = (
+    ('before_cursor_execute', _before_cursor_execute),
+    ('after_cursor_execute', _after_cursor_execute),
+    ('handle_error', _handle_error),
+)
+
+
+def _start_profile():
+    g._sql_profile = RequestProfile()
+
+
+def _finish_profile(response):
+    profile = g.pop('_sql_profile', None)
+    if profile is None:
+        return response
+
+    threshold = current_app.config['SQL_N_PLUS_ONE_THRESHOLD']
+    repeated = profile.repeated(threshold)
+    db_ms = profile.db_time * 1000
+    # Query counts and timings help attackers probe expensive endpoints; only admins see them
+    if current_app.config.get('SQL_PROFILER_ENDPOINT') or session.get('user_role') == 'admin':
+        response.headers.add('Server-Timing', f'db;dur={db_ms:.2f};desc="{profile.queries} queries"')
+
+    route = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+    route_stats.record(route, profile, repeated)
+
+    record = {
+        'event': 'sql_profile',
+        'route': route,
+        'status': response.status_code,
+        'queries': profile.queries,
+        'db_ms': round(db_ms, 3),
+    }
+    if repeated:
+        record['repeated'] = [
+            {'statement': statement[:STATEMENT_PREVIEW_LENGTH], 'count': count}
+            for statement, count in repeated
+        ]
+        logger.warning('Repeated SQL statements', extra=record)
+    else:
+        logger.info('SQL profile', extra=record)
+    return response
+
+
+def init_query_profiler(flask_app):
+    """
+    Profile SQL for every request when SQL_PROFILER_ENABLED is set
+
+    Logs one structured record per request with the query count and database
+    time, which admins (or everyone, with SQL_PROFILER_ENDPOINT) also get in a
+    Server-Timing header. Requests that run the same statement
+    SQL_N_PLUS_ONE_THRESHOLD or more times are logged as warnings.
+    """
+    if not flask_app.config.get('SQL_PROFILER_ENABLED'):
+        return
+    # Registered only when enabled, so unprofiled processes pay nothing per statement
+    for name, listener in ENGINE_LISTENERS:
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+    flask_app.before_request(_start_profile)
+    flask_app.after_request(_finish_profile)
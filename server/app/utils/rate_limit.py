@@ -0,0 +1,137 @@
+"""
+Rate limiting for Soko Safi
+Sliding-window request limits kept in-process or in a Redis-protocol store
+"""
+
+import math
+import time
+from functools import lru_cache, wraps
+
+from flask import current_app, request, session
+
+from app.utils.kv_store import create_store
+
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+
+@lru_cache(maxsize=None)
+def parse_limit(limit):
+    """
+    Parse a limit such as '5/minute'
+
+    Returns:
+        tuple: (allowed requests, period in seconds)
+    """
+    count, _, unit = limit.partition('/')
+    unit = unit.strip().lower().rstrip('s')
+    if unit not in PERIODS:
+        raise ValueError(f'Invalid rate limit: {limit}')
+    return int(count), PERIODS[unit]
+
+
+def init_rate_limiter(flask_app):
+    """Attach the rate limit store selected by RATE_LIMIT_STORE_URL"""
+    flask_app.extensions['rate_limit_store'] = create_store(flask_app.config.get('RATE_LIMIT_STORE_URL'))
+
+
+def client_ip():
+    """
+    Client IP
+
+    X-Forwarded-For is never read here: it is client-supplied unless a proxy
+    rewrites it. Behind a proxy, set PROXY_FIX_X_FOR to its hop count so
+    ProxyFix puts the address the proxy saw in remote_addr.
+    """
+    return request.remote_addr
+
+
+def hit(name, identifier, limit):
+    """
+    Count a request against a limit
+
+    Uses a sliding-window approximation over two fixed windows: the previous
+    window's count is weighted by how much of it still overlaps the sliding
+    window. Store errors fail open so an outage never blocks logins.
+
+    Args:
+        name (str): Limit name, usually the endpoint
+        identifier (str): Who is being limited (IP, email, user id...)
+        limit (str): Limit such as '5/minute'
+
+    Returns:
+        int: 0 if allowed, otherwise seconds to wait before retrying
+    """
+    if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+        return 0
+
+    allowed, period = parse_limit(limit)
+    now = time.time()
+    window = int(now // period)
+    elapsed = (now % period) / period
+    prefix = f'rl:{name}:{period}:{identifier}:'
+
+    store = current_app.extensions['rate_limit_store']
+    try:
+        current = store.incr(f'{prefix}{window}')
+        if current == 1:
+            store.expire(f'{prefix}{window}', period * 2)
+        previous = int(store.get(f'{prefix}{window - 1}') or 0)
+    except Exception as e:
+        current_app.logger.error(f"Rate limit store unavailable: {str(e)}")
+        return 0
+
+    if previous * (1 - elapsed) + current <= allowed:
+        return 0
+    return max(1, math.ceil(period * (1 - elapsed)))
+
+
+def _identifier(scope):
+    if scope == 'ip':
+        return client_ip()
+    if scope == 'email':
+        data = request.get_json(silent=True) or {}
+        email = data.get('email')
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+    if scope == 'user':
+        return session.get('user_id') or client_ip()
+    if scope == 'route':
+        return 'all'
+    raise ValueError(f'Invalid rate limit scope: {scope}')
+
+
+def rate_limit(limit, scope='ip'):
+    """
+    Decorator to reject requests over a limit with 429 before the handler runs
+
+    Args:
+        limit (str): Limit such as '5/minute'
+        scope (str): What the limit is counted per: ip, email (from the JSON
+            body), user (session user, falling back to IP) or route (all clients)
+
+    Usage:
+        @rate_limit('20/minute', scope='ip')
+        @rate_limit('5/minute', scope='email')
+        def post(self):
+            ...
+    """
+    parse_limit(limit)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            identifier = _identifier(scope)
+            if identifier is not None:
+                retry_after = hit(f'{request.endpoint}:{scope}', identifier, limit)
+                if retry_after:
+                    return {
+                        'error': 'Too many requests',
+                        'message': f'Rate limit exceeded, try again in {retry_after} seconds'
+                    }, 429, {'Retry-After': str(retry_after)}
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
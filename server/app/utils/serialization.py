@@ -0,0 +1,36 @@
+"""
+JSON serialisation helpers for Soko Safi
+Encodes Flask-RESTful responses with msgspec instead of the stdlib encoder
+"""
+
+import msgspec
+from flask import make_response
+
+# datetime, Decimal, Enum and Struct values are encoded natively, so
+# resources no longer need to call isoformat()/float()/.value per field
+json_encoder = msgspec.json.Encoder(decimal_format='number')
+
+
+def encode_json(data) -> bytes:
+    """
+    Encode data to JSON bytes
+
+    Args:
+        data: dicts, lists, msgspec Structs or any msgspec-supported value
+
+    Returns:
+        bytes: JSON encoded body
+    """
+    return json_encoder.encode(data)
+
+
+def output_json(data, code, headers=None):
+    """
+    Flask-RESTful representation for application/json
+
+    Usage:
+        product_api.representations['application/json'] = output_json
+    """
+    resp = make_response(json_encoder.encode(data) + b'\n', code)
+    resp.headers.extend(headers or {})
+    return resp
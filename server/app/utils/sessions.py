@@ -0,0 +1,138 @@
+"""
+Session backends for Soko Safi
+Selects filesystem, Redis-protocol or signed-cookie sessions from configuration
+"""
+
+import secrets
+
+from flask import current_app, session
+from flask.sessions import SecureCookieSessionInterface
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+
+from app.utils.kv_store import create_store
+
+SESSION_BACKENDS = ('filesystem', 'redis', 'cookie')
+
+# Key holding the revocable session id inside signed-cookie sessions
+SESSION_ID_KEY = '_sid'
+
+
+class KeyValueSession(ServerSideSession):
+    pass
+
+
+class KeyValueSessionInterface(ServerSideSessionInterface):
+    """
+    Server-side sessions kept in a Redis-protocol store
+
+    Works with a redis.Redis client or the in-process MemoryStore stand-in,
+    so sessions can be exercised locally without a Redis server.
+    """
+
+    session_class = KeyValueSession
+    ttl = True
+
+    def __init__(self, app, client, key_prefix, use_signer, permanent, sid_length, serialization_format):
+        self.client = client
+        super().__init__(app, key_prefix, use_signer, permanent, sid_length, serialization_format)
+
+    def _retrieve_session_data(self, store_id):
+        serialized_session_data = self.client.get(store_id)
+        if serialized_session_data:
+            return self.serializer.decode(serialized_session_data)
+        return None
+
+    def _delete_session(self, store_id):
+        self.client.delete(store_id)
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        self.client.set(
+            name=store_id,
+            value=self.serializer.encode(session),
+            ex=int(session_lifetime.total_seconds())
+        )
+
+
+class RevocableCookieSessionInterface(SecureCookieSessionInterface):
+    """
+    Stateless signed-cookie sessions with server-side revocation
+
+    Session data lives in the signed cookie, so authenticated requests need no
+    storage lookup beyond a single revocation check. Each session carries a
+    random id; logging out records that id in the store until the cookie
+    would have expired anyway.
+    """
+
+    def __init__(self, store, key_prefix):
+        self.store = store
+        self.key_prefix = key_prefix
+
+    def _revocation_key(self, sid):
+        return f'{self.key_prefix}revoked:{sid}'
+
+    def open_session(self, app, request):
+        cookie_session = super().open_session(app, request)
+        if cookie_session is None:
+            return None
+
+        sid = cookie_session.get(SESSION_ID_KEY)
+        if sid and self.store.exists(self._revocation_key(sid)):
+            return self.session_class()
+        return cookie_session
+
+    def save_session(self, app, cookie_session, response):
+        if cookie_session and SESSION_ID_KEY not in cookie_session:
+            cookie_session[SESSION_ID_KEY] = secrets.token_urlsafe(16)
+        super().save_session(app, cookie_session, response)
+
+    def revoke(self, cookie_session):
+        """
+        Revoke a session so its cookie is no longer accepted
+
+        Args:
+            cookie_session: Session to revoke
+        """
+        sid = cookie_session.get(SESSION_ID_KEY)
+        if sid:
+            lifetime = int(current_app.permanent_session_lifetime.total_seconds())
+            self.store.set(self._revocation_key(sid), 1, ex=lifetime)
+
+
+def init_session_backend(flask_app, session_extension):
+    """
+    Install the session interface selected by SESSION_BACKEND
+
+    Args:
+        flask_app: Flask application
+        session_extension: Flask-Session extension used for filesystem sessions
+    """
+    config = flask_app.config
+    backend = config.get('SESSION_BACKEND', 'filesystem').lower()
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f'SESSION_BACKEND must be one of: {", ".join(SESSION_BACKENDS)}')
+
+    if backend == 'filesystem':
+        session_extension.init_app(flask_app)
+    elif backend == 'redis':
+        flask_app.session_interface = KeyValueSessionInterface(
+            flask_app,
+            create_store(config.get('SESSION_STORE_URL') or 'redis://localhost:6379/0'),
+            key_prefix=config['SESSION_KEY_PREFIX'],
+            use_signer=False,
+            permanent=config['SESSION_PERMANENT'],
+            sid_length=32,
+            serialization_format='msgpack'
+        )
+    else:
+        # Without a shared store, revocations only apply to the worker that logged out
+        flask_app.session_interface = RevocableCookieSessionInterface(
+            create_store(config.get('SESSION_STORE_URL') or 'memory://'),
+            key_prefix=config['SESSION_KEY_PREFIX']
+        )
+
+
+def revoke_current_session():
+    """Revoke the current session if the active backend supports it"""
+    interface = current_app.session_interface
+    if hasattr(interface, 'revoke'):
+        interface.revoke(session)
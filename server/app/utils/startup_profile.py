@@ -0,0 +1,33 @@
+"""
+Startup profiling for Soko Safi
+Times the phases of create_app so cold-start regressions show up in the logs
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Wall-clock time per named startup phase"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def report(self):
+        """
+        Returns:
+            dict: total_ms since the profile started and the slowest phases first
+        """
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'phases': dict(sorted(self.phases.items(), key=lambda item: item[1], reverse=True)),
+        }
@@ -0,0 +1,184 @@
+"""
+Structured logging for Soko Safi
+JSON log lines written by a background thread, with request correlation ids and sampling
+
+Handlers on the request path only put records on a queue; a native thread
+formats them and writes to stdout, so slow or contended stdout never stalls
+a request or the eventlet hub.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Share of INFO/DEBUG records kept for high-frequency events; WARNING and
+# above are always kept. Override with LOG_SAMPLE_RATES=event=rate,...
+DEFAULT_SAMPLE_RATES = {
+    'products.list': 0.01,
+    'socket.connect': 0.1,
+    'socket.disconnect': 0.1,
+    'sql_profile': 0.1,
+}
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+def _native(module):
+    """
+    The unpatched threading or queue module on monkey-patched eventlet workers
+
+    The writer must be an OS thread blocking on a native queue; a green
+    thread blocking there would stall the hub.
+    """
+    # Nothing is patched if eventlet was never imported; importing it just
+    # to check costs a few hundred milliseconds of startup
+    if 'eventlet' not in sys.modules:
+        return module
+    from eventlet import patcher
+    return patcher.original(module.__name__) if patcher.is_monkey_patched('thread') else module
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object, including any `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Adds the request correlation id (or Socket.IO session id) to records"""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id') and has_request_context():
+            request_id = g.get('request_id') or getattr(request, 'sid', None)
+            if request_id:
+                record.request_id = request_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of INFO/DEBUG records per `event`, configured by rate"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, 'event', None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps `extra` fields instead of pre-formatting the line"""
+
+    def prepare(self, record):
+        # Resolve arguments and tracebacks here, while they are still valid
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class BackgroundListener(QueueListener):
+    """QueueListener whose writer thread is a native thread under eventlet"""
+
+    def start(self):
+        self._thread = _native(threading).Thread(target=self._monitor, name='log-writer', daemon=True)
+        self._thread.start()
+
+
+def parse_sample_rates(value):
+    """
+    Parse LOG_SAMPLE_RATES, e.g. 'socket.connect=0.1,products.list=0.01'
+
+    Returns:
+        dict: Event name to sample rate, on top of DEFAULT_SAMPLE_RATES
+    """
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for item in (value or '').split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def _assign_request_id():
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = request_id if _REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+
+
+def _return_request_id(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+def init_logging(flask_app):
+    """
+    Send all logging through one queue to a background JSON writer
+
+    LOG_LEVEL sets the level (default INFO) and LOG_SAMPLE_RATES the
+    sampling of high-frequency events. Each request gets a correlation id,
+    taken from a valid X-Request-ID header or generated, which is added to
+    every record logged while handling it and echoed in the response.
+    """
+    global _listener
+
+    level = flask_app.config.get('LOG_LEVEL', 'INFO')
+    root = logging.getLogger()
+    root.setLevel(level)
+    flask_app.logger.removeHandler(default_handler)
+
+    if _listener is None:
+        log_queue = _native(queue).SimpleQueue()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        # Only the writer thread uses this handler; a green lock cannot be taken from it
+        stream_handler.lock = _native(threading).RLock()
+        _listener = BackgroundListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        queue_handler = StructuredQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        queue_handler.addFilter(SamplingFilter(parse_sample_rates(flask_app.config.get('LOG_SAMPLE_RATES'))))
+        root.addHandler(queue_handler)
+
+    flask_app.before_request(_assign_request_id)
+    flask_app.after_request(_return_request_id)
+
@@ -0,0 +1,18 @@
+"""
+ASGI server entry point for Soko Safi
+
+Usage:
+    uvicorn asgi:app --host 0.0.0.0 --port 5001 --workers 2
+
+Socket.IO clients need sticky sessions once there is more than one worker,
+as with gunicorn's eventlet workers.
+"""
+
+import os
+
+# Flask-SocketIO would otherwise pick eventlet, which must not be imported under asyncio
+os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
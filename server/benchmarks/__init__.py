@@ -0,0 +1,4 @@
+"""
+Benchmark scripts for Soko Safi
+Run from the server directory, e.g. python -m benchmarks.serialization_bench
+"""
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Eventlet vs ASGI deployment benchmark
+
+Runs the same load_test scenarios against the two ways of serving the app,
+one after the other, on the same seeded database and mock Daraja server:
+
+    eventlet  gunicorn -k eventlet -w N main:app (the Procfile deployment)
+    asgi      uvicorn asgi:app --workers N (native async reads, payments and chat)
+
+Both get the same worker count. Prints throughput and p50/p95 latency per
+request type side by side and writes both summaries to JSON.
+
+Socket.IO polling needs sticky sessions, which neither server provides
+across workers, so the chat scenario only runs with --workers 1.
+
+Usage:
+    python -m benchmarks.asgi_bench [--workers 1] [--users 50] [--duration 20]
+        [--scenarios browse,checkout,chat] [--scale small] [--daraja-latency-ms 200]
+        [--database-url postgresql://localhost/soko_bench] [--output asgi-bench.json]
+
+Without --database-url the SQLite dataset from load_test is used (seeded on
+first run). A --database-url database must be empty; it is seeded once and
+its manifest written next to --output for later runs with --manifest.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from benchmarks.load_test import SCENARIOS, SERVER_DIR, git_commit, prepare_dataset, run_scenario
+from benchmarks.mock_daraja import MockDaraja
+
+SERVERS = ('eventlet', 'asgi')
+
+
+def seed_database(database_url, scale, seed):
+    """Create the tables in an empty database and seed it; returns the manifest"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+    from app import create_app
+    from app.models import db
+    from benchmarks.datasets import seed_dataset
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        return seed_dataset(db, scale, seed)
+
+
+def server_command(kind, workers, port):
+    if kind == 'eventlet':
+        return [sys.executable, '-m', 'gunicorn', '-k', 'eventlet', '-w', str(workers),
+                '--worker-connections', '1000', '-b', f'127.0.0.1:{port}', 'main:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(workers),
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+
+
+def start_server(kind, workers, port, env, workdir):
+    """Start one deployment and wait until it answers"""
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(env, BASE_URL=base_url)
+    if kind == 'eventlet':
+        env.pop('SOCKETIO_ASYNC_MODE', None)
+    log = open(os.path.join(workdir, f'server-{kind}.log'), 'w')
+    process = subprocess.Popen(server_command(kind, workers, port), cwd=workdir, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{kind} server exited; see {log.name}')
+        try:
+            if requests.get(base_url + '/api/categories/', timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{kind} server did not start within 60s')
+
+
+def print_table(results, names):
+    print(f"\n{'request':<30}" + ''.join(f"{kind + ' rps':>14}{'p50':>8}{'p95':>8}" for kind in SERVERS))
+    for scenario in names:
+        requests_names = sorted(set().union(*(results[kind][scenario]['requests'] for kind in SERVERS)))
+        for name in requests_names:
+            row = f'{name:<30}'
+            for kind in SERVERS:
+                stats = results[kind][scenario]['requests'].get(name)
+                if stats is None:
+                    row += f"{'-':>14}{'-':>8}{'-':>8}"
+                    continue
+                errors = f"({stats['errors']}!)" if stats['errors'] else ''
+                row += f"{errors + format(stats['throughput_rps'], '.1f'):>14}{stats['p50_ms']:>8.1f}{stats['p95_ms']:>8.1f}"
+            print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--scenarios', default='browse,checkout,chat')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--scale', default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'soko_load_test'))
+    parser.add_argument('--database-url', help='Empty database to seed instead of the SQLite dataset')
+    parser.add_argument('--manifest', help='Manifest of an already seeded --database-url')
+    parser.add_argument('--daraja-latency-ms', type=float, default=200)
+    parser.add_argument('--port', type=int, default=5097)
+    parser.add_argument('--output', default='asgi-bench.json')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.workers > 1 and 'chat' in names:
+        print('Skipping chat: Socket.IO polling needs sticky sessions with more than one worker')
+        names.remove('chat')
+
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    for key in ('MPESA_CONSUMER_KEY', 'MPESA_CONSUMER_SECRET', 'MPESA_SHORTCODE', 'MPESA_PASSKEY'):
+        os.environ.setdefault(key, 'benchmark')
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix='soko_asgi_bench_')
+    # create_app writes instance/ (sessions) to the working directory
+    os.chdir(workdir)
+
+    if args.database_url:
+        database_url = args.database_url
+        if args.manifest:
+            with open(args.manifest) as f:
+                manifest = json.load(f)
+        else:
+            manifest = seed_database(database_url, args.scale, args.seed)
+            with open(os.path.splitext(output)[0] + '-manifest.json', 'w') as f:
+                json.dump(manifest, f)
+    else:
+        database_url, manifest = prepare_dataset(args.scale, args.seed, args.data_dir)
+
+    daraja = MockDaraja(latency_ms=args.daraja_latency_ms).start()
+    env = dict(os.environ, DATABASE_URL=database_url, MPESA_BASE_URL=daraja.url, RATE_LIMIT_ENABLED='False',
+               LOG_LEVEL='WARNING', SOCKETIO_ASYNC_MODE='threading')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SERVER_DIR, env.get('PYTHONPATH')]))
+
+    results = {'meta': {'commit': git_commit(), 'workers': args.workers, 'users': args.users,
+                        'duration_s': args.duration, 'scale': manifest['scale'],
+                        'daraja_latency_ms': args.daraja_latency_ms}}
+    try:
+        for offset, kind in enumerate(SERVERS):
+            process, base_url = start_server(kind, args.workers, args.port + offset, env, workdir)
+            results[kind] = {}
+            try:
+                for name in names:
+                    print(f"{kind}: running {name} with {args.users} users for {args.duration:.0f}s...")
+                    results[kind][name] = run_scenario(SCENARIOS[name], base_url, manifest, args.users,
+                                                       args.duration, args.warmup, args.seed)
+            finally:
+                process.terminate()
+                process.wait(10)
+    finally:
+        daraja.stop()
+
+    print_table(results, names)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+Response compression benchmark
+
+Fetches real API responses from the load_test dataset through the Flask
+test client (product listing with and without images, categories, admin
+order listing, a buyer's conversations and one conversation) and, for each,
+reports the compressed size and the CPU time per response for gzip and
+Brotli at several levels, plus:
+
+    cache hit   cost of answering from the compressed body cache (body digest only)
+    streamed    size when the rows are re-encoded as NDJSON and flushed every
+                --rows-per-chunk rows, as streamed exports are
+
+The defaults (COMPRESSION_GZIP_LEVEL=6, COMPRESSION_BROTLI_QUALITY=4) are
+marked with *.
+
+Usage:
+    python -m benchmarks.compression_bench [--scale small] [--repeat 20] [--rows-per-chunk 100]
+        [--database-url postgresql://localhost/soko_bench --manifest asgi-bench-manifest.json]
+        [--output compression.json]
+
+The conversation endpoints need PostgreSQL (they use greatest/least), so
+they are skipped on the SQLite dataset; point --database-url and --manifest
+at a database seeded by asgi_bench to include them.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.load_test import prepare_dataset
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6, 11)
+
+
+def fetch_payloads(manifest):
+    """Uncompressed response bodies by name"""
+    os.environ['COMPRESSION_ENABLED'] = 'False'
+    from app import create_app
+    from app.models import Message, User
+    from app.utils.db_migrations import ensure_optional_columns
+
+    app = create_app()
+    with app.app_context():
+        ensure_optional_columns(app)
+        admin_id = User.query.filter_by(email=manifest['admin_email']).first().id
+        buyer_id = manifest['buyer_ids'][0]
+        message = Message.query.filter((Message.sender_id == buyer_id) | (Message.receiver_id == buyer_id)).first()
+        partner_id = None
+        if message is not None:
+            partner_id = message.receiver_id if message.sender_id == buyer_id else message.sender_id
+
+    client = app.test_client()
+    responses = {
+        'products': client.get('/api/products/'),
+        'products+images': client.get('/api/products/?include=images'),
+        'categories': client.get('/api/categories/'),
+    }
+    with client.session_transaction() as session:
+        session.update({'authenticated': True, 'user_id': admin_id, 'user_role': 'admin'})
+    responses['orders (admin)'] = client.get('/api/orders/')
+    with client.session_transaction() as session:
+        session.update({'authenticated': True, 'user_id': buyer_id, 'user_role': 'buyer'})
+    responses['conversations'] = client.get('/api/messages/conversations')
+    if partner_id:
+        responses['conversation'] = client.get(f'/api/messages/{partner_id}')
+
+    payloads = {}
+    for name, response in responses.items():
+        if response.status_code != 200:
+            print(f'Skipping {name}: HTTP {response.status_code}')
+            continue
+        payloads[name] = response.data
+    return payloads
+
+
+def timed(repeat, fn):
+    """Median seconds per call and the last result"""
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2], result
+
+
+def ndjson_chunks(data, rows_per_chunk):
+    """Re-encode a JSON array body as NDJSON chunks like stream_ndjson"""
+    rows = json.loads(data)
+    if not isinstance(rows, list):
+        return []
+    lines = [json.dumps(row, separators=(',', ':')).encode() + b'\n' for row in rows]
+    return [b''.join(lines[i:i + rows_per_chunk]) for i in range(0, len(lines), rows_per_chunk)]
+
+
+def bench_payload(data, repeat, rows_per_chunk, brotli):
+    from app.utils.compression import StreamCompressor
+
+    results = {'bytes': len(data), 'codecs': {}}
+    codecs = [('gzip', level, lambda level=level: gzip.compress(data, compresslevel=level)) for level in GZIP_LEVELS]
+    if brotli:
+        codecs += [('br', quality, lambda quality=quality: brotli.compress(data, quality=quality))
+                   for quality in BROTLI_QUALITIES]
+    for encoding, level, fn in codecs:
+        seconds, compressed = timed(repeat if level < 9 else max(3, repeat // 5), fn)
+        results['codecs'][f'{encoding}-{level}'] = {
+            'bytes': len(compressed),
+            'ratio': round(len(data) / len(compressed), 2),
+            'ms': round(seconds * 1000, 3),
+            'mb_per_s': round(len(data) / seconds / 1e6, 1),
+        }
+
+    seconds, _ = timed(repeat, lambda: hashlib.blake2b(data, digest_size=16).digest())
+    results['cache_hit_ms'] = round(seconds * 1000, 4)
+
+    chunks = ndjson_chunks(data, rows_per_chunk)
+    if len(chunks) > 1:
+        ndjson = b''.join(chunks)
+        results['streamed'] = {'ndjson_bytes': len(ndjson)}
+        for encoding in ('gzip', 'br') if brotli else ('gzip',):
+            encoder = StreamCompressor(encoding, 6, 4)
+            streamed = sum(len(encoder.compress(chunk)) for chunk in chunks) + len(encoder.finish())
+            whole = len(gzip.compress(ndjson, 6) if encoding == 'gzip' else brotli.compress(ndjson, quality=4))
+            results['streamed'][encoding] = {'bytes': streamed, 'one_shot_bytes': whole}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'soko_load_test'))
+    parser.add_argument('--database-url', help='Seeded database to fetch payloads from')
+    parser.add_argument('--manifest', help='Manifest of the --database-url dataset')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--rows-per-chunk', type=int, default=100)
+    parser.add_argument('--output', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    output = os.path.abspath(args.output) if args.output else None
+    manifest_path = os.path.abspath(args.manifest) if args.manifest else None
+    # create_app writes instance/ (sessions) to the working directory
+    os.chdir(tempfile.mkdtemp(prefix='soko_compression_bench_'))
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print('Brotli is not installed; gzip only')
+
+    if args.database_url:
+        if not args.manifest:
+            parser.error('--database-url needs --manifest')
+        database_url = args.database_url
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    else:
+        database_url, manifest = prepare_dataset(args.scale, args.seed, args.data_dir)
+    os.environ['DATABASE_URL'] = database_url
+    payloads = fetch_payloads(manifest)
+
+    results = {}
+    for name, data in payloads.items():
+        results[name] = bench_payload(data, args.repeat, args.rows_per_chunk, brotli)
+        result = results[name]
+        print(f"\n{name}: {result['bytes']:,} bytes (cache hit {result['cache_hit_ms']:.3f} ms)")
+        print(f"  {'codec':<10}{'bytes':>12}{'ratio':>8}{'ms':>10}{'MB/s':>9}")
+        for codec, stats in result['codecs'].items():
+            default = '*' if codec in ('gzip-6', 'br-4') else ' '
+            print(f"  {codec + default:<10}{stats['bytes']:>12,}{stats['ratio']:>8.2f}{stats['ms']:>10.2f}{stats['mb_per_s']:>9.1f}")
+        for encoding, stats in result.get('streamed', {}).items():
+            if encoding == 'ndjson_bytes':
+                continue
+            print(f"  streamed {encoding}: {stats['bytes']:,} bytes vs {stats['one_shot_bytes']:,} one-shot "
+                  f"({result['streamed']['ndjson_bytes'] / stats['bytes']:.2f}x)")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
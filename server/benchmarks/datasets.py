@@ -0,0 +1,51 @@
+"""
+Seeded benchmark datasets
+
+Thin wrapper over seed_data.generate for the load tests: seeds a named
+scale with a fixed password and returns a manifest with the ids and
+credentials the scenarios need. The same seed always produces the same
+rows, so runs on different commits compare like with like.
+"""
+
+from seed_data import PRESETS, generate, power_law_index
+
+BENCHMARK_PASSWORD = 'Bench-Passw0rd'
+POPULARITY_SKEW = 2.5
+
+SCALES = {name: PRESETS[name] for name in ('tiny', 'small', 'medium', 'large')}
+
+
+def skewed_index(rng, size):
+    """Index in [0, size) biased towards 0, with the same skew the dataset was seeded with"""
+    return power_law_index(rng, size, POPULARITY_SKEW)
+
+
+def seed_dataset(db, scale='small', seed=42):
+    """
+    Seed the current app's database
+
+    Args:
+        db: Flask-SQLAlchemy instance (app context required)
+        scale (str): One of SCALES
+        seed (int): Random seed
+
+    Returns:
+        dict: Manifest with admin/buyer/artisan credentials and sample ids
+    """
+    with db.engine.begin() as connection:
+        result = generate(connection, SCALES[scale], seed=seed, artisan_skew=POPULARITY_SKEW,
+                          password=BENCHMARK_PASSWORD)
+
+    buyers = min(500, len(result['buyer_ids']))
+    return {
+        'scale': scale,
+        'seed': seed,
+        'sizes': result['counts'],
+        'password': BENCHMARK_PASSWORD,
+        'admin_email': 'admin@example.com',
+        'buyer_emails': [f'buyer-{i}@example.com' for i in range(buyers)],
+        'buyer_ids': result['buyer_ids'][:buyers],
+        'artisan_ids': result['artisan_ids'][:500],
+        'category_ids': result['category_ids'],
+        'products': [list(product) for product in result['products'][:5000]],
+    }
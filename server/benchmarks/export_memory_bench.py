@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Streaming export memory benchmark
+
+Seeds a throwaway SQLite database with messages, streams
+/api/messages/export through the test client and checks that resident
+memory stays flat while the rows go out.
+
+Usage:
+    python -m benchmarks.export_memory_bench [--rows 1000000] [--format ndjson] [--max-growth-mb 32]
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+    except OSError:
+        # Not Linux - fall back to the peak RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def seed_messages(db, Message, count, batch_size=50000):
+    """Bulk insert `count` messages using executemany batches"""
+    sender, receiver = str(uuid.uuid4()), str(uuid.uuid4())
+    now = datetime.utcnow()
+    inserted = 0
+    while inserted < count:
+        size = min(batch_size, count - inserted)
+        db.session.execute(Message.__table__.insert(), [{
+            'id': str(uuid.uuid4()),
+            'sender_id': sender,
+            'receiver_id': receiver,
+            'message': f'Benchmark message {inserted + i}',
+            'message_type': 'TEXT',
+            'timestamp': now,
+            'is_read': False,
+            'status': 'SENT',
+        } for i in range(size)])
+        db.session.commit()
+        inserted += size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    parser.add_argument('--max-growth-mb', type=float, default=32.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='soko_export_bench_')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'export.db')}"
+
+    from app import create_app
+    from app.models import db, Message, User, UserRole
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        admin = User(email='benchmark-admin@example.com', password_hash='-', role=UserRole.admin)
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+        start = time.perf_counter()
+        seed_messages(db, Message, args.rows)
+        print(f"Seeded {args.rows:,} messages in {time.perf_counter() - start:.1f}s")
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['user_id'] = admin_id
+        sess['user_role'] = 'admin'
+
+    response = client.get(f'/api/messages/export?format={args.format}', buffered=False)
+    if response.status_code != 200:
+        print(f"Export failed with status {response.status_code}")
+        return 1
+
+    baseline = None
+    peak = 0.0
+    lines = 0
+    exported_bytes = 0
+    start = time.perf_counter()
+    for chunk in response.response:
+        lines += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        exported_bytes += len(chunk)
+        rss = current_rss_mb()
+        # Measure from the first chunk so the warm-up (imports, first batch) is excluded
+        if baseline is None:
+            baseline = rss
+        peak = max(peak, rss)
+    response.close()
+    elapsed = time.perf_counter() - start
+
+    baseline = baseline or current_rss_mb()
+    growth = peak - baseline
+    print(f"Exported {lines:,} lines ({exported_bytes / (1024 * 1024):.1f} MB) in {elapsed:.1f}s "
+          f"({lines / elapsed:,.0f} rows/s)")
+    print(f"RSS baseline {baseline:.1f} MB, peak {peak:.1f} MB, growth {growth:.1f} MB")
+
+    if growth > args.max_growth_mb:
+        print(f"FAIL: RSS grew by more than {args.max_growth_mb} MB")
+        return 1
+    print("OK: memory stayed bounded")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+Eventlet hub benchmark for slow PostgreSQL queries
+
+Starts the app on a single gunicorn eventlet worker, makes product listings
+slow by holding an exclusive lock on the products table for --lock-seconds
+at a time, and meanwhile sends Socket.IO chat messages between two users.
+Chat does not touch the products table, so any delay it sees comes from
+the worker's hub being blocked by the stuck listings.
+
+Runs once with the psycopg2 wait callback (green) and once without it
+(blocking, DB_GREEN_WAIT_CALLBACK=false) and reports chat send latency for
+both. Exits non-zero when green chat latency exceeds --max-chat-ms.
+
+Needs a PostgreSQL database; its tables are created if missing.
+
+Usage:
+    python -m benchmarks.green_db_bench --database-url postgresql://localhost/soko_bench
+        [--duration 10] [--lock-seconds 2] [--slow-clients 8] [--max-chat-ms 250]
+        [--mode both|green|blocking] [--output green_db.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import socketio
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_EMAILS = ('green-bench-a@example.com', 'green-bench-b@example.com')
+
+
+def prepare_database(database_url):
+    """Create the tables and the two chat users; returns their ids"""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ['SOCKETIO_ASYNC_MODE'] = 'threading'
+    sys.path.insert(0, SERVER_DIR)
+    from app import create_app
+    from app.models import db, User, UserRole
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        ids = []
+        for email in USER_EMAILS:
+            user = User.query.filter_by(email=email).first()
+            if user is None:
+                user = User(email=email, password_hash='!', full_name=email, role=UserRole.buyer)
+                db.session.add(user)
+                db.session.commit()
+            ids.append(user.id)
+    return app, ids
+
+
+def start_server(env, port, workdir, log_name):
+    """Run main:app on one gunicorn eventlet worker and wait until it answers"""
+    log = open(os.path.join(workdir, log_name), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-k', 'eventlet', '-w', '1', '--worker-connections', '1000',
+         '-b', f'127.0.0.1:{port}', 'main:app'],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited; see {log.name}')
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/api/categories/', timeout=1).ok:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('Server did not start within 60s')
+
+
+def hold_locks(app, stop, lock_seconds):
+    """Repeatedly lock the products table so listings wait on PostgreSQL"""
+    from sqlalchemy import text
+    from app.models import db
+
+    with app.app_context():
+        while not stop.is_set():
+            with db.engine.begin() as connection:
+                connection.execute(text('LOCK TABLE products IN ACCESS EXCLUSIVE MODE'))
+                stop.wait(lock_seconds)
+            stop.wait(0.2)
+
+
+def slow_client(base_url, stop, durations):
+    with requests.Session() as http:
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                http.get(base_url + '/api/products/', timeout=60)
+            except requests.RequestException:
+                pass
+            durations.append(time.perf_counter() - start)
+
+
+def chat(base_url, user_ids, stop, latencies, errors):
+    """Send messages from user 0 to user 1 and time each acknowledgement"""
+    acked = threading.Event()
+    sio = socketio.Client(reconnection=False)
+    sio.on('message_sent', lambda data=None: acked.set())
+    sio.connect(base_url, wait_timeout=10)
+    sio.emit('join', {'user_id': user_ids[0]})
+    try:
+        while not stop.is_set():
+            acked.clear()
+            start = time.perf_counter()
+            sio.emit('send_message', {'sender_id': user_ids[0], 'receiver_id': user_ids[1], 'message': 'bench'})
+            if acked.wait(30):
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append('timeout')
+            time.sleep(0.05)
+    finally:
+        sio.disconnect()
+
+
+def run_mode(mode, app, user_ids, env, port, workdir, args):
+    env = dict(env, DB_GREEN_WAIT_CALLBACK='true' if mode == 'green' else 'false')
+    process = start_server(env, port, workdir, f'server-{mode}.log')
+    base_url = f'http://127.0.0.1:{port}'
+    stop = threading.Event()
+    latencies, errors, slow = [], [], []
+    threads = [threading.Thread(target=hold_locks, args=(app, stop, args.lock_seconds))]
+    threads += [threading.Thread(target=slow_client, args=(base_url, stop, slow)) for _ in range(args.slow_clients)]
+    threads.append(threading.Thread(target=chat, args=(base_url, user_ids, stop, latencies, errors)))
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(60)
+        process.terminate()
+        process.wait(10)
+
+    ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        'chat_messages': len(ms),
+        'chat_timeouts': len(errors),
+        'chat_p50_ms': round(statistics.median(ms), 1) if ms else None,
+        'chat_p99_ms': round(ms[min(len(ms) - 1, int(len(ms) * 0.99))], 1) if ms else None,
+        'chat_max_ms': round(ms[-1], 1) if ms else None,
+        'product_listings': len(slow),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'))
+    parser.add_argument('--mode', choices=('both', 'green', 'blocking'), default='both')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--lock-seconds', type=float, default=2)
+    parser.add_argument('--slow-clients', type=int, default=8)
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--max-chat-ms', type=float, default=250)
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    if not args.database_url or not args.database_url.startswith(('postgres://', 'postgresql://')):
+        parser.error('--database-url must point at PostgreSQL')
+
+    workdir = tempfile.mkdtemp(prefix='soko_green_db_')
+    # create_app writes instance/ (sessions) to the working directory
+    os.chdir(workdir)
+    app, user_ids = prepare_database(args.database_url)
+    env = dict(os.environ, DATABASE_URL=args.database_url, LOG_LEVEL='WARNING', RATE_LIMIT_ENABLED='False')
+    env.pop('SOCKETIO_ASYNC_MODE', None)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SERVER_DIR, env.get('PYTHONPATH')]))
+
+    modes = ('green', 'blocking') if args.mode == 'both' else (args.mode,)
+    report = {}
+    for offset, mode in enumerate(modes):
+        report[mode] = run_mode(mode, app, user_ids, env, args.port + offset, workdir, args)
+        result = report[mode]
+        print(f"{mode:<9} chat p50 {result['chat_p50_ms']} ms  p99 {result['chat_p99_ms']} ms  "
+              f"max {result['chat_max_ms']} ms  ({result['chat_messages']} sent, {result['chat_timeouts']} timed out; "
+              f"{result['product_listings']} slow listings)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    green = report.get('green')
+    if green and (green['chat_timeouts'] or (green['chat_max_ms'] or 0) > args.max_chat_ms):
+        print(f"FAIL: chat stalled behind slow queries with the wait callback installed "
+              f"(max {green['chat_max_ms']} ms, limit {args.max_chat_ms:.0f} ms)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
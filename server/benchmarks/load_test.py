@@ -0,0 +1,505 @@
+#!/usr/bin/env python
+"""
+REST API and Socket.IO load test
+
+Seeds a dataset at the chosen scale, starts a mock Daraja server and the
+app (main.py, the same eventlet server used in development) in a separate
+process, then runs each scenario with N concurrent virtual users for a
+fixed duration:
+
+    browse         product listing, product details (popular items more often), categories
+    search         category and subcategory lookups plus product lookups; the API has no
+                   full-text search endpoint yet, so this is the catalogue lookup path
+    checkout       order + items, STK Push through the mock Daraja server, then polling
+                   until the STK callback settles the payment
+    chat           Socket.IO send_message between paired users; send ack and fan-out latency
+    notifications  checkout with the buyer connected over Socket.IO; time until the
+                   payment notification arrives
+
+Throughput and p50/p95/p99 latency per request type are written to JSON.
+Pass --compare with an earlier result to flag p95 regressions between commits.
+
+Usage:
+    python -m benchmarks.load_test [--scale small] [--scenarios browse,checkout] [--users 20]
+        [--duration 30] [--output load-results.json] [--compare baseline.json]
+    python -m benchmarks.load_test --target http://127.0.0.1:5001 --manifest dataset.json
+
+Scales: tiny, small, medium, large (100k products, 1M orders and 1M messages).
+Seeded databases are cached in --data-dir and reused on later runs.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import socketio
+
+from benchmarks.datasets import SCALES, skewed_index
+from benchmarks.mock_daraja import MockDaraja
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETTLE_TIMEOUT = 10.0
+POLL_INTERVAL = 0.1
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+class Recorder:
+    """Collects latencies and errors per request name once the warm-up is over"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.iterations = 0
+        self.recording = False
+
+    def record(self, name, seconds, ok=True):
+        if not self.recording:
+            return
+        with self._lock:
+            if ok:
+                self.samples.setdefault(name, []).append(seconds)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def iteration(self):
+        if self.recording:
+            with self._lock:
+                self.iterations += 1
+
+    def summary(self, duration):
+        requests_summary = {}
+        for name in sorted(set(self.samples) | set(self.errors)):
+            ordered = sorted(self.samples.get(name, []))
+            count = len(ordered)
+            requests_summary[name] = {
+                'count': count,
+                'errors': self.errors.get(name, 0),
+                'throughput_rps': round(count / duration, 2),
+                'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+                'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+                'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+                'max_ms': round(ordered[-1] * 1000, 2) if ordered else 0.0,
+                'mean_ms': round(sum(ordered) / count * 1000, 2) if count else 0.0,
+            }
+        return {
+            'iterations': self.iterations,
+            'iterations_per_second': round(self.iterations / duration, 2),
+            'requests': requests_summary,
+        }
+
+
+class VirtualUser:
+    """One simulated client with its own HTTP session and optional Socket.IO connection"""
+
+    def __init__(self, index, base_url, manifest, recorder, seed):
+        self.index = index
+        self.base_url = base_url
+        self.manifest = manifest
+        self.recorder = recorder
+        self.rng = random.Random(seed * 1000 + index)
+        self.http = requests.Session()
+        self.sio = None
+        self.user_id = None
+        self.events = {}
+        self._event_lock = threading.Condition()
+
+    def request(self, name, method, path, expect=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=30, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(name, time.perf_counter() - start, ok=False)
+            return None
+        ok = response.status_code in expect
+        self.recorder.record(name, time.perf_counter() - start, ok=ok)
+        return response if ok else None
+
+    def login(self, email):
+        response = self.request('auth.login', 'POST', '/api/auth/login',
+                                json={'email': email, 'password': self.manifest['password']})
+        if response is None:
+            raise RuntimeError(f'Login failed for {email}')
+        self.user_id = response.json()['user']['id']
+
+    def product(self):
+        products = self.manifest['products']
+        return products[skewed_index(self.rng, len(products))]
+
+    def connect_socket(self, user_id, on_event=None):
+        """Connect, join as user_id and collect events in self.events"""
+        self.sio = socketio.Client(reconnection=False)
+
+        def handler(event):
+            def collect(data=None):
+                if on_event:
+                    on_event(event, data)
+                with self._event_lock:
+                    self.events.setdefault(event, []).append((time.perf_counter(), data))
+                    self._event_lock.notify_all()
+            return collect
+
+        for event in ('status', 'message_sent', 'new_message', 'notification', 'error'):
+            self.sio.on(event, handler(event))
+        self.sio.connect(self.base_url, wait_timeout=10)
+        self.sio.emit('join', {'user_id': user_id})
+        if not self.wait_event('status', SETTLE_TIMEOUT, count=2):
+            raise RuntimeError(f'Socket join failed for {user_id}')
+
+    def wait_event(self, event, timeout, count=1):
+        """Wait until `count` `event`s have arrived; returns the last one or None"""
+        deadline = time.perf_counter() + timeout
+        with self._event_lock:
+            while len(self.events.get(event, [])) < count:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return None
+                self._event_lock.wait(remaining)
+            return self.events[event][count - 1]
+
+    def close(self):
+        if self.sio is not None:
+            self.sio.disconnect()
+        self.http.close()
+
+
+def place_order(vu):
+    """Create an order with 1-3 items and start an STK Push; returns (payment_id, start time)"""
+    items = [vu.product() for _ in range(vu.rng.randint(1, 3))]
+    total = round(sum(price for _, _, price in items), 2)
+    response = vu.request('checkout.create_order', 'POST', '/api/orders/', expect=(201,),
+                          json={'total_amount': total})
+    if response is None:
+        return None, None
+    order_id = response.json()['order']['id']
+    for product_id, artisan_id, price in items:
+        vu.request('checkout.add_item', 'POST', '/api/orders/items/', expect=(201,), json={
+            'order_id': order_id, 'product_id': product_id, 'artisan_id': artisan_id,
+            'quantity': 1, 'unit_price': price, 'total_price': price,
+        })
+    start = time.perf_counter()
+    response = vu.request('checkout.initiate_payment', 'POST', '/api/payments/initiate',
+                          json={'order_id': order_id, 'phone_number': '0712345678'})
+    if response is None:
+        return None, None
+    return response.json()['payment_id'], start
+
+
+class Scenario:
+    name = None
+
+    def setup(self, vu, users):
+        pass
+
+    def run(self, vu):
+        raise NotImplementedError
+
+
+class Browse(Scenario):
+    name = 'browse'
+
+    def run(self, vu):
+        vu.request('browse.list_products', 'GET', '/api/products/')
+        for _ in range(3):
+            vu.request('browse.product_detail', 'GET', f'/api/products/{vu.product()[0]}')
+        vu.request('browse.categories', 'GET', '/api/categories/')
+
+
+class Search(Scenario):
+    name = 'search'
+
+    def run(self, vu):
+        category_id = vu.rng.choice(vu.manifest['category_ids'])
+        vu.request('search.category', 'GET', f'/api/categories/{category_id}')
+        vu.request('search.subcategories', 'GET', '/api/categories/subcategories/')
+        for _ in range(5):
+            vu.request('search.product_detail', 'GET', f'/api/products/{vu.product()[0]}')
+
+
+class Checkout(Scenario):
+    name = 'checkout'
+
+    def setup(self, vu, users):
+        emails = vu.manifest['buyer_emails']
+        vu.login(emails[vu.index % len(emails)])
+
+    def run(self, vu):
+        payment_id, start = place_order(vu)
+        if payment_id is None:
+            return
+        deadline = start + SETTLE_TIMEOUT
+        while time.perf_counter() < deadline:
+            response = vu.http.get(f'{vu.base_url}/api/payments/status/{payment_id}', timeout=30)
+            status = response.json().get('payment', {}).get('status') if response.ok else None
+            if status == 'success':
+                vu.recorder.record('checkout.settled', time.perf_counter() - start)
+                return
+            if status == 'failed':
+                break
+            time.sleep(POLL_INTERVAL)
+        vu.recorder.record('checkout.settled', time.perf_counter() - start, ok=False)
+
+
+class Notifications(Checkout):
+    name = 'notifications'
+
+    def setup(self, vu, users):
+        super().setup(vu, users)
+        vu.connect_socket(vu.user_id)
+
+    def run(self, vu):
+        received = len(vu.events.get('notification', []))
+        payment_id, start = place_order(vu)
+        if payment_id is None:
+            return
+        event = vu.wait_event('notification', SETTLE_TIMEOUT, count=received + 1)
+        if event is None:
+            vu.recorder.record('notifications.delivered', SETTLE_TIMEOUT, ok=False)
+        else:
+            vu.recorder.record('notifications.delivered', event[0] - start)
+
+
+class Chat(Scenario):
+    """Users are paired (0-1, 2-3, ...) and message each other"""
+    name = 'chat'
+
+    def setup(self, vu, users):
+        participants = vu.manifest['buyer_ids'] + vu.manifest['artisan_ids']
+        vu.chat_id = participants[vu.index % len(participants)]
+        partner = vu.index ^ 1 if (vu.index ^ 1) < len(users) else vu.index
+        vu.partner_id = participants[partner % len(participants)]
+
+        def on_event(event, data):
+            if event == 'new_message' and data and str(data.get('message', '')).startswith('bench:'):
+                sent_at = float(data['message'].split(':', 1)[1])
+                vu.recorder.record('chat.fanout', time.time() - sent_at)
+
+        vu.connect_socket(vu.chat_id, on_event)
+
+    def run(self, vu):
+        sent = len(vu.events.get('message_sent', []))
+        start = time.perf_counter()
+        vu.sio.emit('send_message', {
+            'sender_id': vu.chat_id,
+            'receiver_id': vu.partner_id,
+            'message': f'bench:{time.time():.6f}',
+        })
+        event = vu.wait_event('message_sent', SETTLE_TIMEOUT, count=sent + 1)
+        vu.recorder.record('chat.send', (event[0] if event else time.perf_counter()) - start, ok=event is not None)
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (Browse(), Search(), Checkout(), Chat(), Notifications())}
+
+
+def run_scenario(scenario, base_url, manifest, users, duration, warmup, seed):
+    """Run one scenario with `users` virtual users and return its summary"""
+    recorder = Recorder()
+    vus = [VirtualUser(i, base_url, manifest, recorder, seed) for i in range(users)]
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(lambda vu: scenario.setup(vu, vus), vus))
+
+    stop_at = time.perf_counter() + warmup + duration
+
+    def loop(vu):
+        while time.perf_counter() < stop_at:
+            scenario.run(vu)
+            recorder.iteration()
+
+    threads = [threading.Thread(target=loop, args=(vu,), daemon=True) for vu in vus]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    recorder.recording = True
+    time.sleep(duration)
+    recorder.recording = False
+    for thread in threads:
+        thread.join(SETTLE_TIMEOUT + 30)
+    for vu in vus:
+        vu.close()
+    return recorder.summary(duration)
+
+
+def prepare_dataset(scale, seed, data_dir):
+    """Seed (or reuse) a SQLite database for a scale; returns (database URL, manifest)"""
+    os.makedirs(data_dir, exist_ok=True)
+    db_path = os.path.join(data_dir, f'bench-{scale}-{seed}.db')
+    manifest_path = os.path.join(data_dir, f'bench-{scale}-{seed}.json')
+    database_url = f'sqlite:///{db_path}'
+    if os.path.exists(db_path) and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return database_url, json.load(f)
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ['DATABASE_URL'] = database_url
+    from app import create_app
+    from app.models import db
+    from benchmarks.datasets import seed_dataset
+
+    app = create_app()
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        manifest = seed_dataset(db, scale, seed)
+    print(f"Seeded {scale} dataset in {time.perf_counter() - start:.1f}s: {manifest['sizes']}")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return database_url, manifest
+
+
+def start_server(database_url, port, daraja_url, workdir):
+    """Start main.py in a subprocess and wait until it answers"""
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': database_url,
+        'FLASK_HOST': '127.0.0.1',
+        'FLASK_PORT': str(port),
+        'BASE_URL': base_url,
+        'MPESA_BASE_URL': daraja_url,
+        'RATE_LIMIT_ENABLED': 'False',
+        'LOG_LEVEL': env.get('LOG_LEVEL', 'WARNING'),
+    })
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen([sys.executable, os.path.join(SERVER_DIR, 'main.py')],
+                               cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited; see {log.name}')
+        try:
+            requests.get(base_url + '/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('Server did not start within 60s')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, max_regression):
+    """Print p95 changes against a baseline; returns True if any exceed max_regression percent"""
+    regressed = False
+    print(f"\n{'request':<34}{'base p95':>10}{'p95':>10}{'change':>9}")
+    for scenario, summary in results['scenarios'].items():
+        base_requests = baseline.get('scenarios', {}).get(scenario, {}).get('requests', {})
+        for name, stats in summary['requests'].items():
+            base = base_requests.get(name)
+            if not base or not base['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+            flag = ' !' if change > max_regression else ''
+            regressed = regressed or bool(flag)
+            print(f"{name:<34}{base['p95_ms']:>10.1f}{stats['p95_ms']:>10.1f}{change:>8.0f}%{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'soko_load_test'))
+    parser.add_argument('--daraja-latency-ms', type=float, default=50)
+    parser.add_argument('--target', help='Base URL of an already running server (skips seeding and startup)')
+    parser.add_argument('--manifest', help='Dataset manifest JSON to use with --target')
+    parser.add_argument('--output', default='load-results.json')
+    parser.add_argument('--compare', help='Earlier results JSON to compare p95 latencies against')
+    parser.add_argument('--max-regression', type=float, default=20.0, help='Allowed p95 increase in percent')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    for key in ('MPESA_CONSUMER_KEY', 'MPESA_CONSUMER_SECRET', 'MPESA_SHORTCODE', 'MPESA_PASSKEY'):
+        os.environ.setdefault(key, 'benchmark')
+
+    daraja = server = None
+    workdir = tempfile.mkdtemp(prefix='soko_load_test_')
+    try:
+        if args.target:
+            if not args.manifest:
+                parser.error('--target needs --manifest')
+            with open(args.manifest) as f:
+                manifest = json.load(f)
+            base_url = args.target.rstrip('/')
+        else:
+            database_url, manifest = prepare_dataset(args.scale, args.seed, args.data_dir)
+            daraja = MockDaraja(latency_ms=args.daraja_latency_ms).start()
+            server, base_url = start_server(database_url, args.port, daraja.url, workdir)
+
+        results = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'scale': manifest['scale'],
+                'dataset': manifest['sizes'],
+                'users': args.users,
+                'duration_s': args.duration,
+                'warmup_s': args.warmup,
+            },
+            'scenarios': {},
+        }
+        for name in names:
+            print(f"Running {name} with {args.users} users for {args.duration:.0f}s...")
+            summary = run_scenario(SCENARIOS[name], base_url, manifest, args.users,
+                                   args.duration, args.warmup, args.seed)
+            results['scenarios'][name] = summary
+            for request_name, stats in summary['requests'].items():
+                print(f"  {request_name:<32}{stats['throughput_rps']:>8.1f} rps  p50 {stats['p50_ms']:>7.1f}  "
+                      f"p95 {stats['p95_ms']:>7.1f}  p99 {stats['p99_ms']:>7.1f} ms  errors {stats['errors']}")
+        if daraja is not None:
+            results['meta']['mock_daraja'] = daraja.counts
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+        if daraja is not None:
+            daraja.stop()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.max_regression):
+            print(f"FAIL: p95 regressed by more than {args.max_regression:.0f}%")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Mock Safaricom Daraja server
+
+Implements the OAuth, STK Push and B2C endpoints MpesaService calls.
+Accepted STK Push and B2C requests are answered immediately, and the
+matching result callback is POSTed to the request's CallBackURL/ResultURL
+after a delay, like the real API. Latency and failure rate are
+configurable so checkout can be load-tested without the sandbox.
+
+Usage:
+    python -m benchmarks.mock_daraja [--port 9001] [--latency-ms 50] [--callback-delay-ms 300] [--failure-rate 0]
+
+Point the app at it with MPESA_BASE_URL=http://127.0.0.1:9001.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class MockDaraja:
+    """Daraja stand-in running in a background thread"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=50, callback_delay_ms=300, failure_rate=0.0):
+        self.latency = latency_ms / 1000
+        self.callback_delay = callback_delay_ms / 1000
+        self.failure_rate = failure_rate
+        self.counts = {'oauth': 0, 'stkpush': 0, 'b2c': 0, 'callbacks': 0, 'callback_errors': 0}
+        self._lock = threading.Lock()
+        self._http = requests.Session()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='mock-daraja', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _send_callback(self, url, payload):
+        time.sleep(self.callback_delay)
+        try:
+            self._http.post(url, json=payload, timeout=30)
+            self._count('callbacks')
+        except requests.RequestException:
+            self._count('callback_errors')
+
+    def stk_push(self, request_body):
+        checkout_request_id = f'ws_CO_{uuid.uuid4().hex[:20]}'
+        success = random.random() >= self.failure_rate
+        callback = {'Body': {'stkCallback': {
+            'MerchantRequestID': uuid.uuid4().hex[:12],
+            'CheckoutRequestID': checkout_request_id,
+            'ResultCode': 0 if success else 1032,
+            'ResultDesc': 'The service request is processed successfully.' if success else 'Request cancelled by user',
+        }}}
+        if success:
+            callback['Body']['stkCallback']['CallbackMetadata'] = {'Item': [
+                {'Name': 'Amount', 'Value': request_body.get('Amount')},
+                {'Name': 'MpesaReceiptNumber', 'Value': uuid.uuid4().hex[:10].upper()},
+                {'Name': 'TransactionDate', 'Value': int(time.strftime('%Y%m%d%H%M%S'))},
+                {'Name': 'PhoneNumber', 'Value': request_body.get('PhoneNumber')},
+            ]}
+        threading.Thread(target=self._send_callback, args=(request_body['CallBackURL'], callback), daemon=True).start()
+        return {
+            'MerchantRequestID': callback['Body']['stkCallback']['MerchantRequestID'],
+            'CheckoutRequestID': checkout_request_id,
+            'ResponseCode': '0',
+            'ResponseDescription': 'Success. Request accepted for processing',
+            'CustomerMessage': 'Success. Request accepted for processing',
+        }
+
+    def b2c(self, request_body):
+        conversation_id = f'AG_{uuid.uuid4().hex[:20]}'
+        result = {'Result': {
+            'ResultType': 0,
+            'ResultCode': 0,
+            'ResultDesc': 'The service request is processed successfully.',
+            'ConversationId': conversation_id,
+            'TransactionId': uuid.uuid4().hex[:10].upper(),
+        }}
+        threading.Thread(target=self._send_callback, args=(request_body['ResultURL'], result), daemon=True).start()
+        return {
+            'ConversationID': conversation_id,
+            'OriginatorConversationID': uuid.uuid4().hex[:16],
+            'ResponseCode': '0',
+            'ResponseDescription': 'Accept the service request successfully.',
+        }
+
+    def _handler_class(self):
+        daraja = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                time.sleep(daraja.latency)
+                if self.path.startswith('/oauth/v1/generate'):
+                    daraja._count('oauth')
+                    return self._reply(200, {'access_token': 'mock-access-token', 'expires_in': '3599'})
+                self._reply(404, {'errorMessage': 'Not found'})
+
+            def do_POST(self):
+                time.sleep(daraja.latency)
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if self.path == '/mpesa/stkpush/v1/processrequest':
+                    daraja._count('stkpush')
+                    return self._reply(200, daraja.stk_push(body))
+                if self.path == '/mpesa/b2c/v1/paymentrequest':
+                    daraja._count('b2c')
+                    return self._reply(200, daraja.b2c(body))
+                self._reply(404, {'errorMessage': 'Not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--callback-delay-ms', type=float, default=300)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    daraja = MockDaraja(port=args.port, latency_ms=args.latency_ms,
+                        callback_delay_ms=args.callback_delay_ms, failure_rate=args.failure_rate)
+    print(f"Mock Daraja listening on {daraja.url}")
+    try:
+        daraja.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(daraja.counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Password hashing benchmark
+
+Runs concurrent password verifications on an eventlet hub, first with
+bcrypt called inline (the old behaviour) and then through the native
+thread pool, while a ticker green thread measures how long the hub is
+stalled. Requires eventlet.
+
+Usage:
+    python -m benchmarks.password_bench [--logins 40] [--concurrency 8] [--rounds 12]
+"""
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import time
+
+import bcrypt
+
+from app.utils import passwords
+
+TICK_SECONDS = 0.005
+
+
+def measure(verify, hashed, logins, concurrency):
+    """Run `logins` verifications with `concurrency` green threads"""
+    stalls = []
+    running = True
+
+    def ticker():
+        while running:
+            start = time.perf_counter()
+            eventlet.sleep(TICK_SECONDS)
+            stalls.append(max(0.0, time.perf_counter() - start - TICK_SECONDS))
+
+    tick_thread = eventlet.spawn(ticker)
+    pool = eventlet.GreenPool(concurrency)
+    start = time.perf_counter()
+    results = list(pool.imap(lambda _: verify(b'Sup3rSecret!', hashed), range(logins)))
+    elapsed = time.perf_counter() - start
+    running = False
+    tick_thread.wait()
+
+    assert all(results), 'verification failed'
+    ordered = sorted(stalls) or [0.0]
+    return {
+        'throughput': logins / elapsed,
+        'max_stall': ordered[-1] * 1000,
+        'p99_stall': ordered[int(0.99 * (len(ordered) - 1))] * 1000,
+        'stalled': sum(stalls) / elapsed * 100,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=12)
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b'Sup3rSecret!', bcrypt.gensalt(args.rounds))
+    print(f"{args.logins} logins, {args.concurrency} concurrent, cost {args.rounds}, "
+          f"pool size {passwords.PASSWORD_HASH_CONCURRENCY}")
+    print(f"{'mode':<10}{'logins/s':>10}{'max stall ms':>14}{'p99 stall ms':>14}{'hub stalled':>13}")
+    for mode, verify in (('inline', bcrypt.checkpw), ('pool', passwords.checkpw)):
+        result = measure(verify, hashed, args.logins, args.concurrency)
+        print(f"{mode:<10}{result['throughput']:>10.1f}{result['max_stall']:>14.1f}"
+              f"{result['p99_stall']:>14.1f}{result['stalled']:>12.0f}%")
+
+    print(f"Adaptive target cost for a {passwords.PASSWORD_HASH_TARGET_MS:.0f} ms budget: "
+          f"{passwords.cost_policy.target_rounds}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Serialisation micro-benchmark
+
+Compares the previous hand-built dict + stdlib json path with the msgspec
+Struct path for 10k-row payloads of each response schema.
+
+Usage:
+    python -m benchmarks.serialization_bench [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models import OrderStatus, PaymentMethod, PaymentStatus, NotificationType
+from app.models.message import MessageType, MessageStatus
+from app.schemas import (
+    ProductSchema, OrderSchema, OrderItemSchema, PaymentSchema, MessageSchema, NotificationSchema
+)
+from app.utils.serialization import encode_json
+
+
+def make_rows(count):
+    """Build fake model rows shaped like the SQLAlchemy models"""
+    now = datetime.utcnow()
+    rows = {'product': [], 'order': [], 'order_item': [], 'payment': [], 'message': [], 'notification': []}
+    for i in range(count):
+        rows['product'].append(SimpleNamespace(
+            id=str(uuid.uuid4()), title=f'Handwoven basket {i}', price=1500.0 + i,
+            description='Set of 3 traditional woven baskets', image_url=f'https://cdn.example.com/{i}.jpg',
+            stock=i % 20, currency='KSH', status='active'
+        ))
+        rows['order'].append(SimpleNamespace(
+            id=str(uuid.uuid4()), user_id=str(uuid.uuid4()), status=OrderStatus.pending,
+            total_amount=Decimal('2500.00'), placed_at=now, updated_at=now
+        ))
+        rows['order_item'].append(SimpleNamespace(
+            id=str(uuid.uuid4()), order_id=str(uuid.uuid4()), product_id=str(uuid.uuid4()),
+            artisan_id=str(uuid.uuid4()), quantity=2, unit_price=Decimal('1250.00'), total_price=Decimal('2500.00')
+        ))
+        rows['payment'].append(SimpleNamespace(
+            id=str(uuid.uuid4()), order_id=str(uuid.uuid4()), amount=Decimal('2500.00'), currency='KES',
+            status=PaymentStatus.success, method=PaymentMethod.mpesa, mpesa_transaction_id=f'QK{i:08d}',
+            created_at=now, updated_at=now
+        ))
+        rows['message'].append(SimpleNamespace(
+            id=str(uuid.uuid4()), sender_id=str(uuid.uuid4()), receiver_id=str(uuid.uuid4()),
+            message='Is this still available?', message_type=MessageType.TEXT, attachment_url=None,
+            attachment_name=None, timestamp=now, is_read=False, status=MessageStatus.SENT
+        ))
+        rows['notification'].append(SimpleNamespace(
+            id=str(uuid.uuid4()), user_id=str(uuid.uuid4()), type=NotificationType.order_update,
+            title='Order Update', message='Your order status changed to shipped.', is_read=False, created_at=now
+        ))
+    return rows
+
+
+def legacy_dict(kind, r):
+    """Per-field conversion as previously done in each resource"""
+    if kind == 'product':
+        return {'id': r.id, 'title': r.title, 'price': r.price, 'description': r.description,
+                'image_url': r.image_url, 'stock': r.stock, 'currency': r.currency, 'status': r.status}
+    if kind == 'order':
+        return {'id': r.id, 'user_id': r.user_id, 'status': r.status.value if r.status else None,
+                'total_amount': float(r.total_amount) if r.total_amount else 0,
+                'created_at': r.placed_at.isoformat() if r.placed_at else None,
+                'updated_at': r.updated_at.isoformat() if r.updated_at else None}
+    if kind == 'order_item':
+        return {'id': r.id, 'order_id': r.order_id, 'product_id': r.product_id, 'artisan_id': r.artisan_id,
+                'quantity': r.quantity, 'unit_price': float(r.unit_price) if r.unit_price else 0,
+                'total_price': float(r.total_price) if r.total_price else 0}
+    if kind == 'payment':
+        return {'id': r.id, 'order_id': r.order_id, 'amount': float(r.amount) if r.amount else 0,
+                'status': r.status.value if r.status else None, 'method': r.method.value if r.method else None,
+                'mpesa_transaction_id': r.mpesa_transaction_id,
+                'created_at': r.created_at.isoformat() if r.created_at else None}
+    if kind == 'message':
+        return {'id': r.id, 'sender_id': r.sender_id, 'receiver_id': r.receiver_id, 'message': r.message,
+                'timestamp': r.timestamp.isoformat() if r.timestamp else None, 'is_read': r.is_read}
+    return {'id': r.id, 'user_id': r.user_id, 'type': r.type.value if r.type else None, 'title': r.title,
+            'message': r.message, 'is_read': r.is_read,
+            'created_at': r.created_at.isoformat() if r.created_at else None}
+
+
+SCHEMAS = {
+    'product': ProductSchema,
+    'order': OrderSchema,
+    'order_item': OrderItemSchema,
+    'payment': PaymentSchema,
+    'message': MessageSchema,
+    'notification': NotificationSchema,
+}
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"{'payload':<14}{'before (rows/s)':>18}{'after (rows/s)':>18}{'speedup':>10}")
+    for kind, schema in SCHEMAS.items():
+        data = rows[kind]
+        before = best_of(args.repeat, lambda: (json.dumps([legacy_dict(kind, r) for r in data]) + '\n').encode())
+        after = best_of(args.repeat, lambda: encode_json([schema.from_model(r) for r in data]) + b'\n')
+        print(f"{kind:<14}{args.rows / before:>18,.0f}{args.rows / after:>18,.0f}{before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Session backend benchmark
+
+Measures auth-check latency (GET /api/auth/session with a logged-in
+session) for each SESSION_BACKEND under concurrent load.
+
+Usage:
+    python -m benchmarks.session_bench [--threads 8] [--requests 500] [--store-url memory://]
+
+Pass --store-url redis://localhost:6379/0 to run the redis and cookie
+backends against a real Redis-protocol server instead of the in-process
+stand-in.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_client(app, requests_per_thread):
+    """Log in one client and time repeated auth checks"""
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['authenticated'] = True
+        sess['user_id'] = 'benchmark-user'
+        sess['user_role'] = 'buyer'
+
+    timings = []
+    for _ in range(requests_per_thread):
+        start = time.perf_counter()
+        response = client.get('/api/auth/session')
+        timings.append(time.perf_counter() - start)
+        if not response.json.get('authenticated'):
+            raise RuntimeError('Session was not recognised')
+    return timings
+
+
+def bench_backend(backend, store_url, threads, requests_per_thread):
+    os.environ['SESSION_BACKEND'] = backend
+    os.environ['SESSION_STORE_URL'] = store_url
+
+    from app import create_app
+    app = create_app()
+
+    # Warm up imports and the first session write
+    run_client(app, 5)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda _: run_client(app, requests_per_thread), range(threads)))
+    elapsed = time.perf_counter() - start
+
+    timings = [t for thread_timings in results for t in thread_timings]
+    return {
+        'throughput': len(timings) / elapsed,
+        'mean': statistics.mean(timings) * 1000,
+        'p50': percentile(timings, 50) * 1000,
+        'p95': percentile(timings, 95) * 1000,
+        'p99': percentile(timings, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500, help='requests per thread')
+    parser.add_argument('--store-url', default='memory://')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='soko_session_bench_')
+    os.chdir(workdir)  # filesystem sessions are written under ./instance/sessions
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'sessions.db')}"
+
+    print(f"{args.threads} threads x {args.requests} requests, store {args.store_url}")
+    print(f"{'backend':<12}{'req/s':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for backend in ('filesystem', 'redis', 'cookie'):
+        result = bench_backend(backend, args.store_url, args.threads, args.requests)
+        print(f"{backend:<12}{result['throughput']:>10,.0f}{result['mean']:>10.2f}"
+              f"{result['p50']:>10.2f}{result['p95']:>10.2f}{result['p99']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Cold-start benchmark
+
+Measures what a user waiting on a spun-down Render instance pays for:
+
+    imports          `python -X importtime` while creating the app; the slowest
+                     modules by cumulative time, and the total against --import-budget-ms
+    create_app       per-phase timings from the app.startup log record
+    first request    time from spawning main.py until GET /api/categories/ answers,
+                     median of --runs fresh processes, against --max-first-request-ms
+
+Exits non-zero when a budget is exceeded, so it can run in CI.
+
+Usage:
+    python -m benchmarks.startup_bench [--runs 5] [--import-budget-ms 1500]
+        [--max-first-request-ms 4000] [--top 15] [--output startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROBE_PATH = '/api/categories/'
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) in import order
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure_imports(env, top, workdir):
+    """Import the app and create it once under -X importtime"""
+    code = 'import app; app.create_app()'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=workdir, env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f'create_app failed:\n{result.stderr[-2000:]}')
+    entries = parse_importtime(result.stderr)
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    slowest = sorted(entries, key=lambda entry: entry[2], reverse=True)[:top]
+    own = sorted((entry for entry in entries if entry[0] == 'app' or entry[0].startswith('app.')),
+                 key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'modules': len(entries),
+        'slowest_cumulative': [{'module': m, 'cumulative_ms': round(c / 1000, 1)} for m, _, c, _ in slowest],
+        'slowest_app_self': [{'module': m, 'self_ms': round(s / 1000, 1)} for m, s, _, _ in own],
+    }
+
+
+def measure_first_request(env, port, workdir):
+    """Spawn main.py and time until the probe route answers; returns (ms, startup record)"""
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(env, FLASK_HOST='127.0.0.1', FLASK_PORT=str(port))
+    log_path = os.path.join(workdir, f'server-{port}.log')
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(SERVER_DIR, 'main.py')],
+                                   cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f'Server exited; see {log_path}')
+                if time.perf_counter() - start > 60:
+                    raise RuntimeError('Server did not answer within 60s')
+                try:
+                    if requests.get(base_url + PROBE_PATH, timeout=1).ok:
+                        elapsed = (time.perf_counter() - start) * 1000
+                        break
+                except requests.RequestException:
+                    pass
+                time.sleep(0.01)
+        finally:
+            process.terminate()
+            process.wait(10)
+
+    startup = None
+    with open(log_path) as log:
+        for line in log:
+            if '"app.startup"' in line:
+                startup = json.loads(line)
+                break
+    return elapsed, startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=5097)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--import-budget-ms', type=float, default=1500)
+    parser.add_argument('--max-first-request-ms', type=float, default=4000)
+    parser.add_argument('--output', help='Write the report as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='soko_startup_')
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'benchmark')
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'startup.db')}")
+    env['LOG_LEVEL'] = 'INFO'
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SERVER_DIR, env.get('PYTHONPATH')]))
+
+    imports = measure_imports(env, args.top, workdir)
+    print(f"Imports: {imports['total_ms']:.0f} ms over {imports['modules']} modules "
+          f"(budget {args.import_budget_ms:.0f} ms)")
+    for entry in imports['slowest_cumulative']:
+        print(f"  {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+    print("Slowest app modules (self time):")
+    for entry in imports['slowest_app_self']:
+        print(f"  {entry['self_ms']:>8.1f} ms  {entry['module']}")
+
+    timings, startup = [], None
+    for run in range(args.runs):
+        elapsed, startup = measure_first_request(env, args.port + run, workdir)
+        timings.append(elapsed)
+    first_request_ms = statistics.median(timings)
+
+    if startup:
+        print(f"create_app: {startup['total_ms']:.0f} ms")
+        for name, ms in list(startup['phases'].items())[:args.top]:
+            print(f"  {ms:>8.1f} ms  {name}")
+    print(f"Time to first request: median {first_request_ms:.0f} ms over {args.runs} runs "
+          f"(min {min(timings):.0f}, max {max(timings):.0f}; limit {args.max_first_request_ms:.0f} ms)")
+
+    report = {
+        'imports': imports,
+        'create_app': startup and {'total_ms': startup['total_ms'], 'phases': startup['phases']},
+        'first_request_ms': {'median': round(first_request_ms, 1), 'runs': [round(t, 1) for t in timings]},
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if imports['total_ms'] > args.import_budget_ms:
+        failures.append(f"imports took {imports['total_ms']:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+    if first_request_ms > args.max_first_request_ms:
+        failures.append(f"first request took {first_request_ms:.0f} ms (limit {args.max_first_request_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Change log compactor for Soko Safi
+Keeps the /api/sync change log small
+
+Drops entries superseded by a newer change to the same row, and expires
+entries older than CHANGE_LOG_RETENTION_DAYS; clients holding a token from
+before the expired entries get 410 from /api/sync and reload their lists.
+
+Usage:
+    python change_log_compactor.py                      # compact once
+    python change_log_compactor.py --every 3600         # compact hourly, forever
+    python change_log_compactor.py --retention-days 7
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--retention-days', type=int,
+                        help='Days of history to keep (default: CHANGE_LOG_RETENTION_DAYS)')
+    parser.add_argument('--every', type=float, help='Seconds between runs; run once when omitted')
+    args = parser.parse_args()
+
+    # The compactor never serves sockets; skip Socket.IO's async-mode detection
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+    from app import create_app
+    from app.services.change_log import compact_change_log
+
+    app = create_app()
+    retention_days = args.retention_days or app.config['CHANGE_LOG_RETENTION_DAYS']
+    try:
+        while True:
+            with app.app_context():
+                result = compact_change_log(retention_days)
+            print(f"Removed {result['superseded']} superseded and {result['expired']} expired entries; "
+                  f"tokens before {result['compacted_seq']} are expired")
+            if not args.every:
+                break
+            time.sleep(args.every)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
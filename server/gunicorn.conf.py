@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for Soko Safi
+Loaded automatically from the working directory; command-line flags in the Procfile still apply
+
+Sets up Prometheus multiprocess mode so /metrics reports the sum of all
+workers rather than whichever worker answers the scrape.
+"""
+
+import os
+import shutil
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(os.getcwd(), 'instance', 'prometheus'))
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be added to this one
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
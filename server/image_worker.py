@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Image derivative worker for Soko Safi
+Generates resized WebP/AVIF variants for product images outside the web process
+
+Polls for ProductImage rows in the pending state, resizes each original to
+IMAGE_DERIVATIVE_WIDTHS in every IMAGE_DERIVATIVE_FORMATS format that Pillow
+can encode, uploads them to Cloudinary and records the URLs the API returns
+as a srcset. Resizing runs on a process pool; the web process is eventlet
+monkey-patched and cannot host one.
+
+Usage:
+    python image_worker.py                       # run forever
+    python image_worker.py --once                # drain the queue and exit
+    python image_worker.py --backfill --once --workers 8
+    python image_worker.py --retry-failed --once
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Images processed at once (resize processes and transfer threads)')
+    parser.add_argument('--once', action='store_true', help='Exit when no pending images are left')
+    parser.add_argument('--backfill', action='store_true',
+                        help='First queue the image_url of every product without images')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='First requeue images that failed (abandoned ones are reclaimed on every poll)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Images claimed per poll')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to wait when idle')
+    args = parser.parse_args()
+
+    # The worker never serves sockets; skip Socket.IO's async-mode detection
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+    from app import create_app
+    from app.services.image_pipeline import ImagePipeline, backfill_product_images, retry_failed_images
+
+    app = create_app()
+    with app.app_context():
+        if args.backfill:
+            print(f"Queued {backfill_product_images()} product images")
+        if args.retry_failed:
+            print(f"Requeued {retry_failed_images()} failed or abandoned images")
+
+    pipeline = ImagePipeline(app, workers=args.workers)
+    print(f"Generating {', '.join(pipeline.formats)} derivatives with {pipeline.workers} workers")
+    totals = {'ready': 0, 'failed': 0}
+    try:
+        while True:
+            result = pipeline.run_pending(limit=args.batch_size)
+            for key in totals:
+                totals[key] += result[key]
+            if result['ready'] or result['failed']:
+                print(f"{totals['ready']} ready, {totals['failed']} failed")
+                continue
+            if args.once:
+                break
+            time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.close()
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
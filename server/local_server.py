@@ -5,6 +5,7 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_session import Session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import uuid
 
@@ -38,6 +39,7 @@ class Product(db.Model):
     currency = db.Column(db.String(3), default='KSH')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     deleted_at = db.Column(db.DateTime)
+    images = db.relationship('ProductImage', order_by='ProductImage.position')
 
 class ProductImage(db.Model):
     __tablename__ = "product_images"
@@ -56,10 +58,9 @@ def get_categories():
 @app.route('/api/products/', methods=['GET', 'POST'])
 def handle_products():
     if request.method == 'GET':
-        products = Product.query.filter_by(deleted_at=None).all()
+        products = Product.query.filter_by(deleted_at=None).options(selectinload(Product.images)).all()
         result = []
         for p in products:
-            images = ProductImage.query.filter_by(product_id=p.id).order_by(ProductImage.position).all()
             result.append({
                 'id': p.id,
                 'artisan_id': p.artisan_id,
@@ -68,7 +69,7 @@ def handle_products():
                 'description': p.description,
                 'stock': p.stock,
                 'currency': p.currency,
-                'images': [{'url': img.url, 'alt_text': img.alt_text} for img in images],
+                'images': [{'url': img.url, 'alt_text': img.alt_text} for img in p.images],
                 'created_at': p.created_at.isoformat() if p.created_at else None
             })
         return jsonify(result)
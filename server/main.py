@@ -1,6 +1,6 @@
 from app import create_app
 from app.extensions import db, socketio
-from app.utils.db_migrations import ensure_deleted_at_columns
+from app.utils.db_migrations import ensure_indexes, ensure_optional_columns
 import os
 
 try:
@@ -13,8 +13,9 @@ if __name__ == '__main__':
     try:
         with app.app_context():
             db.create_all()
-            # Ensure optional columns exist for older databases (adds `deleted_at` for sqlite)
-            ensure_deleted_at_columns(app)
+            # Ensure optional columns exist for older databases (sqlite)
+            ensure_optional_columns(app)
+            ensure_indexes(app)
         
         # Get configuration from environment
         debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
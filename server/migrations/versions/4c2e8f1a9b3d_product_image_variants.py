@@ -0,0 +1,61 @@
+"""Product image variants and worker claim lease
+
+Revision ID: 4c2e8f1a9b3d
+Revises: bab41b1917ba
+Create Date: 2026-10-19 10:00:00.000000
+
+Tables are created by db.create_all(), so existing databases may have
+product_images without these columns, or not at all yet; every step
+checks first.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c2e8f1a9b3d'
+down_revision = 'bab41b1917ba'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('variants', sa.Text(), nullable=True),
+    sa.Column('variants_status', sa.String(length=20), nullable=True),
+    sa.Column('variants_claimed_at', sa.DateTime(), nullable=True),
+]
+INDEXES = [
+    ('ix_product_images_variants_status', ['variants_status']),
+    ('ix_product_images_product_id_position', ['product_id', 'position']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('product_images'):
+        return
+    existing = {column['name'] for column in inspector.get_columns('product_images')}
+    with op.batch_alter_table('product_images') as batch_op:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column.copy())
+    # NULL variants_status counts as pending, so existing images are queued without a backfill
+
+    indexes = {index['name'] for index in inspector.get_indexes('product_images')}
+    for name, columns in INDEXES:
+        if name not in indexes:
+            op.create_index(name, 'product_images', columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('product_images'):
+        return
+    indexes = {index['name'] for index in inspector.get_indexes('product_images')}
+    for name, _ in INDEXES:
+        if name in indexes:
+            op.drop_index(name, table_name='product_images')
+    existing = {column['name'] for column in inspector.get_columns('product_images')}
+    with op.batch_alter_table('product_images') as batch_op:
+        for column in reversed(COLUMNS):
+            if column.name in existing:
+                batch_op.drop_column(column.name)
@@ -0,0 +1,43 @@
+"""Uploaded assets for upload deduplication
+
+Revision ID: 7d3b5e0c1f42
+Revises: 4c2e8f1a9b3d
+Create Date: 2026-10-19 11:00:00.000000
+
+Skipped when db.create_all() already built the table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3b5e0c1f42'
+down_revision = '4c2e8f1a9b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('uploaded_assets'):
+        return
+    op.create_table('uploaded_assets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.Text(), nullable=False),
+    sa.Column('public_id', sa.String(length=255), nullable=True),
+    sa.Column('content_type', sa.String(length=50), nullable=True),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False, server_default='1'),
+    sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_uploaded_assets_sha256', 'uploaded_assets', ['sha256'], unique=True)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('uploaded_assets'):
+        return
+    op.drop_index('ix_uploaded_assets_sha256', table_name='uploaded_assets')
+    op.drop_table('uploaded_assets')
@@ -0,0 +1,54 @@
+"""Change log for /api/sync
+
+Revision ID: 9e6a2d4c8b15
+Revises: 7d3b5e0c1f42
+Create Date: 2026-10-19 12:00:00.000000
+
+Tables db.create_all() already built are skipped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e6a2d4c8b15'
+down_revision = '7d3b5e0c1f42'
+branch_labels = None
+depends_on = None
+
+BigIntegerKey = sa.BigInteger().with_variant(sa.Integer(), 'sqlite')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('change_log'):
+        op.create_table('change_log',
+        sa.Column('id', BigIntegerKey, autoincrement=True, nullable=False),
+        sa.Column('seq', sa.BigInteger(), nullable=True),
+        sa.Column('entity', sa.String(length=30), nullable=False),
+        sa.Column('entity_id', sa.String(length=36), nullable=False),
+        sa.Column('operation', sa.String(length=10), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_change_log_seq', 'change_log', ['seq'], unique=True)
+        op.create_index('ix_change_log_created_at', 'change_log', ['created_at'])
+        op.create_index('ix_change_log_user_id_seq', 'change_log', ['user_id', 'seq'])
+        op.create_index('ix_change_log_entity_entity_id', 'change_log', ['entity', 'entity_id'])
+    if not inspector.has_table('change_log_state'):
+        op.create_table('change_log_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('last_seq', sa.BigInteger(), nullable=False),
+        sa.Column('compacted_seq', sa.BigInteger(), nullable=False),
+        sa.Column('compacted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('change_log_state'):
+        op.drop_table('change_log_state')
+    if inspector.has_table('change_log'):
+        op.drop_table('change_log')
@@ -0,0 +1,44 @@
+"""Collection membership for paginated collection pages
+
+Revision ID: b3f7c2d9e4a6
+Revises: 9e6a2d4c8b15
+Create Date: 2026-10-19 13:00:00.000000
+
+Skipped when db.create_all() already built the table; the position index is
+still added if it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f7c2d9e4a6'
+down_revision = '9e6a2d4c8b15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('collection_products'):
+        op.create_table('collection_products',
+        sa.Column('collection_id', sa.String(length=36), nullable=False),
+        sa.Column('product_id', sa.String(length=36), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('added_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['collection_id'], ['collections.id'], ),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.PrimaryKeyConstraint('collection_id', 'product_id')
+        )
+        inspector = sa.inspect(op.get_bind())
+    indexes = {index['name'] for index in inspector.get_indexes('collection_products')}
+    if 'ix_collection_products_collection_id_position' not in indexes:
+        op.create_index('ix_collection_products_collection_id_position', 'collection_products',
+                        ['collection_id', 'position'])
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('collection_products'):
+        return
+    op.drop_index('ix_collection_products_collection_id_position', table_name='collection_products')
+    op.drop_table('collection_products')
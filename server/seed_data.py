@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for Soko Safi
+Bulk-seeds a production-sized database for local performance work
+
+Generates buyers, artisans with M-Pesa payout details, categories, products
+with images, orders and items, payments and artisan disbursements, reviews,
+favorites, follows, notifications and message threads. Artisan popularity
+and user chattiness follow a power law, so a few artisans get most orders
+and followers and a few users write most messages. The same seed always
+produces the same rows.
+
+Rows are written in batches: COPY on PostgreSQL (psycopg2), executemany
+everywhere else. Tables should be empty (run against a fresh database).
+
+Usage:
+    python seed_data.py --preset small
+    python seed_data.py --preset large --create-tables
+    python seed_data.py --preset medium --orders 500000 --artisan-skew 3 --seed 7
+"""
+
+import argparse
+import enum
+import io
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+DEFAULT_PASSWORD = 'Seed-Passw0rd'
+BATCH_SIZE = 10000
+
+# Row counts per preset; order items, payments, disbursements and product
+# images are derived from orders and products
+PRESETS = {
+    'tiny': {'buyers': 200, 'artisans': 20, 'products': 1000, 'orders': 1000, 'reviews': 500,
+             'favorites': 2000, 'follows': 1000, 'notifications': 1000, 'messages': 5000},
+    'small': {'buyers': 2000, 'artisans': 200, 'products': 10000, 'orders': 10000, 'reviews': 5000,
+              'favorites': 20000, 'follows': 10000, 'notifications': 10000, 'messages': 100000},
+    'medium': {'buyers': 20000, 'artisans': 1000, 'products': 50000, 'orders': 200000, 'reviews': 50000,
+               'favorites': 200000, 'follows': 100000, 'notifications': 200000, 'messages': 500000},
+    'large': {'buyers': 100000, 'artisans': 5000, 'products': 100000, 'orders': 1000000, 'reviews': 200000,
+              'favorites': 1000000, 'follows': 500000, 'notifications': 1000000, 'messages': 1000000},
+    'xlarge': {'buyers': 500000, 'artisans': 20000, 'products': 500000, 'orders': 2000000, 'reviews': 1000000,
+               'favorites': 2000000, 'follows': 1000000, 'notifications': 2000000, 'messages': 3000000},
+}
+
+CATEGORIES = {
+    'Pottery': ['Vases', 'Bowls', 'Cookware'],
+    'Textiles': ['Kikoi', 'Kitenge', 'Maasai Shuka'],
+    'Wood Crafts': ['Carvings', 'Kitchenware', 'Furniture'],
+    'Jewelry': ['Necklaces', 'Bracelets', 'Earrings'],
+    'Baskets': ['Kiondo', 'Storage', 'Market Bags'],
+    'Metalwork': ['Sculptures', 'Tools', 'Lamps'],
+    'Beadwork': ['Belts', 'Sandals', 'Wall Art'],
+    'Leather': ['Bags', 'Wallets', 'Footwear'],
+}
+
+LOCATIONS = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Machakos', 'Nyeri', 'Malindi', 'Kitale', 'Thika']
+
+# Payment status for orders that reached checkout, by order status
+PAID_STATUSES = {'processing': 'success', 'shipped': 'success', 'completed': 'success', 'refunded': 'refunded'}
+
+# Share of orders per status; most historical orders are completed
+ORDER_STATUS_WEIGHTS = {'cart': 2, 'pending': 5, 'processing': 5, 'shipped': 8, 'completed': 70,
+                        'cancelled': 7, 'refunded': 3}
+
+# Ratings lean positive, as on most marketplaces
+RATING_WEIGHTS = [3, 4, 10, 33, 50]
+
+
+def power_law_index(rng, size, skew):
+    """
+    Index in [0, size), biased towards 0 by a power law
+
+    Args:
+        rng (random.Random): Random source
+        size (int): Number of items
+        skew (float): 1 is uniform; with 3, the first 10% of items get about 46% of picks
+
+    Returns:
+        int: Index of the picked item
+    """
+    return min(size - 1, int(size * rng.random() ** skew))
+
+
+class BulkWriter:
+    """
+    Buffers rows per table and writes them with COPY or executemany
+
+    When any buffer fills up, all buffers are written in the order their
+    tables were first used, so parent rows always land before their children.
+    """
+
+    def __init__(self, connection, batch_size=BATCH_SIZE):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.use_copy = connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2'
+        self.counts = {}
+        self._buffers = {}
+
+    def add(self, table, row):
+        """Queue one row (a dict keyed by column name) for `table`"""
+        buffer = self._buffers.setdefault(table, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for table, buffer in self._buffers.items():
+            if buffer:
+                self._write(table, buffer)
+                buffer.clear()
+
+    def _write(self, table, rows):
+        if self.use_copy:
+            self._copy(table, rows)
+        else:
+            self.connection.execute(table.insert(), rows)
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(rows)
+
+    def _copy(self, table, rows):
+        columns = list(rows[0])
+        buf = io.StringIO()
+        for row in rows:
+            buf.write('\t'.join(_copy_value(row[column]) for column in columns))
+            buf.write('\n')
+        buf.seek(0)
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f'COPY {table.name} ({", ".join(columns)}) FROM STDIN', buf
+            )
+        finally:
+            cursor.close()
+
+
+def _copy_value(value):
+    """Encode a value for COPY text format; enums are stored by name like SQLAlchemy does"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def generate(connection, counts, seed=42, artisan_skew=2.5, chatty_skew=3.0,
+             password=DEFAULT_PASSWORD, batch_size=BATCH_SIZE, days=730, progress=None):
+    """
+    Generate and insert a synthetic dataset
+
+    Args:
+        connection: SQLAlchemy connection inside a transaction
+        counts (dict): Row counts, keyed like PRESETS entries
+        seed (int): Random seed
+        artisan_skew (float): Power-law exponent for artisan and product popularity
+        chatty_skew (float): Power-law exponent for how many messages each user writes
+        password (str): Password for every generated account
+        batch_size (int): Rows per COPY / executemany batch
+        days (int): Spread of created_at timestamps into the past
+        progress (callable): Called with (table name, rows written) as tables complete
+
+    Returns:
+        dict: Rows written per table plus the generated ids (admin_id, buyer_ids,
+            artisan_ids, category_ids, products as (id, artisan_id, price) tuples)
+    """
+    from app.auth import hash_password
+    from app.models import (
+        User, UserRole, Category, Subcategory, Product, ProductImage, Order, OrderItem, OrderStatus,
+        Payment, PaymentStatus, ArtisanDisbursement, DisbursementStatus, Review, Favorite, Follow,
+        Notification, NotificationType, Message,
+    )
+    from app.models.message import MessageType, MessageStatus
+    from app.models.user import PaymentMethod as PayoutMethod
+
+    rng = random.Random(seed)
+    writer = BulkWriter(connection, batch_size)
+    now = datetime.utcnow()
+    password_hash = hash_password(password)
+
+    def new_id():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def past(max_days=days):
+        return now - timedelta(seconds=rng.randint(0, max_days * 86400))
+
+    reported = {}
+
+    def done():
+        writer.flush()
+        for table, rows in writer.counts.items():
+            if progress and reported.get(table) != rows:
+                progress(table, rows)
+                reported[table] = rows
+
+    # Users: one admin, buyers and artisans; 80% of artisans are paid by phone, the rest by paybill
+    admin_id = new_id()
+    writer.add(User.__table__, _user(admin_id, UserRole.admin, 'admin@example.com', 'Seed Admin', None,
+                                     password_hash, now))
+    buyer_ids = []
+    for i in range(counts['buyers']):
+        buyer_ids.append(new_id())
+        writer.add(User.__table__, _user(buyer_ids[-1], UserRole.buyer, f'buyer-{i}@example.com',
+                                         f'Buyer {i}', f'+2547{i:08d}', password_hash, past(),
+                                         location=rng.choice(LOCATIONS)))
+    artisan_ids, payouts = [], []
+    for i in range(counts['artisans']):
+        artisan_ids.append(new_id())
+        phone = f'+2541{i:08d}'
+        if rng.random() < 0.8:
+            payout = {'payment_method': PayoutMethod.phone, 'mpesa_phone': phone,
+                      'paybill_number': None, 'paybill_account': None}
+        else:
+            payout = {'payment_method': PayoutMethod.paybill, 'mpesa_phone': None,
+                      'paybill_number': str(rng.randint(100000, 999999)), 'paybill_account': f'ART{i:06d}'}
+        payouts.append(payout)
+        writer.add(User.__table__, _user(artisan_ids[-1], UserRole.artisan, f'artisan-{i}@example.com',
+                                         f'Artisan {i}', phone, password_hash, past(),
+                                         location=rng.choice(LOCATIONS),
+                                         description='Handmade crafts from Kenya', **payout))
+    done()
+
+    # Categories and subcategories
+    category_ids, subcategories = [], []
+    for name, children in CATEGORIES.items():
+        category_ids.append(new_id())
+        writer.add(Category.__table__, {'id': category_ids[-1], 'name': name,
+                                        'description': f'{name} from Kenyan artisans', 'created_at': now})
+        for child in children:
+            subcategories.append((new_id(), category_ids[-1], child))
+            writer.add(Subcategory.__table__, {'id': subcategories[-1][0], 'category_id': category_ids[-1],
+                                               'name': child, 'created_at': now})
+    done()
+
+    # Products (popular artisans list more) with 1-4 images each
+    product_ids, product_artisans, product_prices = [], [], []
+    for i in range(counts['products']):
+        product_id = new_id()
+        artisan = power_law_index(rng, len(artisan_ids), artisan_skew)
+        subcategory_id, category_id, name = subcategories[rng.randrange(len(subcategories))]
+        price = round(rng.lognormvariate(7.5, 0.9), 2)
+        product_ids.append(product_id)
+        product_artisans.append(artisan)
+        product_prices.append(price)
+        writer.add(Product.__table__, {
+            'id': product_id, 'artisan_id': artisan_ids[artisan], 'title': f'{name} #{i}',
+            'price': price, 'description': f'Handmade {name.lower()}', 'stock': rng.randint(0, 50),
+            'currency': 'KSH', 'category_id': category_id, 'subcategory_id': subcategory_id,
+            'image_url': f'https://res.cloudinary.com/demo/image/upload/seed/{i}-0.jpg',
+            'status': 'active' if rng.random() < 0.95 else 'inactive',
+            'created_at': past(), 'updated_at': now, 'deleted_at': None,
+        })
+        for position in range(rng.randint(1, 4)):
+            writer.add(ProductImage.__table__, {
+                'product_id': product_id,
+                'url': f'https://res.cloudinary.com/demo/image/upload/seed/{i}-{position}.jpg',
+                'alt_text': f'{name} #{i}', 'position': position, 'created_at': now,
+            })
+    done()
+
+    # Orders with 1-3 items; orders past checkout get a payment and one disbursement per artisan
+    statuses = [OrderStatus[name] for name in ORDER_STATUS_WEIGHTS]
+    status_weights = list(ORDER_STATUS_WEIGHTS.values())
+    for _ in range(counts['orders']):
+        order_id = new_id()
+        status = rng.choices(statuses, status_weights)[0]
+        placed_at = past()
+        totals, items = {}, []
+        for _ in range(rng.randint(1, 3)):
+            product = power_law_index(rng, len(product_ids), artisan_skew)
+            quantity = rng.randint(1, 3)
+            total = round(product_prices[product] * quantity, 2)
+            artisan = product_artisans[product]
+            totals[artisan] = totals.get(artisan, 0) + total
+            items.append({
+                'id': new_id(), 'order_id': order_id, 'product_id': product_ids[product],
+                'artisan_id': artisan_ids[artisan], 'quantity': quantity,
+                'unit_price': product_prices[product], 'total_price': total,
+            })
+        amount = round(sum(totals.values()), 2)
+        writer.add(Order.__table__, {
+            'id': order_id, 'user_id': buyer_ids[rng.randrange(len(buyer_ids))], 'status': status,
+            'total_amount': amount, 'currency': 'KES', 'shipping_address': None, 'billing_address': None,
+            'placed_at': placed_at, 'updated_at': placed_at, 'meta_data': None,
+        })
+        for item in items:
+            writer.add(OrderItem.__table__, item)
+
+        payment_status = PAID_STATUSES.get(status.value)
+        if status is OrderStatus.cancelled:
+            payment_status = 'failed'
+        if payment_status is None:
+            continue
+        payment_id = new_id()
+        paid_at = placed_at + timedelta(seconds=rng.randint(20, 120))
+        writer.add(Payment.__table__, {
+            'id': payment_id, 'order_id': order_id, 'amount': amount, 'currency': 'KES',
+            'status': PaymentStatus(payment_status), 'mpesa_transaction_id': f'S{rng.getrandbits(56):017X}',
+            'payer_phone': f'+2547{rng.randrange(10 ** 8):08d}', 'callback_payload': None,
+            'transaction_status_reason': 'Request cancelled by user' if payment_status == 'failed' else None,
+            'reversal_flag': payment_status == 'refunded',
+            'reversal_timestamp': paid_at + timedelta(days=3) if payment_status == 'refunded' else None,
+            'received_at': paid_at if payment_status != 'failed' else None,
+            'created_at': placed_at, 'updated_at': paid_at,
+        })
+        if payment_status != 'success':
+            continue
+        for artisan, total in totals.items():
+            payout = payouts[artisan]
+            failed = rng.random() < 0.02
+            writer.add(ArtisanDisbursement.__table__, {
+                'id': new_id(), 'payment_id': payment_id, 'artisan_id': artisan_ids[artisan],
+                'amount': round(total, 2), 'currency': 'KES',
+                'status': DisbursementStatus.failed if failed else DisbursementStatus.success,
+                'mpesa_transaction_id': None if failed else f'B{rng.getrandbits(56):017X}',
+                'recipient_phone': payout['mpesa_phone'], 'paybill_number': payout['paybill_number'],
+                'paybill_account': payout['paybill_account'],
+                'disbursement_method': payout['payment_method'].value,
+                'retry_count': 5 if failed else 0, 'last_retry_at': None,
+                'failure_reason': 'Insufficient utility balance' if failed else None,
+                'callback_payload': None, 'completed_at': None if failed else paid_at + timedelta(minutes=2),
+                'created_at': paid_at, 'updated_at': paid_at,
+            })
+    done()
+
+    # Reviews on popular products, leaning positive
+    for _ in range(counts['reviews']):
+        created_at = past()
+        writer.add(Review.__table__, {
+            'id': new_id(), 'product_id': product_ids[power_law_index(rng, len(product_ids), artisan_skew)],
+            'user_id': buyer_ids[rng.randrange(len(buyer_ids))],
+            'rating': rng.choices(range(1, 6), RATING_WEIGHTS)[0], 'title': 'Review',
+            'body': 'Generated review text.', 'created_at': created_at, 'updated_at': created_at,
+        })
+    done()
+
+    # Favorites and follows: unique pairs, popular products and artisans picked more often
+    for table, count, targets, columns in (
+        (Favorite.__table__, counts['favorites'], product_ids, ('user_id', 'product_id')),
+        (Follow.__table__, counts['follows'], artisan_ids, ('follower_id', 'following_id')),
+    ):
+        count = min(count, len(buyer_ids) * len(targets) // 2)
+        seen = set()
+        while len(seen) < count:
+            buyer = rng.randrange(len(buyer_ids))
+            target = power_law_index(rng, len(targets), artisan_skew)
+            key = buyer * len(targets) + target
+            if key in seen:
+                continue
+            seen.add(key)
+            writer.add(table, {'id': new_id(), columns[0]: buyer_ids[buyer], columns[1]: targets[target],
+                               'created_at': past()})
+        done()
+
+    notification_types = list(NotificationType)
+    for _ in range(counts['notifications']):
+        writer.add(Notification.__table__, {
+            'id': new_id(), 'user_id': buyer_ids[rng.randrange(len(buyer_ids))],
+            'type': rng.choice(notification_types), 'title': 'Order Update',
+            'message': 'Your order status changed.', 'is_read': rng.random() < 0.7, 'created_at': past(),
+        })
+    done()
+
+    # Message threads between a buyer and an artisan; chatty buyers start most of them
+    written = 0
+    while written < counts['messages']:
+        buyer = buyer_ids[power_law_index(rng, len(buyer_ids), chatty_skew)]
+        artisan = artisan_ids[power_law_index(rng, len(artisan_ids), artisan_skew)]
+        sent_at = past()
+        for _ in range(min(rng.randint(2, 20), counts['messages'] - written)):
+            sender, receiver = (buyer, artisan) if rng.random() < 0.6 else (artisan, buyer)
+            sent_at += timedelta(seconds=rng.randint(5, 3600))
+            writer.add(Message.__table__, {
+                'id': new_id(), 'sender_id': sender, 'receiver_id': receiver,
+                'message': f'Generated message {written}', 'message_type': MessageType.TEXT,
+                'attachment_url': None, 'attachment_name': None, 'timestamp': min(sent_at, now),
+                'is_read': True, 'status': MessageStatus.READ, 'deleted_at': None,
+            })
+            written += 1
+    done()
+
+    return {
+        'counts': dict(writer.counts),
+        'admin_id': admin_id,
+        'buyer_ids': buyer_ids,
+        'artisan_ids': artisan_ids,
+        'category_ids': category_ids,
+        'products': [(product_ids[i], artisan_ids[product_artisans[i]], product_prices[i])
+                     for i in range(len(product_ids))],
+    }
+
+
+def _user(user_id, role, email, full_name, phone, password_hash, created_at, location=None, description=None,
+          payment_method=None, mpesa_phone=None, paybill_number=None, paybill_account=None):
+    return {
+        'id': user_id, 'role': role, 'email': email, 'password_hash': password_hash, 'full_name': full_name,
+        'phone': phone, 'description': description, 'profile_picture_url': None, 'banner_image_url': None,
+        'location': location, 'is_verified': True, 'meta_data': None, 'payment_method': payment_method,
+        'mpesa_phone': mpesa_phone, 'paybill_number': paybill_number, 'paybill_account': paybill_account,
+        'created_at': created_at, 'updated_at': created_at, 'deleted_at': None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--preset', choices=list(PRESETS), default='small')
+    for name in PRESETS['small']:
+        parser.add_argument(f'--{name}', type=int, help=f'Override the preset number of {name}')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--artisan-skew', type=float, default=2.5,
+                        help='Power-law exponent for artisan/product popularity (1 = uniform)')
+    parser.add_argument('--chatty-skew', type=float, default=3.0,
+                        help='Power-law exponent for messages per user (1 = uniform)')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Password for every generated account')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--create-tables', action='store_true', help='Run db.create_all() first')
+    args = parser.parse_args()
+
+    counts = dict(PRESETS[args.preset])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+
+    # Seeding never serves sockets; skip Socket.IO's async-mode detection
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+    from app import create_app
+    from app.models import db
+
+    app = create_app()
+    with app.app_context():
+        if args.create_tables:
+            db.create_all()
+
+        start = time.perf_counter()
+
+        def progress(table, rows):
+            print(f"{time.perf_counter() - start:8.1f}s  {table:<24}{rows:>12,}")
+
+        print(f"Seeding {db.engine.url.render_as_string(hide_password=True)} with {counts}")
+        with db.engine.begin() as connection:
+            result = generate(connection, counts, seed=args.seed, artisan_skew=args.artisan_skew,
+                              chatty_skew=args.chatty_skew, password=args.password,
+                              batch_size=args.batch_size, progress=progress)
+
+        total = sum(result['counts'].values())
+        elapsed = time.perf_counter() - start
+        print(f"Inserted {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+        print(f"Accounts: admin@example.com, buyer-N@example.com, artisan-N@example.com / {args.password}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+# Settings create_app() reads; an in-process store keeps sessions and rate limits out of the tree
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'threading')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ['SESSION_BACKEND'] = 'redis'
+os.environ['SESSION_STORE_URL'] = 'memory://'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'soko_safi.db'}")
+    from app import create_app
+    from app.models import db
+
+    flask_app = create_app()
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,54 @@
+import pytest
+
+from app.routes.batch_routes import parse_batch
+
+
+def test_parse_batch_rejects_nested_batch():
+    with pytest.raises(ValueError, match='cannot be nested'):
+        parse_batch([{'method': 'POST', 'path': '/api/batch/'}], 20)
+
+
+@pytest.mark.parametrize('path', ['/api/%62atch', '/api/%62atch/', '/api/b%61tch?x=1'])
+def test_encoded_nested_batch_is_not_run(client, path):
+    response = client.post('/api/batch', json=[
+        {'method': 'GET', 'path': '/api/categories/'},
+        {'method': 'POST', 'path': path, 'body': [{'method': 'GET', 'path': '/api/categories/'}]},
+    ])
+
+    assert response.status_code == 200
+    first, nested = response.get_json()
+    assert first['status'] == 200
+    assert nested['status'] == 400
+    assert nested['body']['message'] == 'Batches cannot be nested'
+
+
+def test_parse_batch_drops_transport_headers():
+    (sub,), _ = parse_batch([{'path': '/api/categories/', 'headers': {
+        'Accept-Encoding': 'gzip', 'content-length': '5', 'X-Client': 'app'}}], 20)
+
+    assert sub.headers == {'X-Client': 'app'}
+
+
+def test_sub_request_accept_encoding_is_not_applied(app, client):
+    from app.models import db, Category
+
+    with app.app_context():
+        db.session.add_all(Category(name=f'Category {n}', description='Handmade ' * 20) for n in range(20))
+        db.session.commit()
+    response = client.post('/api/batch', json=[
+        {'method': 'GET', 'path': '/api/categories/', 'headers': {'Accept-Encoding': 'gzip'}},
+    ])
+
+    assert response.status_code == 200
+    (result,) = response.get_json()
+    assert result['status'] == 200
+    assert len(result['body']) == 20
+
+
+def test_encoded_sub_response_is_refused():
+    from flask import Response
+
+    from app.routes.batch_routes import _result
+
+    response = Response(b'\x1f\x8b\x08compressed', mimetype='application/json', headers={'Content-Encoding': 'gzip'})
+    assert _result(response)['body']['error'] == 'Not batchable'
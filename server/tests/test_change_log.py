@@ -0,0 +1,32 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.asgi.database import create_async_db
+from app.models import db, ChangeLogEntry, Message
+
+
+def _message_entries():
+    return db.session.scalars(select(ChangeLogEntry).filter_by(entity='messages')).all()
+
+
+def test_flask_and_async_writes_reach_change_log(app):
+    with app.app_context():
+        db.session.add(Message(sender_id='user-a', receiver_id='user-b', message='from flask'))
+        db.session.commit()
+
+    async def store_message():
+        engine, sessions = create_async_db(app)
+        async with sessions() as db_session:
+            db_session.add(Message(sender_id='user-b', receiver_id='user-a', message='from socket'))
+            await db_session.commit()
+        await engine.dispose()
+
+    asyncio.run(store_message())
+
+    with app.app_context():
+        entries = _message_entries()
+        assert len({entry.entity_id for entry in entries}) == 2
+        assert {(entry.operation, entry.user_id) for entry in entries} == {
+            ('insert', 'user-a'), ('insert', 'user-b')}
+        assert len(entries) == 4
@@ -0,0 +1,51 @@
+import tracemalloc
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.models import db, Message, User, UserRole
+
+EXPORT_ROWS = 50000
+# Room for one EXPORT_BATCH_SIZE batch of ORM objects and its output chunk, whatever the row count
+PEAK_BUDGET_BYTES = 8 * 1024 * 1024
+
+
+@pytest.fixture
+def admin_client(app, client):
+    with app.app_context():
+        admin = User(email='export-admin@example.com', password_hash='-', role=UserRole.admin)
+        db.session.add(admin)
+        db.session.commit()
+        sender, receiver, now = str(uuid.uuid4()), str(uuid.uuid4()), datetime.utcnow()
+        db.session.execute(Message.__table__.insert(), [{
+            'id': str(uuid.uuid4()), 'sender_id': sender, 'receiver_id': receiver,
+            'message': f'Export message {n} ' + 'x' * 200, 'message_type': 'TEXT',
+            'timestamp': now, 'is_read': False, 'status': 'SENT',
+        } for n in range(EXPORT_ROWS)])
+        db.session.commit()
+        admin_id = admin.id
+    with client.session_transaction() as sess:
+        sess.update(authenticated=True, user_id=admin_id, user_role='admin')
+    return client
+
+
+@pytest.mark.parametrize('export_format', ['ndjson', 'csv'])
+def test_export_streams_in_bounded_memory(admin_client, export_format):
+    lines = exported = 0
+    tracemalloc.start()
+    try:
+        response = admin_client.get(f'/api/messages/export?format={export_format}', buffered=False)
+        assert response.status_code == 200
+        for chunk in response.response:
+            lines += chunk.count(b'\n' if isinstance(chunk, bytes) else '\n')
+            exported += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    response.close()
+
+    assert lines == EXPORT_ROWS + (export_format == 'csv')
+    # The export is several times the budget, so buffering it (or its rows) could not fit
+    assert exported > 2 * PEAK_BUDGET_BYTES
+    assert peak < PEAK_BUDGET_BYTES, f'peak {peak} bytes for a {exported} byte export'
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import db, ProductImage
+from app.services.image_pipeline import ImagePipeline, check_source_url, retry_failed_images
+
+
+def test_retry_requeues_failed_and_abandoned_images(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        images = {
+            'failed': ProductImage(url='a', variants_status='failed'),
+            'stale': ProductImage(url='b', variants_status='processing', variants_claimed_at=now - timedelta(hours=1)),
+            'unstamped': ProductImage(url='c', variants_status='processing'),
+            'running': ProductImage(url='d', variants_status='processing', variants_claimed_at=now),
+            'ready': ProductImage(url='e', variants_status='ready'),
+        }
+        db.session.add_all(images.values())
+        db.session.commit()
+        ids = {name: image.id for name, image in images.items()}
+
+        assert retry_failed_images(lease_seconds=15 * 60) == 3
+
+        db.session.expire_all()
+        statuses = {name: db.session.get(ProductImage, image_id).variants_status for name, image_id in ids.items()}
+        assert statuses == {'failed': 'pending', 'stale': 'pending', 'unstamped': 'pending',
+                            'running': 'processing', 'ready': 'ready'}
+
+
+def test_run_pending_reclaims_abandoned_images(app, monkeypatch):
+    now = datetime.utcnow()
+    with app.app_context():
+        images = {
+            'pending': ProductImage(url='a', variants_status='pending'),
+            'stale': ProductImage(url='b', variants_status='processing', variants_claimed_at=now - timedelta(hours=1)),
+            'running': ProductImage(url='c', variants_status='processing', variants_claimed_at=now),
+        }
+        db.session.add_all(images.values())
+        db.session.commit()
+        ids = {name: image.id for name, image in images.items()}
+
+    pipeline = ImagePipeline.__new__(ImagePipeline)
+    pipeline.app, pipeline.lease_seconds = app, 15 * 60
+    pipeline.threads = ThreadPoolExecutor(1)
+    processed = []
+
+    def process(image_id):
+        with app.app_context():
+            if pipeline._claim(image_id):
+                processed.append(image_id)
+
+    monkeypatch.setattr(pipeline, 'process', process)
+    pipeline.run_pending()
+    pipeline.threads.shutdown()
+    assert sorted(processed) == sorted([ids['pending'], ids['stale']])
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1/a.jpg', 'http://169.254.169.254/latest/meta-data', 'http://10.0.0.5/a.jpg',
+    'http://[::1]/a.jpg', 'file:///etc/passwd', 'ftp://example.com/a.jpg',
+])
+def test_check_source_url_refuses_internal_addresses(url):
+    with pytest.raises(ValueError):
+        check_source_url(url)
+
+
+def test_check_source_url_allows_public_addresses():
+    check_source_url('https://93.184.216.34/a.jpg')
+
+
+def test_download_refuses_redirect_to_internal_address():
+    class Redirect:
+        is_redirect = True
+        headers = {'Location': 'http://169.254.169.254/latest/meta-data'}
+
+        def close(self):
+            pass
+
+    requested = []
+    pipeline = ImagePipeline.__new__(ImagePipeline)
+    pipeline.cloudinary = SimpleNamespace(session=SimpleNamespace(
+        get=lambda url, **kwargs: requested.append(url) or Redirect()))
+    with pytest.raises(ValueError):
+        pipeline._download('https://93.184.216.34/a.jpg')
+    assert requested == ['https://93.184.216.34/a.jpg']
@@ -0,0 +1,19 @@
+def test_metrics_hidden_under_gunicorn_without_token(client, monkeypatch, tmp_path):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+
+    assert client.get('/metrics').status_code == 404
+
+
+def test_metrics_require_configured_token(app, client, monkeypatch):
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+    app.config['METRICS_AUTH_TOKEN'] = 'scrape-token'
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'}).status_code == 200
+
+
+def test_metrics_open_in_single_process_development(client, monkeypatch):
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR', raising=False)
+
+    assert client.get('/metrics').status_code == 200
@@ -0,0 +1,33 @@
+from unittest import mock
+
+from app.auth import password_needs_rehash
+from app.utils.passwords import CostPolicy
+
+
+def test_slow_timings_never_lower_the_target():
+    policy = CostPolicy(budget_ms=250, min_rounds=12, max_rounds=14)
+
+    for _ in range(50):
+        policy.record(12, 5.0)
+
+    assert policy.target_rounds == 12
+
+
+def test_fast_timings_raise_the_target_and_it_stays_raised():
+    policy = CostPolicy(budget_ms=250, min_rounds=12, max_rounds=14)
+
+    for _ in range(20):
+        policy.record(12, 0.03)
+    assert policy.target_rounds == 14
+
+    for _ in range(50):
+        policy.record(14, 5.0)
+    assert policy.target_rounds == 14
+
+
+def test_rehash_only_moves_hashes_up():
+    with mock.patch('app.utils.passwords.cost_policy', CostPolicy(250, 12, 14)) as policy:
+        policy.target_rounds = 13
+        assert password_needs_rehash('$2b$12$' + 'x' * 53)
+        assert not password_needs_rehash('$2b$13$' + 'x' * 53)
+        assert not password_needs_rehash('$2b$14$' + 'x' * 53)
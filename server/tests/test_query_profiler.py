@@ -0,0 +1,34 @@
+import pytest
+from flask import g
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from app.models import db
+from app.utils.query_profiler import ENGINE_LISTENERS, RequestProfile, init_query_profiler
+
+
+@pytest.fixture
+def profiled_app(app):
+    app.config['SQL_PROFILER_ENABLED'] = True
+    init_query_profiler(app)
+    yield app
+    for name, listener in ENGINE_LISTENERS:
+        event.remove(Engine, name, listener)
+
+
+def test_listeners_are_not_attached_when_disabled(app):
+    assert not app.config['SQL_PROFILER_ENABLED']
+    assert not any(event.contains(Engine, name, listener) for name, listener in ENGINE_LISTENERS)
+
+
+def test_failed_statement_does_not_leave_a_start_time(profiled_app):
+    with profiled_app.test_request_context(), db.engine.connect() as conn:
+        g._sql_profile = RequestProfile()
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM no_such_table'))
+        assert not conn.info.get('_query_start')
+
+        conn.execute(text('SELECT 1'))
+        assert g._sql_profile.queries == 1
+        assert not conn.info.get('_query_start')
@@ -0,0 +1,44 @@
+import time
+
+from app.utils.kv_store import MemoryStore
+
+
+def test_memory_store_sweeps_expired_keys_on_write(monkeypatch):
+    store = MemoryStore()
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+
+    for window in range(1000):
+        store.incr(f'rl:login:60:1.2.3.4:{window}')
+        store.expire(f'rl:login:60:1.2.3.4:{window}', 120)
+    now[0] += 121
+    store.incr('rl:login:60:1.2.3.4:next')
+
+    assert list(store._data) == ['rl:login:60:1.2.3.4:next']
+    assert store._expiry_heap == []
+
+
+def test_login_limit_ignores_spoofed_forwarded_for(client):
+    statuses = [
+        client.post('/api/auth/login', json={'email': f'user{attempt}@example.com', 'password': 'wrong'},
+                    headers={'X-Forwarded-For': f'203.0.113.{attempt}'}).status_code
+        for attempt in range(25)
+    ]
+
+    assert statuses[:20] == [401] * 20
+    assert 429 in statuses[20:]
+
+
+def test_proxy_fix_uses_address_appended_by_proxy(app, monkeypatch):
+    from app import create_app
+
+    monkeypatch.setenv('PROXY_FIX_X_FOR', '1')
+    proxied = create_app().test_client()
+    statuses = [
+        proxied.post('/api/auth/login', json={'email': f'user{attempt}@example.com', 'password': 'wrong'},
+                     headers={'X-Forwarded-For': f'198.51.100.7, 203.0.113.{attempt}'}).status_code
+        for attempt in range(25)
+    ]
+
+    # Each attempt came through the proxy from a different client, so none are limited
+    assert 429 not in statuses
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from app.models import db, ProductImage, UploadedAsset
+from app.services import upload_dedup
+from app.services.upload_dedup import release_asset
+
+
+def _asset(sha256, url):
+    db.session.add(UploadedAsset(sha256=sha256, url=url, public_id=f'id-{sha256}', size_bytes=10, ref_count=1))
+    db.session.commit()
+
+
+def test_release_keeps_asset_still_used_by_a_product_image(app):
+    with app.app_context(), mock.patch.object(upload_dedup, 'get_cloudinary_service') as cloudinary:
+        _asset('a' * 64, 'https://cdn.example/used.jpg')
+        db.session.add(ProductImage(url='https://cdn.example/used.jpg'))
+        db.session.commit()
+
+        assert release_asset('a' * 64) == 1
+
+        assert UploadedAsset.query.filter_by(sha256='a' * 64).one().ref_count == 1
+        cloudinary.assert_not_called()
+
+
+def test_release_destroys_unused_asset(app):
+    with app.app_context(), mock.patch.object(upload_dedup, 'get_cloudinary_service') as cloudinary:
+        _asset('b' * 64, 'https://cdn.example/unused.jpg')
+
+        assert release_asset('b' * 64) == 0
+
+        assert UploadedAsset.query.filter_by(sha256='b' * 64).first() is None
+        cloudinary.return_value.destroy.assert_called_once_with('id-' + 'b' * 64)
+
+
+def test_losing_concurrent_upload_destroys_its_own_copy(app):
+    with app.app_context(), mock.patch.object(upload_dedup, 'get_cloudinary_service') as cloudinary:
+        _asset('c' * 64, 'https://cdn.example/first.jpg')
+
+        asset = upload_dedup.record_asset('c' * 64, 'https://cdn.example/second.jpg', 'id-second', 'image/png', 10)
+
+        assert asset.url == 'https://cdn.example/first.jpg'
+        assert asset.ref_count == 2
+        cloudinary.return_value.destroy.assert_called_once_with('id-second')
+
+
+def test_failed_destroy_of_losing_copy_is_not_raised(app):
+    with app.app_context(), mock.patch.object(upload_dedup, 'get_cloudinary_service') as cloudinary:
+        _asset('d' * 64, 'https://cdn.example/first.jpg')
+        cloudinary.return_value.destroy.side_effect = ConnectionError
+
+        asset = upload_dedup.record_asset('d' * 64, 'https://cdn.example/second.jpg', 'id-second', 'image/png', 10)
+
+        assert asset.url == 'https://cdn.example/first.jpg'
@@ -0,0 +1,31 @@
+from app.models import db, Product
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def _ownerless_product(app):
+    with app.app_context():
+        product = Product(title='Basket', price=10)
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+
+def test_anonymous_upload_to_ownerless_product_is_refused(app, client):
+    product_id = _ownerless_product(app)
+
+    response = client.post(f'/api/upload/image?product_id={product_id}', data=PNG,
+                           headers={'Content-Type': 'image/png'})
+
+    assert response.status_code == 401
+
+
+def test_non_admin_upload_to_ownerless_product_is_refused(app, client):
+    product_id = _ownerless_product(app)
+    with client.session_transaction() as sess:
+        sess.update(authenticated=True, user_id='buyer-1', user_role='buyer')
+
+    response = client.post(f'/api/upload/image?product_id={product_id}', data=PNG,
+                           headers={'Content-Type': 'image/png'})
+
+    assert response.status_code == 403